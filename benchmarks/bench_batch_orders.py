@@ -0,0 +1,90 @@
+"""
+Throughput comparison: single-order POST /api/orders/ vs POST /api/orders/batch.
+
+Runs against a live service (e.g. `docker-compose up`). Rate limiting must be
+disabled on the server (API_RATE_LIMIT_ENABLED=false), otherwise the single-order
+path is capped at API_RATE_LIMIT_REQUESTS per window.
+
+    python -m benchmarks.bench_batch_orders --orders 2000 --batch-size 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from httpx import AsyncClient
+
+def make_order() -> dict:
+    return {
+        "customer_id": str(uuid.uuid4()),
+        "items": [
+            {"product_id": str(uuid.uuid4()), "quantity": 2},
+            {"product_id": str(uuid.uuid4()), "quantity": 1}
+        ],
+        "shipping_address": "123 Main St"
+    }
+
+async def run_pool(jobs, concurrency: int):
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def worker():
+        while not queue.empty():
+            job = queue.get_nowait()
+            await job()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def bench_single(client: AsyncClient, total: int, concurrency: int) -> float:
+    failures = 0
+
+    async def post_one():
+        nonlocal failures
+        response = await client.post("/api/orders/", json=make_order())
+        if response.status_code != 201:
+            failures += 1
+
+    start = time.perf_counter()
+    await run_pool([post_one for _ in range(total)], concurrency)
+    elapsed = time.perf_counter() - start
+    if failures:
+        print(f"  single: {failures} requests failed")
+    return elapsed
+
+async def bench_batch(client: AsyncClient, total: int, batch_size: int, concurrency: int) -> float:
+    failures = 0
+
+    async def post_batch(size: int):
+        nonlocal failures
+        response = await client.post("/api/orders/batch", json=[make_order() for _ in range(size)])
+        if response.status_code != 207:
+            failures += size
+        else:
+            failures += response.json()["failed"]
+
+    sizes = [min(batch_size, total - start) for start in range(0, total, batch_size)]
+    start = time.perf_counter()
+    await run_pool([lambda size=size: post_batch(size) for size in sizes], concurrency)
+    elapsed = time.perf_counter() - start
+    if failures:
+        print(f"  batch: {failures} orders failed")
+    return elapsed
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    async with AsyncClient(base_url=args.base_url, timeout=60) as client:
+        single = await bench_single(client, args.orders, args.concurrency)
+        batch = await bench_batch(client, args.orders, args.batch_size, min(args.concurrency, 4))
+
+    print(f"single-order path: {args.orders / single:10.1f} orders/s ({single:.2f}s)")
+    print(f"batch path:        {args.orders / batch:10.1f} orders/s ({batch:.2f}s, batch size {args.batch_size})")
+    print(f"speedup:           {single / batch:10.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Payload size and encode/decode cost of the event encodings.
+
+Encodes OrderCreated events with 1 to 1000 line items as JSON and
+MessagePack, each with and without deflate, and reports the body size and
+the time per encode and per decode. Runs in-process, no services needed.
+
+    python -m benchmarks.bench_codec --items 1 10 100 1000
+"""
+import argparse
+import time
+import uuid
+from decimal import Decimal
+from src.messaging.codec import decode_event, encode_event
+from src.messaging.producer import build_order_created_event
+
+VARIANTS = [
+    ("json", 0),
+    ("json+deflate", 1),
+    ("msgpack", 0),
+    ("msgpack+deflate", 1),
+]
+
+def order_data(items: int) -> dict:
+    return {
+        "order_id": uuid.uuid4(),
+        "customer_id": uuid.uuid4(),
+        "items": [{"product_id": uuid.uuid4(), "quantity": 2, "price": Decimal("49.99")} for _ in range(items)],
+        "total_amount": Decimal("99.98") * items,
+    }
+
+def time_per_op(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 100, 1000], help="line items per order")
+    parser.add_argument("--rounds", type=int, default=0, help="iterations per measurement (default: scaled to the order size)")
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'encoding':<16} {'bytes':>9} {'vs json':>8} {'encode us':>10} {'decode us':>10}")
+    for items in args.items:
+        event = build_order_created_event(order_data(items))
+        rounds = args.rounds or max(20, 20000 // items)
+        json_size = None
+        for name, compress_above in VARIANTS:
+            encoding = name.split("+")[0]
+            encoded = encode_event(event, encoding=encoding, compress_above=compress_above)
+            json_size = json_size or len(encoded.body)
+            encode_us = time_per_op(lambda: encode_event(event, encoding=encoding, compress_above=compress_above), rounds)
+            decode_us = time_per_op(lambda: decode_event(*encoded), rounds)
+            print(
+                f"{items:>6} {name:<16} {len(encoded.body):>9} {len(encoded.body) / json_size:>7.0%} "
+                f"{encode_us:>10.1f} {decode_us:>10.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
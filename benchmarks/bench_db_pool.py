@@ -0,0 +1,74 @@
+"""
+Effect of connection pool sizing under concurrent load.
+
+Opens one engine per pool size (using the same engine profile as the app,
+see src/data/database.py) and runs `--concurrency` clients issuing a short
+query, reporting throughput, latency percentiles and the time spent waiting
+to check a connection out of the pool. Needs Postgres (DATABASE_URL).
+
+    python -m benchmarks.bench_db_pool --pool-sizes 2 5 10 20 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from src.core.config import settings
+from src.data.database import _engine_options
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run(pool_size: int, concurrency: int, queries: int, query_ms: float):
+    settings.DB_POOL_SIZE = pool_size
+    settings.DB_MAX_OVERFLOW = 0
+    engine = create_async_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+    statement = text("SELECT pg_sleep(:seconds)").bindparams(seconds=query_ms / 1000)
+
+    # Open the pool up front so connection setup isn't measured
+    async def warm():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(0.05)
+    await asyncio.gather(*(warm() for _ in range(pool_size)))
+
+    latencies = []
+    waits = []
+
+    async def client(count: int):
+        for _ in range(count):
+            start = time.perf_counter()
+            async with engine.connect() as conn:
+                checked_out = time.perf_counter()
+                await conn.execute(statement)
+            latencies.append((time.perf_counter() - start) * 1000)
+            waits.append((checked_out - start) * 1000)
+
+    per_client = max(1, queries // concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(per_client) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+
+    latencies.sort()
+    waits.sort()
+    print(
+        f"{pool_size:>9} {len(latencies) / elapsed:10.0f} {percentile(latencies, 0.5):8.1f} "
+        f"{percentile(latencies, 0.95):8.1f} {percentile(latencies, 0.99):8.1f} {percentile(waits, 0.5):9.1f} {percentile(waits, 0.99):9.1f}"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[2, 5, 10, 20, 40])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--query-ms", type=float, default=2.0, help="server-side time per query (pg_sleep)")
+    args = parser.parse_args()
+
+    print(f"concurrency {args.concurrency}, {args.query_ms} ms per query")
+    print(f"{'pool size':>9} {'queries/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'wait p50':>9} {'wait p99':>9}")
+    for pool_size in args.pool_sizes:
+        await run(pool_size, args.concurrency, args.queries, args.query_ms)
+
+if __name__ == "__main__":
+    asyncio.run(main())
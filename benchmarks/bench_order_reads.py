@@ -0,0 +1,106 @@
+"""
+Before/after benchmark of the GET /api/orders/{order_id} cache paths.
+
+Runs in-process: the app is driven through httpx's ASGI transport with an
+in-memory stand-in for RedisClient, so only serialization and framework
+overhead is measured. Compares:
+
+  * parsed:  ORDER_CACHE_RAW_RESPONSES=false (json.loads + response_model validation)
+  * raw:     ORDER_CACHE_RAW_RESPONSES=true  (cached JSON body returned as is)
+
+and the per-miss serialization cost of the old Pydantic round trip versus
+encode_order.
+
+    python -m benchmarks.bench_order_reads --requests 5000 --items 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from httpx import AsyncClient
+from src.caching.redis_client import get_redis
+from src.core.config import settings
+from src.core.models import OrderResponse
+from src.core.serialization import encode_order
+from src.data.models import Order, OrderItem
+from src.main import app
+
+def make_order(items: int) -> Order:
+    now = datetime.now(timezone.utc)
+    return Order(
+        order_id=uuid.uuid4(),
+        customer_id=uuid.uuid4(),
+        shipping_address="123 Main St",
+        status="PENDING",
+        total_amount=Decimal("50.00") * items,
+        created_at=now,
+        updated_at=now,
+        items=[OrderItem(product_id=uuid.uuid4(), quantity=1, price=Decimal("50.00")) for _ in range(items)]
+    )
+
+class InMemoryOrderCache:
+    def __init__(self, orders):
+        self.entries = {str(order.order_id): encode_order(order) for order in orders}
+
+    async def get_cached_order_raw(self, order_id: str):
+        return self.entries.get(order_id)
+
+def bench_miss_serialization(order: Order, rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        # Previous miss path: validate, dump, parse, dump again for Redis
+        response_model = OrderResponse.model_validate(order)
+        order_dict = json.loads(response_model.model_dump_json())
+        json.dumps(order_dict, default=str)
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode_order(order)
+    after = time.perf_counter() - start
+
+    print(f"miss serialization, pydantic round trip: {rounds / before:10.0f} ops/s")
+    print(f"miss serialization, encode_order:        {rounds / after:10.0f} ops/s  ({before / after:.1f}x)")
+
+async def bench_cached_gets(order_ids, requests: int, concurrency: int, raw: bool) -> float:
+    settings.ORDER_CACHE_RAW_RESPONSES = raw
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        async def worker(offset: int):
+            for i in range(offset, requests, concurrency):
+                response = await client.get(f"/api/orders/{order_ids[i % len(order_ids)]}")
+                assert response.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+        return time.perf_counter() - start
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--items", type=int, default=5, help="line items per order")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    orders = [make_order(args.items) for _ in range(args.orders)]
+    bench_miss_serialization(orders[0], args.requests)
+
+    cache = InMemoryOrderCache(orders)
+    app.dependency_overrides[get_redis] = lambda: cache
+    order_ids = list(cache.entries)
+    try:
+        parsed = await bench_cached_gets(order_ids, args.requests, args.concurrency, raw=False)
+        raw = await bench_cached_gets(order_ids, args.requests, args.concurrency, raw=True)
+    finally:
+        app.dependency_overrides.clear()
+
+    print(f"cached GET, parsed + validated:          {args.requests / parsed:10.0f} req/s")
+    print(f"cached GET, raw response:                {args.requests / raw:10.0f} req/s  ({parsed / raw:.1f}x)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
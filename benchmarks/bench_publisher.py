@@ -0,0 +1,101 @@
+"""
+Publish throughput of OrderEventProducer at different channel pool sizes.
+
+For each pool size, `--concurrency` publishers each await one confirmed
+publish at a time (like concurrent create_order requests with the outbox
+off), then the same number of events go out as bursts through
+publish_events (like the outbox relay). Publishes go to a separate
+`orders.bench` exchange with a length-capped queue bound to it, so nothing
+reaches real consumers. Needs only RabbitMQ (RABBITMQ_URL).
+
+    python -m benchmarks.bench_publisher --pool-sizes 1 2 4 8 --concurrency 64
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+import aio_pika
+from src.core.config import settings
+from src.messaging.producer import ORDER_CREATED_ROUTING_KEY, OrderEventProducer, build_order_created_event
+
+BENCH_EXCHANGE = "orders.bench"
+BENCH_QUEUE = "orders.bench.sink"
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def order_data() -> dict:
+    return {
+        "order_id": uuid.uuid4(),
+        "customer_id": uuid.uuid4(),
+        "items": [{"product_id": uuid.uuid4(), "quantity": 1, "price": 50.0} for _ in range(3)],
+        "total_amount": 150.0,
+    }
+
+async def declare_sink():
+    connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
+    channel = await connection.channel()
+    exchange = await channel.declare_exchange(BENCH_EXCHANGE, aio_pika.ExchangeType.TOPIC, durable=True)
+    # Keeps publishes routable (no basic.return) without piling messages up on the broker
+    queue = await channel.declare_queue(BENCH_QUEUE, arguments={"x-max-length": 1000, "x-overflow": "drop-head"})
+    await queue.bind(exchange, routing_key="#")
+    return connection, exchange, queue
+
+async def run(pool_size: int, concurrency: int, events: int, burst_size: int):
+    settings.PUBLISHER_POOL_SIZE = pool_size
+    producer = OrderEventProducer(exchange_name=BENCH_EXCHANGE)
+    await producer.connect()
+    try:
+        latencies = []
+
+        async def publisher(count: int):
+            for _ in range(count):
+                start = time.perf_counter()
+                await producer.publish_order_created(order_data())
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(publisher(max(1, events // concurrency)) for _ in range(concurrency)))
+        single = len(latencies) / (time.perf_counter() - start)
+
+        bursts = [
+            [(ORDER_CREATED_ROUTING_KEY, build_order_created_event(order_data())) for _ in range(burst_size)]
+            for _ in range(max(1, events // burst_size))
+        ]
+        start = time.perf_counter()
+        for burst in bursts:
+            errors = await producer.publish_events(burst)
+            assert not any(errors), errors
+        burst_rate = sum(len(burst) for burst in bursts) / (time.perf_counter() - start)
+    finally:
+        await producer.close()
+
+    latencies.sort()
+    print(
+        f"{pool_size:>9} {single:12.0f} {percentile(latencies, 0.5):8.2f} "
+        f"{percentile(latencies, 0.99):8.2f} {burst_rate:12.0f}"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent single-event publishers")
+    parser.add_argument("--events", type=int, default=20000, help="events per mode and pool size")
+    parser.add_argument("--burst-size", type=int, default=100, help="events per publish_events call")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    connection, exchange, queue = await declare_sink()
+    try:
+        print(f"concurrency {args.concurrency}, bursts of {args.burst_size}, max in flight {settings.PUBLISHER_MAX_IN_FLIGHT}")
+        print(f"{'pool size':>9} {'single ev/s':>12} {'p50 ms':>8} {'p99 ms':>8} {'burst ev/s':>12}")
+        for pool_size in args.pool_sizes:
+            await run(pool_size, args.concurrency, args.events, args.burst_size)
+    finally:
+        await queue.delete(if_unused=False, if_empty=False)
+        await exchange.delete()
+        await connection.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
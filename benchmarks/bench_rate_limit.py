@@ -0,0 +1,91 @@
+"""
+Microbenchmark of rate limit checks: Redis round trips and latency per check.
+
+Compares the old fixed-window INCR/EXPIRE limiter with the scripted sliding
+window and token bucket limiters, with and without the local pre-check.
+Needs a Redis server (REDIS_URL, default redis://localhost:6379).
+
+    python -m benchmarks.bench_rate_limit --checks 5000 --clients 50 --limit 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from redis import asyncio as aioredis
+from src.caching.rate_limiter import RateLimiter
+
+class CountingRedis:
+    """Wraps a Redis client and counts commands sent (one round trip each, no pipelining here)."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.round_trips = 0
+        original = redis.execute_command
+
+        async def execute_command(*args, **kwargs):
+            self.round_trips += 1
+            return await original(*args, **kwargs)
+
+        redis.execute_command = execute_command
+
+class FixedWindowLimiter:
+    """The previous RedisClient.check_rate_limit implementation, for comparison."""
+
+    async def check(self, redis, identifier: str, limit: int, window: int) -> bool:
+        key = f"rate_limit:fixed:{identifier}"
+        current = await redis.incr(key)
+        if current == 1:
+            await redis.expire(key, window)
+        return current <= limit
+
+async def clear_bench_keys(redis):
+    async for key in redis.scan_iter(match="rate_limit:*bench-*"):
+        await redis.delete(key)
+
+async def run(name, limiter, counter: CountingRedis, checks: int, clients: int, limit: int, window: int):
+    await clear_bench_keys(counter.redis)
+    counter.round_trips = 0
+    latencies = []
+    rejected = 0
+    for i in range(checks):
+        start = time.perf_counter()
+        result = await limiter.check(counter.redis, f"bench-{i % clients}", limit, window)
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+        allowed = result if isinstance(result, bool) else result.allowed
+        rejected += not allowed
+
+    latencies.sort()
+    print(
+        f"{name:<30} {counter.round_trips / checks:8.2f} {statistics.mean(latencies):10.1f} "
+        f"{latencies[len(latencies) // 2]:10.1f} {latencies[int(len(latencies) * 0.99)]:10.1f} {rejected:9d}"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379"))
+    parser.add_argument("--checks", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=50, help="distinct client IPs")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--window", type=int, default=60)
+    args = parser.parse_args()
+
+    redis = await aioredis.from_url(args.redis_url, encoding="utf-8", decode_responses=True)
+    counter = CountingRedis(redis)
+    limiters = [
+        ("fixed window (INCR+EXPIRE)", FixedWindowLimiter()),
+        ("sliding window", RateLimiter("sliding_window", local_precheck=False)),
+        ("sliding window + precheck", RateLimiter("sliding_window", local_precheck=True)),
+        ("token bucket", RateLimiter("token_bucket", local_precheck=False)),
+        ("token bucket + precheck", RateLimiter("token_bucket", local_precheck=True)),
+    ]
+
+    print(f"{'limiter':<30} {'trips/op':>8} {'mean us':>10} {'p50 us':>10} {'p99 us':>10} {'rejected':>9}")
+    for name, limiter in limiters:
+        await run(name, limiter, counter, args.checks, args.clients, args.limit, args.window)
+
+    await clear_bench_keys(redis)
+    await redis.aclose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
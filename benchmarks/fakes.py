@@ -0,0 +1,103 @@
+"""
+In-process stand-ins for the service's backing services, for benchmarks that
+run without docker-compose:
+
+  * Redis:    fakeredis (with Lua, so the rate limiter scripts run as in production)
+  * RabbitMQ: InMemoryExchange for publishing, FakeIncomingMessage for consuming
+  * Postgres: SQLite through aiosqlite, or a real Postgres when one is at hand
+
+Install the extra packages with `pip install -r benchmarks/requirements.txt`.
+"""
+import asyncio
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Optional
+import fakeredis
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+@compiles(UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw):
+    # Stored as 32 hex characters, the non-native format of SQLAlchemy's Uuid type
+    return "CHAR(32)"
+
+def configure_sqlite(engine):
+    """
+    SQLite allows one writer at a time and makes the others poll for the lock,
+    which turns into multi-second tail latencies that vary from run to run.
+    Sharing one connection queues them in the pool instead.
+    """
+    sync_engine = engine.sync_engine
+    sync_engine.pool = AsyncAdaptedQueuePool(
+        sync_engine.pool._creator, pool_size=1, max_overflow=0, timeout=60, dialect=sync_engine.dialect
+    )
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        # Closer to Postgres' commit cost than SQLite's default fsync per transaction
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+def fake_redis(server: Optional[fakeredis.FakeServer] = None) -> fakeredis.FakeAsyncRedis:
+    """A FakeAsyncRedis configured like RedisClient.connect()."""
+    return fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer(), encoding="utf-8", decode_responses=True)
+
+class InMemoryExchange:
+    """
+    Stands in for an aio_pika exchange. Keeps a count per routing key rather
+    than the messages themselves, so long runs don't grow memory.
+    `latency_ms` simulates the broker round trip of a publish.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.published = Counter()
+
+    async def publish(self, message, routing_key: str, **kwargs):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        self.published[routing_key] += 1
+
+class FakeIncomingMessage:
+    """
+    The parts of aio_pika.IncomingMessage the consumer uses. Records when
+    the message was settled so delivery-to-ack latency can be measured.
+    """
+
+    def __init__(self, body: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None):
+        self.body = body
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        self.delivered_at = time.perf_counter()
+        self.settled = asyncio.Event()
+        self.settled_at = None
+        self.outcome = None
+
+    def _settle(self, outcome: str):
+        if self.outcome is None:
+            self.outcome = outcome
+            self.settled_at = time.perf_counter()
+            self.settled.set()
+
+    async def ack(self):
+        self._settle("ack")
+
+    async def nack(self, requeue: bool = True):
+        self._settle("nack")
+
+    async def reject(self, requeue: bool = False):
+        self._settle("reject")
+
+    @asynccontextmanager
+    async def process(self):
+        try:
+            yield self
+        except Exception:
+            await self.reject()
+            raise
+        await self.ack()
@@ -0,0 +1,72 @@
+"""Initial schema: orders, order_items and outbox as create_all used to make them
+
+Databases set up before migrations existed already have these tables, from
+Base.metadata.create_all at startup. They are adopted as they are: only
+missing tables and indexes are created, so `alembic upgrade head` works on
+both new and existing databases.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "orders" not in tables:
+        op.create_table(
+            "orders",
+            sa.Column("order_id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("customer_id", UUID(as_uuid=True), nullable=False),
+            sa.Column("shipping_address", sa.String(255), nullable=False),
+            sa.Column("status", sa.String(50), nullable=False),
+            sa.Column("total_amount", sa.Numeric(10, 2), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True)),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+    if "order_items" not in tables:
+        op.create_table(
+            "order_items",
+            sa.Column("item_id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("order_id", UUID(as_uuid=True), sa.ForeignKey("orders.order_id", ondelete="CASCADE"), nullable=False),
+            sa.Column("product_id", UUID(as_uuid=True), nullable=False),
+            sa.Column("quantity", sa.Integer, nullable=False),
+            sa.Column("price", sa.Numeric(10, 2), nullable=False),
+        )
+    if "outbox" not in tables:
+        op.create_table(
+            "outbox",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("event_type", sa.String(100), nullable=False),
+            sa.Column("routing_key", sa.String(255), nullable=False),
+            sa.Column("payload", sa.JSON, nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("sent_at", sa.DateTime(timezone=True)),
+        )
+
+    # create_all never added indexes to tables that already existed
+    order_indexes = {index["name"] for index in inspector.get_indexes("orders")} if "orders" in tables else set()
+    for name, columns in (
+        ("ix_orders_customer_id_created_at", ["customer_id", "created_at", "order_id"]),
+        ("ix_orders_status_created_at", ["status", "created_at", "order_id"]),
+        ("ix_orders_created_at", ["created_at", "order_id"]),
+    ):
+        if name not in order_indexes:
+            op.create_index(name, "orders", columns)
+    outbox_indexes = {index["name"] for index in inspector.get_indexes("outbox")} if "outbox" in tables else set()
+    if "ix_outbox_unsent" not in outbox_indexes:
+        op.create_index("ix_outbox_unsent", "outbox", ["created_at"], postgresql_where=sa.text("sent_at IS NULL"))
+
+def downgrade():
+    op.drop_table("outbox")
+    op.drop_table("order_items")
+    op.drop_table("orders")
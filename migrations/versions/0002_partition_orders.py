@@ -0,0 +1,142 @@
+"""Range-partition orders and order_items by the order's created_at
+
+The partition key has to be part of every unique constraint, so the
+primary keys become (order_id, created_at) and (item_id, order_created_at),
+and order_items gets its order's created_at to reference and partition by.
+The tables are rebuilt: the old ones are renamed, the new ones created (on
+Postgres, with partitions covering the existing rows and the coming
+periods), the rows copied over and the old tables dropped. This rewrites
+every order, so run it in a maintenance window on large databases.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+from src.data.partitions import ensure_partitions
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+ORDER_INDEXES = (
+    ("ix_orders_customer_id_created_at", ["customer_id", "created_at", "order_id"]),
+    ("ix_orders_status_created_at", ["status", "created_at", "order_id"]),
+    ("ix_orders_created_at", ["created_at", "order_id"]),
+)
+
+def _is_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+def _set_aside(table: str) -> str:
+    # Index names are unique per schema, so the old tables' indexes must not
+    # keep names the new tables use
+    old = f"{table}_unpartitioned"
+    op.rename_table(table, old)
+    if _is_postgres():
+        op.execute(f"ALTER INDEX {table}_pkey RENAME TO {old}_pkey")
+    return old
+
+def upgrade():
+    postgres = _is_postgres()
+    if postgres:
+        op.execute("ALTER TABLE order_items DROP CONSTRAINT IF EXISTS order_items_order_id_fkey")
+    for name, _ in ORDER_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    old_items = _set_aside("order_items")
+    old_orders = _set_aside("orders")
+
+    op.create_table(
+        "orders",
+        sa.Column("order_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("customer_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("shipping_address", sa.String(255), nullable=False),
+        sa.Column("status", sa.String(50), nullable=False),
+        sa.Column("total_amount", sa.Numeric(10, 2), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.PrimaryKeyConstraint("order_id", "created_at"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    for name, columns in ORDER_INDEXES:
+        op.create_index(name, "orders", columns)
+    op.create_table(
+        "order_items",
+        sa.Column("item_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("order_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("order_created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("product_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+        sa.PrimaryKeyConstraint("item_id", "order_created_at"),
+        sa.ForeignKeyConstraint(
+            ["order_id", "order_created_at"], ["orders.order_id", "orders.created_at"],
+            name="fk_order_items_order", ondelete="CASCADE"
+        ),
+        postgresql_partition_by="RANGE (order_created_at)",
+    )
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id", "order_created_at"])
+
+    # Orders without a created_at get their last update time, or now
+    op.execute(f"UPDATE {old_orders} SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL")
+    if postgres:
+        since = op.get_bind().execute(sa.text(f"SELECT min(created_at) FROM {old_orders}")).scalar()
+        ensure_partitions(op.get_bind(), since=since)
+
+    op.execute(
+        "INSERT INTO orders (order_id, created_at, customer_id, shipping_address, status, total_amount, updated_at) "
+        f"SELECT order_id, created_at, customer_id, shipping_address, status, total_amount, updated_at FROM {old_orders}"
+    )
+    op.execute(
+        "INSERT INTO order_items (item_id, order_id, order_created_at, product_id, quantity, price) "
+        "SELECT i.item_id, i.order_id, o.created_at, i.product_id, i.quantity, i.price "
+        f"FROM {old_items} i JOIN orders o ON o.order_id = i.order_id"
+    )
+    op.drop_table(old_items)
+    op.drop_table(old_orders)
+
+def downgrade():
+    # Partitioned tables keep their data in the partitions; the copy below
+    # reads through the parents, and dropping the parents drops the partitions
+    op.create_table(
+        "orders_unpartitioned",
+        sa.Column("order_id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("customer_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("shipping_address", sa.String(255), nullable=False),
+        sa.Column("status", sa.String(50), nullable=False),
+        sa.Column("total_amount", sa.Numeric(10, 2), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.execute(
+        "INSERT INTO orders_unpartitioned (order_id, customer_id, shipping_address, status, total_amount, created_at, updated_at) "
+        "SELECT order_id, customer_id, shipping_address, status, total_amount, created_at, updated_at FROM orders"
+    )
+    op.create_table(
+        "order_items_unpartitioned",
+        sa.Column("item_id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("order_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("product_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO order_items_unpartitioned (item_id, order_id, product_id, quantity, price) "
+        "SELECT item_id, order_id, product_id, quantity, price FROM order_items"
+    )
+    op.drop_table("order_items")
+    op.drop_table("orders")
+
+    op.rename_table("orders_unpartitioned", "orders")
+    op.rename_table("order_items_unpartitioned", "order_items")
+    if _is_postgres():
+        op.execute("ALTER INDEX orders_unpartitioned_pkey RENAME TO orders_pkey")
+        op.execute("ALTER INDEX order_items_unpartitioned_pkey RENAME TO order_items_pkey")
+        op.create_foreign_key(
+            "order_items_order_id_fkey", "order_items", "orders", ["order_id"], ["order_id"], ondelete="CASCADE"
+        )
+    for name, columns in ORDER_INDEXES:
+        op.create_index(name, "orders", columns)
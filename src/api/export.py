@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Optional, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.future import select
+from src.api.pagination import encode_cursor
+from src.core.config import settings
+from src.core.serialization import datetime_json, order_to_json_dict
+from src.data.database import AsyncReadSessionLocal
+from src.data.models import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = [
+    "order_id", "customer_id", "shipping_address", "status", "total_amount",
+    "created_at", "updated_at", "product_id", "quantity", "price", "cursor",
+]
+
+def _ndjson_chunk(orders, items_by_order) -> str:
+    lines = []
+    for order in orders:
+        record = order_to_json_dict(order, items_by_order.get(order.order_id, []))
+        record["cursor"] = encode_cursor(order.created_at, order.order_id)
+        lines.append(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+def _csv_chunk(orders, items_by_order, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for order in orders:
+        order_columns = [
+            order.order_id, order.customer_id, order.shipping_address, order.status, order.total_amount,
+            datetime_json(order.created_at), datetime_json(order.updated_at),
+        ]
+        cursor = encode_cursor(order.created_at, order.order_id)
+        # One row per line item; an order without items still gets a row
+        items = items_by_order.get(order.order_id) or [None]
+        for item in items:
+            item_columns = [item.product_id, item.quantity, item.price] if item else ["", "", ""]
+            writer.writerow(order_columns + item_columns + [cursor])
+    return buffer.getvalue()
+
+async def stream_orders_export(
+    export_format: str,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[str] = None,
+    after: Optional[Tuple[datetime, object]] = None,
+) -> AsyncIterator[str]:
+    """
+    Streams orders oldest first as NDJSON or CSV.
+
+    Orders are read through a server-side cursor in chunks of
+    ORDER_EXPORT_CHUNK_SIZE and their items are fetched with one IN query per
+    chunk, so memory stays flat however many rows are exported. Every record
+    carries the cursor of its own (created_at, order_id) position; passing the
+    last one received as `after` resumes an interrupted export.
+
+    Uses its own (read replica) session because the response body is produced
+    after the request's dependencies have already been torn down.
+    """
+    chunk_size = settings.ORDER_EXPORT_CHUNK_SIZE
+    stmt = select(
+        Order.order_id, Order.customer_id, Order.shipping_address, Order.status,
+        Order.total_amount, Order.created_at, Order.updated_at,
+    )
+    if created_from:
+        stmt = stmt.where(Order.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(Order.created_at < created_to)
+    if status:
+        stmt = stmt.where(Order.status == status)
+    if after:
+        stmt = stmt.where(tuple_(Order.created_at, Order.order_id) > tuple_(*after))
+    stmt = stmt.order_by(Order.created_at, Order.order_id).execution_options(yield_per=chunk_size)
+
+    exported = 0
+    async with AsyncReadSessionLocal() as session:
+        try:
+            result = await session.stream(stmt)
+            async for orders in result.partitions(chunk_size):
+                items_result = await session.execute(
+                    select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.price)
+                    .where(
+                        OrderItem.order_id.in_([order.order_id for order in orders]),
+                        # The chunk is sorted by created_at: only its partitions are searched
+                        OrderItem.order_created_at.between(orders[0].created_at, orders[-1].created_at)
+                    )
+                )
+                items_by_order = defaultdict(list)
+                for item in items_result:
+                    items_by_order[item.order_id].append(item)
+
+                if export_format == "csv":
+                    yield _csv_chunk(orders, items_by_order, header=exported == 0)
+                else:
+                    yield _ndjson_chunk(orders, items_by_order)
+                exported += len(orders)
+        except Exception as e:
+            # Headers are already sent; the client sees a truncated body and resumes from its last cursor
+            logger.error(f"Order export failed after {exported} orders: {e}")
+            raise
+
+    if export_format == "csv" and exported == 0:
+        yield _csv_chunk([], {}, header=True)
+    logger.info(f"Exported {exported} orders as {export_format}")
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from typing import Dict, Set
+from fastapi import APIRouter, Response, status
+from sqlalchemy import text
+from src.caching.redis_client import redis_client
+from src.core.config import settings
+from src.data.database import engine
+from src.messaging.producer import producer
+from src.messaging.worker import embedded_worker
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+OK = "ok"
+UNAVAILABLE = "unavailable"
+
+class StartupState:
+    def __init__(self):
+        # Set once every dependency is connected, cleared when shutdown begins
+        self.ready = False
+        self.seconds: Dict[str, float] = {}
+        # Optional dependencies that failed at startup and are being reconnected in the background
+        self.degraded: Set[str] = set()
+
+startup_state = StartupState()
+
+async def _check_database() -> bool:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return True
+
+async def _check_redis() -> bool:
+    return await redis_client.ping()
+
+def _connected(connection) -> bool:
+    return connection is not None and not connection.is_closed
+
+async def check_dependencies() -> Dict[str, str]:
+    """Probes the database and Redis (concurrently, each within HEALTH_CHECK_TIMEOUT_SECONDS) and reports RabbitMQ's connection state."""
+    probes = {"database": _check_database(), "redis": _check_redis()}
+    results = await asyncio.gather(
+        *(asyncio.wait_for(probe, settings.HEALTH_CHECK_TIMEOUT_SECONDS) for probe in probes.values()),
+        return_exceptions=True
+    )
+    checks = {}
+    for name, result in zip(probes, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Readiness check for {name} failed: {result!r}")
+        checks[name] = OK if result is True else UNAVAILABLE
+    checks["rabbitmq"] = OK if _connected(producer.connection) and producer.breaker.available else UNAVAILABLE
+    if settings.EMBEDDED_CONSUMER_ENABLED:
+        checks["consumer"] = OK if _connected(embedded_worker.connection) else UNAVAILABLE
+    return checks
+
+def required_checks() -> tuple:
+    # Redis failures are absorbed (cache misses, rate limiting fails open), and
+    # with the outbox on, so are RabbitMQ's; taking every replica out of
+    # rotation for them would turn a degraded service into an outage
+    return ("database",) if settings.OUTBOX_ENABLED else ("database", "rabbitmq")
+
+@router.get("/live")
+async def live():
+    """The process is up and its event loop responsive. Dependencies are not checked: a restart wouldn't fix them."""
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def ready(response: Response):
+    """200 once startup finished and the dependencies requests can't do without are reachable, 503 otherwise."""
+    checks = await check_dependencies()
+    is_ready = startup_state.ready and all(checks[name] == OK for name in required_checks())
+    if not is_ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if is_ready else "not_ready",
+        "checks": checks,
+        "startup_seconds": startup_state.seconds,
+        "degraded": sorted(startup_state.degraded),
+    }
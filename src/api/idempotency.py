@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+import json
+import uuid
+from typing import Optional
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from src.caching.redis_client import RedisClient
+from src.core.config import settings
+from src.core.metrics import IDEMPOTENT_REQUESTS
+
+# Clients retrying an order creation send the same Idempotency-Key header.
+# The first request with a key claims it in Redis and stores its response
+# there when done; a retry that arrives meanwhile waits for that response,
+# and a later retry gets it back straight from Redis, without touching the
+# database or the broker. A claim expires after IDEMPOTENCY_LOCK_TTL_SECONDS
+# so a crashed request doesn't block its key; a failed request gives its
+# claim up at once, so the client can retry.
+
+def request_fingerprint(body: BaseModel) -> str:
+    """Identifies a request body, so a key reused for a different request is caught."""
+    canonical = json.dumps(body.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class IdempotentRequest:
+    def __init__(self, redis: RedisClient, key: str, fingerprint: str):
+        self.redis = redis
+        self.key = key
+        self.fingerprint = fingerprint
+        # Unique to this request, so it only ever completes or releases its own claim
+        self.claim = json.dumps({"fingerprint": fingerprint, "token": uuid.uuid4().hex})
+
+    async def start(self) -> Optional[Response]:
+        """
+        Claims the key and returns None, in which case the caller handles the
+        request and then calls complete() or abandon(). If the key was used
+        before, returns its stored response instead, waiting for it while the
+        first request is still running.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS
+        delay = 0.01
+        while True:
+            existing = await self.redis.claim_idempotency_key(self.key, self.claim, settings.IDEMPOTENCY_LOCK_TTL_SECONDS)
+            if existing is None:
+                IDEMPOTENT_REQUESTS.labels("new").inc()
+                return None
+            record = json.loads(existing)
+            if record["fingerprint"] != self.fingerprint:
+                IDEMPOTENT_REQUESTS.labels("mismatch").inc()
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if "body" in record:
+                IDEMPOTENT_REQUESTS.labels("replayed").inc()
+                return Response(
+                    content=record["body"],
+                    status_code=record["status_code"],
+                    media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"}
+                )
+            # Still in flight; once its claim expires, the next attempt takes it over
+            if loop.time() + delay > deadline:
+                IDEMPOTENT_REQUESTS.labels("in_progress").inc()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": "1"}
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    async def complete(self, status_code: int, body: str):
+        """Stores the response that retries with this key get back."""
+        record = json.dumps({"fingerprint": self.fingerprint, "status_code": status_code, "body": body})
+        await self.redis.complete_idempotency_key(self.key, self.claim, record, settings.IDEMPOTENCY_TTL_SECONDS)
+
+    async def abandon(self):
+        await self.redis.release_idempotency_key(self.key, self.claim)
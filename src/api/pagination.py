@@ -0,0 +1,20 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+# Keyset cursors point at the last row of the previous page by its
+# (created_at, order_id) sort key. They are opaque to clients.
+
+def encode_cursor(created_at: datetime, order_id: uuid.UUID) -> str:
+    raw = f"{created_at.isoformat()}|{order_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Raises ValueError if the cursor is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(order_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -1,54 +1,148 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+import json
+import logging
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import ValidationError
+from sqlalchemy import tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from sqlalchemy.orm import selectinload
+from typing import Any, List, Optional
 
-from src.core.models import OrderCreate, OrderResponse, OrderItemResponse
-from src.data.database import get_db
+from src.api.export import stream_orders_export
+from src.api.idempotency import IdempotentRequest, request_fingerprint
+from src.api.pagination import decode_cursor, encode_cursor
+from src.api.status_stream import load_order_status, status_hub, stream_order_status
+from src.core.models import (
+    OrderCreate, OrderResponse, OrderItemResponse, OrderBatchResponse, OrderBatchResult, OrderPage,
+    OrderLookupRequest, OrderLookupResponse
+)
+from src.data.bulk import insert_orders
+from src.data.database import get_db, get_read_db
+from src.data.group_commit import order_committer
 from src.data.models import Order, OrderItem
-from src.messaging.producer import get_producer, OrderEventProducer
+from src.data.partitions import orders_by_id
+from src.messaging.outbox import add_order_created_event, add_order_created_events, outbox_relay
+from src.messaging.producer import get_producer, producer
 from src.caching.redis_client import get_redis, RedisClient
+from src.caching.single_flight import SingleFlight
+from src.core.admission import admission
 from src.core.config import settings
+from src.core.ids import new_order_id
+from src.core.metrics import ADMISSION_REJECTIONS, REQUEST_STAGE_SECONDS
+from src.core.serialization import encode_order
+from src.pricing.resolver import PriceLookupError, PriceResolver, get_price_resolver
+
+logger = logging.getLogger(__name__)
+
+order_loads = SingleFlight()
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
-@router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+async def _resolve_prices(resolver: PriceResolver, items) -> dict:
+    try:
+        return await resolver.resolve(item.product_id for item in items)
+    except PriceLookupError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Product catalog unavailable"
+        )
+
+def _unknown_products(order_in: OrderCreate, prices: dict) -> List[str]:
+    return sorted({str(item.product_id) for item in order_in.items if item.product_id not in prices})
+
+async def admit_order_write():
+    """
+    Admission control for the order write endpoints: refuses new work with
+    503 + Retry-After while the service is saturated, and counts admitted
+    requests as in flight until they complete.
+    """
+    # Inline publishing waits on RabbitMQ; with the outbox, the relay catches up later
+    broker_breaker = None if settings.OUTBOX_ENABLED else producer.breaker
+    reason = admission.rejection_reason(broker_breaker)
+    if reason:
+        ADMISSION_REJECTIONS.labels(reason).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service is overloaded, retry later",
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)}
+        )
+    admission.in_flight += 1
+    try:
+        yield
+    finally:
+        admission.in_flight -= 1
+
+@router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(admit_order_write)])
 async def create_order(
     request: Request,
     order_in: OrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     db: AsyncSession = Depends(get_db),
-    producer: OrderEventProducer = Depends(get_producer),
-    redis: RedisClient = Depends(get_redis)
+    redis: RedisClient = Depends(get_redis),
+    resolver: PriceResolver = Depends(get_price_resolver)
 ):
+    if idempotency_key is None:
+        return await _create_order(request, order_in, db, redis, resolver)
+
+    # A retry of a request already handled gets its response back before any
+    # rate limiting, DB or broker work; one still in flight is waited for
+    idempotent = IdempotentRequest(redis, idempotency_key, request_fingerprint(order_in))
+    with REQUEST_STAGE_SECONDS.time("create_order", "idempotency"):
+        replay = await idempotent.start()
+    if replay is not None:
+        return replay
+    try:
+        new_order = await _create_order(request, order_in, db, redis, resolver)
+    except BaseException:
+        # Nothing to replay; let the client's retry run the request again
+        await idempotent.abandon()
+        raise
+    body = encode_order(new_order)
+    await idempotent.complete(status.HTTP_201_CREATED, body)
+    return Response(content=body, status_code=status.HTTP_201_CREATED, media_type="application/json")
+
+async def _create_order(
+    request: Request,
+    order_in: OrderCreate,
+    db: AsyncSession,
+    redis: RedisClient,
+    resolver: PriceResolver
+) -> Order:
     # 1. Rate Limiting
     client_ip = request.client.host
-    allowed = await redis.check_rate_limit(
-        client_ip, 
-        limit=settings.API_RATE_LIMIT_REQUESTS, 
-        window=settings.API_RATE_LIMIT_WINDOW_SECONDS
-    )
+    with REQUEST_STAGE_SECONDS.time("create_order", "rate_limit"):
+        allowed = await redis.check_rate_limit(
+            client_ip,
+            limit=settings.API_RATE_LIMIT_REQUESTS,
+            window=settings.API_RATE_LIMIT_WINDOW_SECONDS
+        )
     if not allowed:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Too many requests"
         )
 
-    # 2. Create Order in DB
-    total_amount = 0
+    # 2. Resolve prices (one batched, cached catalog lookup) and create Order in DB
+    with REQUEST_STAGE_SECONDS.time("create_order", "price_lookup"):
+        prices = await _resolve_prices(resolver, order_in.items)
+    unknown = _unknown_products(order_in, prices)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown products: {', '.join(unknown)}"
+        )
+
+    temp_total = Decimal("0")
     db_items = []
-    
-    # Mocking price fetching logic
-    mock_prices = {
-        # UUIDs from example need to be handled, but for random UUIDs we just mock a price
-        # In real app, we'd query Product Service
-    }
-    
-    temp_total = 0
     for item in order_in.items:
-        # Assign a mock price if not exists
-        price = 50.00 
+        price = prices[item.product_id]
         temp_total += price * item.quantity
-        
+
         db_item = OrderItem(
             product_id=item.product_id,
             quantity=item.quantity,
@@ -56,65 +150,362 @@ async def create_order(
         )
         db_items.append(db_item)
     
+    # created_at is the time embedded in the id, which lookups by id rely on
+    order_id, created_at = new_order_id()
     new_order = Order(
+        order_id=order_id,
+        created_at=created_at,
+        updated_at=created_at,
         customer_id=order_in.customer_id,
         shipping_address=order_in.shipping_address,
         total_amount=temp_total,
         status="PENDING",
         items=db_items
     )
-    
-    db.add(new_order)
-    await db.commit()
-    await db.refresh(new_order)
 
-    # 3. Publish Event
     order_data = {
         "order_id": new_order.order_id,
         "customer_id": new_order.customer_id,
         "items": [
             {"product_id": i.product_id, "quantity": i.quantity, "price": float(i.price)} 
-            for i in new_order.items
+            for i in db_items
         ],
         "total_amount": float(new_order.total_amount)
     }
     
-    await producer.publish_order_created(order_data)
+    if settings.GROUP_COMMIT_ENABLED:
+        # Committed together with concurrent orders; timestamps come back via RETURNING
+        with REQUEST_STAGE_SECONDS.time("create_order", "db_commit"):
+            await order_committer.submit(new_order, order_data if settings.OUTBOX_ENABLED else None)
+    else:
+        db.add(new_order)
+        if settings.OUTBOX_ENABLED:
+            # The event commits atomically with the order; the relay publishes it
+            add_order_created_event(db, order_data)
+        with REQUEST_STAGE_SECONDS.time("create_order", "db_commit"):
+            await db.commit()
+        with REQUEST_STAGE_SECONDS.time("create_order", "db_refresh"):
+            await db.refresh(new_order)
+
+    # Write through so the first GET is already a cache hit
+    with REQUEST_STAGE_SECONDS.time("create_order", "cache_write"):
+        await redis.cache_order(new_order)
+
+    # 3. Publish Event
+    if settings.OUTBOX_ENABLED:
+        outbox_relay.notify()
+    else:
+        with REQUEST_STAGE_SECONDS.time("create_order", "publish"):
+            producer = await get_producer()
+            await producer.publish_order_created(order_data)
     
     return new_order
 
-@router.get("/{order_id}", response_model=OrderResponse)
-async def get_order(
-    order_id: str, # UUID as string
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'order'}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+@router.post(
+    "/batch", response_model=OrderBatchResponse, status_code=status.HTTP_207_MULTI_STATUS,
+    dependencies=[Depends(admit_order_write)]
+)
+async def create_orders_batch(
+    request: Request,
+    orders_in: List[Any] = Body(...),
     db: AsyncSession = Depends(get_db),
+    redis: RedisClient = Depends(get_redis),
+    resolver: PriceResolver = Depends(get_price_resolver)
+):
+    # 1. Rate Limiting (a batch counts as one request)
+    client_ip = request.client.host
+    allowed = await redis.check_rate_limit(
+        client_ip,
+        limit=settings.API_RATE_LIMIT_REQUESTS,
+        window=settings.API_RATE_LIMIT_WINDOW_SECONDS
+    )
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests"
+        )
+
+    if len(orders_in) > settings.ORDER_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds maximum of {settings.ORDER_BATCH_MAX_SIZE} orders"
+        )
+
+    # 2. Validate each order on its own so one bad entry doesn't reject the batch
+    results: List[OrderBatchResult] = []
+    order_rows = []
+    item_rows = []
+    events = []
+    accepted: List[OrderBatchResult] = []  # results of the orders that will be inserted
+
+    valid_orders = []
+    for index, raw_order in enumerate(orders_in):
+        try:
+            valid_orders.append((index, OrderCreate.model_validate(raw_order)))
+        except ValidationError as e:
+            results.append(OrderBatchResult(index=index, success=False, error=_format_validation_error(e)))
+
+    # 3. Resolve prices for every product in the batch with one lookup
+    prices = {}
+    if valid_orders:
+        try:
+            prices = await _resolve_prices(resolver, (item for _, order_in in valid_orders for item in order_in.items))
+        except HTTPException as e:
+            for index, _ in valid_orders:
+                results.append(OrderBatchResult(index=index, success=False, error=e.detail))
+            valid_orders = []
+
+    for index, order_in in valid_orders:
+        unknown = _unknown_products(order_in, prices)
+        if unknown:
+            results.append(OrderBatchResult(index=index, success=False, error=f"Unknown products: {', '.join(unknown)}"))
+            continue
+
+        # Ids and timestamps are generated here so rows need no refresh after insert
+        order_id, created_at = new_order_id()
+        temp_total = Decimal("0")
+        event_items = []
+        for item in order_in.items:
+            price = prices[item.product_id]
+            temp_total += price * item.quantity
+            item_rows.append({
+                "item_id": uuid.uuid4(),
+                "order_id": order_id,
+                "order_created_at": created_at,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "price": price,
+            })
+            event_items.append({"product_id": item.product_id, "quantity": item.quantity, "price": float(price)})
+
+        order_rows.append({
+            "order_id": order_id,
+            "customer_id": order_in.customer_id,
+            "shipping_address": order_in.shipping_address,
+            "status": "PENDING",
+            "total_amount": temp_total,
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        events.append({
+            "order_id": order_id,
+            "customer_id": order_in.customer_id,
+            "items": event_items,
+            "total_amount": float(temp_total)
+        })
+        result = OrderBatchResult(index=index, success=True, order_id=order_id)
+        accepted.append(result)
+        results.append(result)
+
+    results.sort(key=lambda r: r.index)
+    # 4. Insert all valid orders (and their outbox events) in one transaction
+    if order_rows:
+        try:
+            await insert_orders(db, order_rows, item_rows)
+            if settings.OUTBOX_ENABLED:
+                await add_order_created_events(db, events)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Batch insert of {len(order_rows)} orders failed: {e}")
+            for result in accepted:
+                result.success = False
+                result.order_id = None
+                result.error = "Failed to persist order"
+            accepted = []
+            events = []
+
+    # 5. Publish all events as one burst
+    if events and settings.OUTBOX_ENABLED:
+        outbox_relay.notify()
+    elif events:
+        producer = await get_producer()
+        errors = await producer.publish_order_created_many(events)
+        for result, error in zip(accepted, errors):
+            if error is not None:
+                logger.error(f"Failed to publish OrderCreated for order {result.order_id}: {error}")
+                result.error = "Order saved but OrderCreated event was not published"
+
+    created = sum(1 for r in results if r.success)
+    return OrderBatchResponse(created=created, failed=len(results) - created, results=results)
+
+@router.get("", response_model=OrderPage, include_in_schema=False)
+@router.get("/", response_model=OrderPage)
+async def list_orders(
+    customer_id: Optional[uuid.UUID] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.ORDER_PAGE_DEFAULT_SIZE, ge=1, le=settings.ORDER_PAGE_MAX_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Keyset pagination, newest first: each page is an index range scan
+    # starting right after the previous page's last (created_at, order_id),
+    # so deep pages cost the same as the first one.
+    stmt = select(Order).options(selectinload(Order.items))
+    if customer_id:
+        stmt = stmt.where(Order.customer_id == customer_id)
+    if status_filter:
+        stmt = stmt.where(Order.status == status_filter)
+    if cursor:
+        try:
+            after_created_at, after_order_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(tuple_(Order.created_at, Order.order_id) < tuple_(after_created_at, after_order_id))
+
+    # One extra row tells us whether there is a next page
+    stmt = stmt.order_by(Order.created_at.desc(), Order.order_id.desc()).limit(limit + 1)
+    result = await db.execute(stmt)
+    orders = result.scalars().all()
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].order_id)
+
+    return {"orders": orders, "next_cursor": next_cursor}
+
+@router.get("/export")
+async def export_orders(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    cursor: Optional[str] = None
+):
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_orders_export(export_format, created_from, created_to, status_filter, after),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=orders.{export_format}"}
+    )
+
+@router.post("/lookup", response_model=OrderLookupResponse)
+async def lookup_orders(
+    lookup: OrderLookupRequest,
+    db: AsyncSession = Depends(get_read_db),
     redis: RedisClient = Depends(get_redis)
 ):
-    # 1. Check Cache
-    cached_order = await redis.get_cached_order(order_id)
-    if cached_order:
-        return cached_order
+    # Duplicates are looked up once; the response keeps the order of first appearance
+    order_ids = list(dict.fromkeys(str(order_id) for order_id in lookup.order_ids))
+    if len(order_ids) > settings.ORDER_LOOKUP_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lookup exceeds maximum of {settings.ORDER_LOOKUP_MAX_SIZE} orders"
+        )
 
-    # 2. Fetch from DB
+    # 1. One MGET for everything not in L1
+    with REQUEST_STAGE_SECONDS.time("lookup_orders", "cache_lookup"):
+        payloads = await redis.get_cached_orders_raw(order_ids)
+
+    # 2. One IN query for the misses (items follow in one selectin query),
+    # then backfill the cache in one pipeline
+    missing = [uuid.UUID(order_id) for order_id in order_ids if order_id not in payloads]
+    if missing:
+        with REQUEST_STAGE_SECONDS.time("lookup_orders", "db_load"):
+            result = await db.execute(select(Order).where(orders_by_id(missing)))
+            orders = result.scalars().all()
+        with REQUEST_STAGE_SECONDS.time("lookup_orders", "cache_fill"):
+            payloads.update(await redis.cache_orders(orders, only_if_missing=True))
+
+    found = [payloads[order_id] for order_id in order_ids if order_id in payloads]
+    not_found = [order_id for order_id in order_ids if order_id not in payloads]
+    if settings.ORDER_CACHE_RAW_RESPONSES:
+        # Splice the cached bodies into the response without parsing them
+        content = '{"orders":[' + ",".join(found) + '],"not_found":' + json.dumps(not_found) + "}"
+        return Response(content=content, media_type="application/json")
+    return {"orders": [json.loads(payload) for payload in found], "not_found": not_found}
+
+def _order_json_response(payload: str):
+    if settings.ORDER_CACHE_RAW_RESPONSES:
+        # The cached body already is the OrderResponse JSON; send it as is
+        return Response(content=payload, media_type="application/json")
+    return json.loads(payload)
+
+async def _load_order(db: AsyncSession, redis: RedisClient, order_id: str):
     try:
         # UUID validation
-        stmt = select(Order).where(Order.order_id == order_id)
+        stmt = select(Order).where(orders_by_id([uuid.UUID(order_id)]))
         result = await db.execute(stmt)
         order = result.scalar_one_or_none()
     except Exception:
          raise HTTPException(status_code=400, detail="Invalid UUID format")
 
     if not order:
+        return None
+
+    # Serializes the order and fills the cache for the next reader.
+    # NX: a concurrent write-through from the primary beats a replica read.
+    return await redis.cache_order(order, only_if_missing=True)
+
+@router.get("/{order_id}/events")
+async def order_events(order_id: str, redis: RedisClient = Depends(get_redis)):
+    try:
+        order_id = str(uuid.UUID(order_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid UUID format")
+
+    # Without the subscription no change would reach the stream. The hub
+    # re-subscribes by itself, so refuse at once rather than wait on it here.
+    if not status_hub.subscribed:
+        raise HTTPException(status_code=503, detail="Order status events are unavailable", headers={"Retry-After": "5"})
+    # Each stream holds a connection open, so refuse new ones past the limit
+    # rather than run the process out of file descriptors. The slot is taken
+    # here, before anything is awaited, so a burst of requests can't all pass
+    # the check before any of them is counted.
+    if status_hub.connections >= settings.ORDER_EVENTS_MAX_CONNECTIONS:
+        raise HTTPException(status_code=503, detail="Too many open event streams", headers={"Retry-After": "5"})
+    subscription = status_hub.subscribe(order_id)
+    try:
+        current_status = await load_order_status(redis, order_id)
+    except Exception:
+        status_hub.unsubscribe(subscription)
+        raise
+    if current_status is None:
+        status_hub.unsubscribe(subscription)
         raise HTTPException(status_code=404, detail="Order not found")
 
-    # 3. Cache Result (serialize response model)
-    # We need to serialize the SQLAlchemy model to a dict compatible with Pydantic/JSON
-    # Using Pydantic model's dump method if available, or manual construction
-    
-    response_model = OrderResponse.model_validate(order)
-    order_dict = json.loads(response_model.model_dump_json())
-    
-    await redis.set_cached_order(str(order.order_id), order_dict, ttl=60)
+    return StreamingResponse(
+        stream_order_status(redis, subscription, current_status),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: stop nginx from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # The stream gives its slot back when it ends; this also covers a
+        # client that disconnects before the stream has started
+        background=BackgroundTask(status_hub.unsubscribe, subscription)
+    )
 
-    return order
+@router.get("/{order_id}", response_model=OrderResponse)
+async def get_order(
+    order_id: str, # UUID as string
+    db: AsyncSession = Depends(get_read_db),
+    redis: RedisClient = Depends(get_redis)
+):
+    # 1. Check Cache
+    with REQUEST_STAGE_SECONDS.time("get_order", "cache_lookup"):
+        cached_order = await redis.get_cached_order_raw(order_id)
+    if cached_order:
+        return _order_json_response(cached_order)
 
-import json
+    # 2. Fetch from DB and cache the result.
+    # Concurrent misses for the same order wait on a single query.
+    with REQUEST_STAGE_SECONDS.time("get_order", "db_load"):
+        order = await order_loads.do(order_id, lambda: _load_order(db, redis, order_id))
+
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    return _order_json_response(order)
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import AsyncIterator, Dict, Optional, Set
+from sqlalchemy.future import select
+from src.caching.redis_client import TERMINAL_ORDER_STATUSES, RedisClient, pubsub_messages, redis_client
+from src.core.config import settings
+from src.core.metrics import ORDER_EVENT_STREAMS, ORDER_EVENTS_DROPPED
+from src.data.database import AsyncReadSessionLocal
+from src.data.models import Order
+from src.data.partitions import orders_by_id
+
+logger = logging.getLogger(__name__)
+
+# Status changes reach the API processes over Redis pub/sub: the consumer
+# publishes every change once on ORDER_STATUS_CHANNEL, and each process keeps
+# a single subscription that relays changes to the streams it serves. An idle
+# stream is a dict entry, a small queue and a task parked on it, so a process
+# can hold thousands of them.
+
+# Queued in place of a status when changes may have been missed
+RESYNC = None
+
+class StatusSubscription:
+    def __init__(self, order_id: str):
+        self.order_id = order_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ORDER_EVENTS_QUEUE_SIZE)
+
+    def push(self, status: Optional[str]):
+        # Never blocks the relay: a reader that falls behind loses its oldest
+        # pending events, and the newest status, the one that matters, still arrives
+        if self.queue.full():
+            self.queue.get_nowait()
+            ORDER_EVENTS_DROPPED.inc()
+        self.queue.put_nowait(status)
+
+class OrderStatusHub:
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[StatusSubscription]] = {}
+        self._count = 0
+        self._listener_task = None
+        self._subscribed = None
+        ORDER_EVENT_STREAMS.labels().set_function(lambda: self._count)
+
+    @property
+    def connections(self) -> int:
+        return self._count
+
+    @property
+    def subscribed(self) -> bool:
+        """Whether the subscription to ORDER_STATUS_CHANNEL is currently up. The listener keeps re-subscribing by itself."""
+        return self._subscribed is not None and self._subscribed.is_set()
+
+    async def start(self):
+        """Subscribes to ORDER_STATUS_CHANNEL unless already subscribed; waits until it is."""
+        if not self._listener_task:
+            self._subscribed = asyncio.Event()
+            self._listener_task = asyncio.create_task(self._listen())
+        await asyncio.wait_for(self._subscribed.wait(), settings.ORDER_EVENTS_SUBSCRIBE_TIMEOUT_SECONDS)
+
+    async def stop(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+            await asyncio.gather(self._listener_task, return_exceptions=True)
+            self._listener_task = None
+
+    def subscribe(self, order_id: str) -> StatusSubscription:
+        subscription = StatusSubscription(order_id)
+        self._subscriptions.setdefault(order_id, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: StatusSubscription):
+        subscriptions = self._subscriptions.get(subscription.order_id)
+        if not subscriptions or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.order_id]
+        self._count -= 1
+
+    def dispatch(self, order_id: str, status: Optional[str]):
+        for subscription in self._subscriptions.get(order_id, ()):
+            subscription.push(status)
+
+    async def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                if not redis_client.redis:
+                    await redis_client.connect()
+                pubsub = redis_client.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(settings.ORDER_STATUS_CHANNEL)
+                # Anything published while we were not subscribed is lost, so
+                # every open stream re-reads its order
+                for order_id in list(self._subscriptions):
+                    self.dispatch(order_id, RESYNC)
+                self._subscribed.set()
+                logger.info("Listening for order status changes.")
+                async for message in pubsub_messages(pubsub):
+                    change = json.loads(message["data"])
+                    if change.get("order_id") and change.get("status"):
+                        self.dispatch(change["order_id"], change["status"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis status listener error: {e}")
+                self._subscribed.clear()
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+status_hub = OrderStatusHub()
+
+async def load_order_status(redis: RedisClient, order_id: str) -> Optional[str]:
+    """Current status of an order, from the cache if it is there. None if the order doesn't exist."""
+    cached = await redis.get_cached_order_raw(order_id)
+    if cached:
+        return json.loads(cached)["status"]
+    async with AsyncReadSessionLocal() as session:
+        result = await session.execute(select(Order.status).where(orders_by_id([uuid.UUID(order_id)])))
+        return result.scalar_one_or_none()
+
+def _sse_event(order_id: str, status: str) -> str:
+    return f"event: status\ndata: {json.dumps({'order_id': order_id, 'status': status})}\n\n"
+
+async def stream_order_status(redis: RedisClient, subscription: StatusSubscription, status: str) -> AsyncIterator[str]:
+    """
+    Yields the order's status as a server-sent event, then one event per
+    change until the order reaches a terminal status, with a comment line
+    every ORDER_EVENTS_HEARTBEAT_SECONDS to keep proxies from timing out.
+    Takes a subscription from status_hub.subscribe() and gives it up when done.
+    """
+    order_id = subscription.order_id
+    try:
+        # The status passed in may have come from a cache entry that a change
+        # published just before subscribing hadn't updated yet; re-read it once
+        subscription.push(RESYNC)
+        yield _sse_event(order_id, status)
+        while status not in TERMINAL_ORDER_STATUSES:
+            try:
+                new_status = await asyncio.wait_for(subscription.queue.get(), settings.ORDER_EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if new_status is RESYNC:
+                new_status = await load_order_status(redis, order_id)
+                if new_status is None:
+                    return
+            if new_status != status:
+                status = new_status
+                yield _sse_event(order_id, status)
+    finally:
+        status_hub.unsubscribe(subscription)
@@ -0,0 +1,65 @@
+from typing import Optional
+
+# An Idempotency-Key is stored at idempotency:<key>. While its first request
+# runs, the value is that request's claim (a JSON object unique to it); once
+# it completed, the value is the response to replay. Completing and
+# releasing compare the stored value with the claim, so a request whose claim
+# expired can't overwrite or delete a claim another request has since made.
+
+# Returns the stored value, or stores the claim and returns nil
+CLAIM_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    return existing
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return false
+"""
+
+COMPLETE_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing and existing ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def idempotency_redis_key(key: str) -> str:
+    return f"idempotency:{key}"
+
+class IdempotencyStore:
+    """The Redis side of Idempotency-Key handling: one EVALSHA per operation."""
+
+    def __init__(self):
+        self._scripts = {}
+        self._script_client = None
+
+    def _get_script(self, redis, source: str):
+        # Registered once per client; calls go out as EVALSHA
+        if self._script_client is not redis:
+            self._scripts = {}
+            self._script_client = redis
+        if source not in self._scripts:
+            self._scripts[source] = redis.register_script(source)
+        return self._scripts[source]
+
+    async def claim(self, redis, key: str, claim: str, ttl: int) -> Optional[str]:
+        """Stores `claim` unless the key is taken; returns the value already stored, or None once claimed."""
+        return await self._get_script(redis, CLAIM_SCRIPT)(keys=[idempotency_redis_key(key)], args=[claim, ttl])
+
+    async def complete(self, redis, key: str, claim: str, response: str, ttl: int) -> bool:
+        """Replaces our claim with the response to replay. False if someone else holds the key by now."""
+        script = self._get_script(redis, COMPLETE_SCRIPT)
+        return bool(await script(keys=[idempotency_redis_key(key)], args=[claim, response, ttl]))
+
+    async def release(self, redis, key: str, claim: str) -> bool:
+        """Drops our claim so a retry runs the request again."""
+        return bool(await self._get_script(redis, RELEASE_SCRIPT)(keys=[idempotency_redis_key(key)], args=[claim]))
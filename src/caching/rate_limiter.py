@@ -0,0 +1,116 @@
+import uuid
+import logging
+from typing import NamedTuple
+from src.caching.local_cache import LocalCache
+from src.core.metrics import RATE_LIMIT_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Both scripts read the clock from Redis (TIME) so API replicas with skewed
+# clocks still agree, and both run in a single EVALSHA round trip. They return
+# {allowed (0/1), retry_after_ms}.
+
+# Sliding window log: one sorted-set member per admitted request, scored by time.
+# Unlike a fixed window counter it can't admit 2x the limit across a window boundary.
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, 0}
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, math.max(1, tonumber(oldest[2]) + window - now)}
+"""
+
+# Token bucket: `limit` tokens refilled evenly over `window`; allows short bursts
+# up to the bucket size while holding the long-run rate.
+TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local rate = capacity / window
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = math.ceil((1 - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, retry_after}
+"""
+
+SCRIPTS = {
+    "sliding_window": SLIDING_WINDOW_SCRIPT,
+    "token_bucket": TOKEN_BUCKET_SCRIPT,
+}
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: float  # seconds until the next request could be admitted
+
+class RateLimiter:
+    """
+    Atomic, single-round-trip rate limiter backed by a Redis Lua script.
+
+    With local_precheck enabled, a client that Redis rejected is remembered
+    in-process until its retry_after has passed, and further requests in that
+    period are rejected without touching Redis. This never rejects a request
+    Redis would have admitted: the client stays over the limit until then.
+    """
+
+    def __init__(self, algorithm: str, local_precheck: bool = True, max_tracked_clients: int = 10000):
+        if algorithm not in SCRIPTS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.local_precheck = local_precheck
+        self._blocked = LocalCache(max_tracked_clients, ttl_seconds=3600) if local_precheck else None
+        self._script = None
+        self._script_client = None
+        self.local_rejections = 0
+
+    def _get_script(self, redis):
+        # Registered once per client; calls go out as EVALSHA
+        if self._script is None or self._script_client is not redis:
+            self._script = redis.register_script(SCRIPTS[self.algorithm])
+            self._script_client = redis
+        return self._script
+
+    async def check(self, redis, identifier: str, limit: int, window: int) -> RateLimitResult:
+        key = f"rate_limit:{self.algorithm}:{identifier}"
+        if self._blocked is not None and self._blocked.get(key):
+            self.local_rejections += 1
+            RATE_LIMIT_REJECTIONS.labels("local").inc()
+            return RateLimitResult(False, self._blocked.ttl_remaining(key))
+
+        script = self._get_script(redis)
+        window_ms = int(window * 1000)
+        args = [window_ms, limit]
+        if self.algorithm == "sliding_window":
+            args.append(uuid.uuid4().hex)  # Unique member, even for requests in the same millisecond
+        allowed, retry_after_ms = await script(keys=[key], args=args)
+
+        if allowed:
+            return RateLimitResult(True, 0.0)
+        RATE_LIMIT_REJECTIONS.labels("redis").inc()
+        retry_after = int(retry_after_ms) / 1000
+        if self._blocked is not None:
+            self._blocked.set(key, True, ttl=retry_after)
+        return RateLimitResult(False, retry_after)
@@ -1,40 +1,415 @@
 import json
+import asyncio
 import logging
+from typing import Dict, Iterable, List, Optional, Set
 from redis import asyncio as aioredis
+from src.caching.idempotency import IdempotencyStore
+from src.caching.local_cache import LocalCache
+from src.caching.rate_limiter import RateLimiter
+from src.core.circuit_breaker import CircuitBreaker
 from src.core.config import settings
+from src.core.metrics import CACHE_LOOKUPS, REDIS_ERRORS
+from src.core.serialization import encode_order
 
 logger = logging.getLogger(__name__)
 
+_l1_hits = CACHE_LOOKUPS.labels("l1", "hit")
+_l1_misses = CACHE_LOOKUPS.labels("l1", "miss")
+_redis_hits = CACHE_LOOKUPS.labels("redis", "hit")
+_redis_misses = CACHE_LOOKUPS.labels("redis", "miss")
+
+# A paid order never changes status again (see ALLOWED_PREVIOUS_STATUSES in
+# src/messaging/consumer.py), so it can stay cached longer. FAILED is not
+# final: a retried payment still moves the order to PROCESSING.
+TERMINAL_ORDER_STATUSES = ("PROCESSING",)
+
+async def pubsub_messages(pubsub):
+    """
+    Yields published messages forever. Unlike pubsub.listen(), waiting for
+    the next message isn't cut short by REDIS_SOCKET_TIMEOUT_SECONDS.
+    """
+    while True:
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=60)
+        if message is not None and message.get("type") == "message":
+            yield message
+
+def order_cache_ttl(status: str) -> int:
+    if status in TERMINAL_ORDER_STATUSES:
+        return settings.ORDER_CACHE_TERMINAL_TTL_SECONDS
+    return settings.ORDER_CACHE_TTL_SECONDS
+
 class RedisClient:
     def __init__(self):
         self.redis = None
+        # L1 holds the same JSON text as Redis, so callers always get a fresh dict
+        self.local_cache = (
+            LocalCache(settings.ORDER_L1_CACHE_MAX_SIZE, settings.ORDER_L1_CACHE_TTL_SECONDS)
+            if settings.ORDER_L1_CACHE_ENABLED else None
+        )
+        self._listener_task = None
+        # While Redis keeps failing, calls are skipped and treated like errors:
+        # reads miss, writes are dropped and rate limiting fails open
+        self.breaker = CircuitBreaker("redis")
+        self.rate_limiter = RateLimiter(settings.RATE_LIMIT_ALGORITHM, local_precheck=settings.RATE_LIMIT_LOCAL_PRECHECK)
+        self.idempotency = IdempotencyStore()
 
     async def connect(self):
         if not self.redis:
-            self.redis = await aioredis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+            self.redis = await aioredis.from_url(
+                settings.REDIS_URL, encoding="utf-8", decode_responses=True,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS
+            )
             logger.info("Connected to Redis.")
 
+    async def ping(self) -> bool:
+        """Whether Redis answers right now. Counts toward the circuit breaker like any other command."""
+        if not self.breaker.allow():
+            return False
+        if not self.redis:
+            await self.connect()
+        try:
+            await self.redis.ping()
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("ping").inc()
+            logger.error(f"Redis ping error: {e}")
+            return False
+        self.breaker.record_success()
+        return True
+
     async def close(self):
+        await self.stop_invalidation_listener()
         if self.redis:
             await self.redis.close()
 
-    async def get_cached_order(self, order_id: str):
+    async def get_cached_order_raw(self, order_id: str):
+        """Returns the cached order as its JSON response body, without parsing it."""
+        key = f"order:{order_id}"
+        if self.local_cache:
+            data = self.local_cache.get(key)
+            if data:
+                _l1_hits.inc()
+                return data
+            _l1_misses.inc()
+
+        if not self.breaker.allow():
+            return None
         if not self.redis:
             await self.connect()
         try:
-            data = await self.redis.get(f"order:{order_id}")
-            return json.loads(data) if data else None
+            data = await self.redis.get(key)
         except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("get").inc()
             logger.error(f"Redis get error: {e}")
             return None
+        self.breaker.record_success()
+        if not data:
+            _redis_misses.inc()
+            return None
+        _redis_hits.inc()
+        if self.local_cache:
+            self.local_cache.set(key, data)
+        return data
+
+    async def get_cached_orders_raw(self, order_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Returns {order_id: JSON body} for the orders that are cached, checking
+        L1 first and fetching everything else with one MGET.
+        """
+        found = {}
+        remaining = []
+        for order_id in order_ids:
+            if self.local_cache:
+                data = self.local_cache.get(f"order:{order_id}")
+                if data:
+                    _l1_hits.inc()
+                    found[order_id] = data
+                    continue
+                _l1_misses.inc()
+            remaining.append(order_id)
+        if not remaining:
+            return found
 
-    async def set_cached_order(self, order_id: str, data: dict, ttl: int = 60):
+        if not self.breaker.allow():
+            return found
         if not self.redis:
             await self.connect()
         try:
-            await self.redis.set(f"order:{order_id}", json.dumps(data, default=str), ex=ttl)
+            values = await self.redis.mget([f"order:{order_id}" for order_id in remaining])
         except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("mget").inc()
+            logger.error(f"Redis mget error: {e}")
+            return found
+        self.breaker.record_success()
+        for order_id, data in zip(remaining, values):
+            if not data:
+                _redis_misses.inc()
+                continue
+            _redis_hits.inc()
+            found[order_id] = data
+            if self.local_cache:
+                self.local_cache.set(f"order:{order_id}", data)
+        return found
+
+    async def get_cached_order(self, order_id: str):
+        data = await self.get_cached_order_raw(order_id)
+        return json.loads(data) if data else None
+
+    async def set_cached_order(self, order_id: str, data: dict, ttl: int = None, notify: bool = False):
+        await self.set_cached_order_raw(order_id, json.dumps(data, default=str), ttl=ttl, notify=notify)
+
+    async def set_cached_order_raw(self, order_id: str, payload: str, ttl: int = None, notify: bool = False, only_if_missing: bool = False):
+        """
+        Caches an order's JSON response body. With notify=True the write replaces
+        a changed order, so other API workers are told to drop their L1 copy.
+        With only_if_missing=True an existing entry wins (SET NX), so a read-path
+        fill from a lagging replica can't overwrite a newer write-through.
+        """
+        if not self.breaker.allow():
+            return
+        if not self.redis:
+            await self.connect()
+        key = f"order:{order_id}"
+        ttl = ttl or settings.ORDER_CACHE_TTL_SECONDS
+        try:
+            if notify:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.set(key, payload, ex=ttl)
+                    pipe.publish(settings.ORDER_INVALIDATION_CHANNEL, json.dumps({"order_id": str(order_id)}))
+                    await pipe.execute()
+                stored = True
+            else:
+                stored = await self.redis.set(key, payload, ex=ttl, nx=only_if_missing)
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("set").inc()
             logger.error(f"Redis set error: {e}")
+            return
+        self.breaker.record_success()
+        if stored and self.local_cache:
+            self.local_cache.set(key, payload, ttl)
+
+    async def cache_order(self, order, notify: bool = False, only_if_missing: bool = False) -> str:
+        """
+        Writes an Order through to the cache with a TTL based on its status.
+        Returns the JSON body, identical to the OrderResponse JSON.
+        """
+        payload = encode_order(order)
+        await self.set_cached_order_raw(
+            str(order.order_id), payload, ttl=order_cache_ttl(order.status),
+            notify=notify, only_if_missing=only_if_missing
+        )
+        return payload
+
+    async def cache_orders(self, orders, only_if_missing: bool = False) -> Dict[str, str]:
+        """
+        Writes several Orders through to the cache in one pipeline.
+        Returns {order_id: JSON body} for every order given.
+        """
+        payloads = {str(order.order_id): encode_order(order) for order in orders}
+        if not payloads:
+            return payloads
+
+        if not self.breaker.allow():
+            return payloads
+        if not self.redis:
+            await self.connect()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for order in orders:
+                    order_id = str(order.order_id)
+                    pipe.set(f"order:{order_id}", payloads[order_id], ex=order_cache_ttl(order.status), nx=only_if_missing)
+                stored = await pipe.execute()
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("set").inc()
+            logger.error(f"Redis pipeline set error: {e}")
+            return payloads
+        self.breaker.record_success()
+
+        if self.local_cache:
+            for order, was_stored in zip(orders, stored):
+                if was_stored:
+                    order_id = str(order.order_id)
+                    self.local_cache.set(f"order:{order_id}", payloads[order_id], order_cache_ttl(order.status))
+        return payloads
+
+    async def invalidate_orders(self, order_ids: Iterable[str]):
+        """
+        Drops cached copies of changed orders: the Redis entry and, through
+        pub/sub, the L1 entry in every API worker (this one included).
+        """
+        order_ids = [str(order_id) for order_id in order_ids]
+        if not order_ids:
+            return
+        if self.local_cache:
+            for order_id in order_ids:
+                self.local_cache.invalidate(f"order:{order_id}")
+
+        if not self.breaker.allow():
+            return
+        if not self.redis:
+            await self.connect()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.delete(*(f"order:{order_id}" for order_id in order_ids))
+                for order_id in order_ids:
+                    pipe.publish(settings.ORDER_INVALIDATION_CHANNEL, json.dumps({"order_id": order_id}))
+                await pipe.execute()
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("invalidate").inc()
+            logger.error(f"Redis invalidation error: {e}")
+            return
+        self.breaker.record_success()
+
+    async def publish_order_statuses(self, statuses: Dict[str, str]):
+        """
+        Announces status changes on ORDER_STATUS_CHANNEL, where every API
+        process relays them to its open order event streams.
+        """
+        if not statuses:
+            return
+        if not self.breaker.allow():
+            return
+        if not self.redis:
+            await self.connect()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for order_id, status in statuses.items():
+                    pipe.publish(settings.ORDER_STATUS_CHANNEL, json.dumps({"order_id": str(order_id), "status": status}))
+                await pipe.execute()
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("publish_status").inc()
+            logger.error(f"Redis status publish error: {e}")
+            return
+        self.breaker.record_success()
+
+    async def seen_event_ids(self, event_ids: List[str]) -> Set[str]:
+        """Which of the given event ids remember_event_ids() has recorded, with one MGET."""
+        if not event_ids or not self.breaker.allow():
+            return set()
+        if not self.redis:
+            await self.connect()
+        try:
+            values = await self.redis.mget([f"event:{event_id}" for event_id in event_ids])
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("dedup_get").inc()
+            logger.error(f"Redis event dedup lookup error: {e}")
+            return set()
+        self.breaker.record_success()
+        return {event_id for event_id, value in zip(event_ids, values) if value}
+
+    async def remember_event_ids(self, event_ids: List[str], ttl: int):
+        """Records event ids as processed for `ttl` seconds, in one pipeline."""
+        if not event_ids or not self.breaker.allow():
+            return
+        if not self.redis:
+            await self.connect()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for event_id in event_ids:
+                    pipe.set(f"event:{event_id}", 1, ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("dedup_set").inc()
+            logger.error(f"Redis event dedup write error: {e}")
+            return
+        self.breaker.record_success()
+
+    async def invalidate_order(self, order_id: str):
+        await self.invalidate_orders([order_id])
+
+    async def start_invalidation_listener(self):
+        if self.local_cache and not self._listener_task:
+            self._listener_task = asyncio.create_task(self._listen_for_invalidations())
+
+    async def stop_invalidation_listener(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+            await asyncio.gather(self._listener_task, return_exceptions=True)
+            self._listener_task = None
+
+    async def _listen_for_invalidations(self):
+        while True:
+            pubsub = None
+            try:
+                if not self.redis:
+                    await self.connect()
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(settings.ORDER_INVALIDATION_CHANNEL)
+                # Anything published while we were not subscribed is lost
+                self.local_cache.clear()
+                logger.info("Listening for order cache invalidations.")
+                async for message in pubsub_messages(pubsub):
+                    order_id = json.loads(message["data"]).get("order_id")
+                    if order_id:
+                        self.local_cache.invalidate(f"order:{order_id}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis invalidation listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+    def cache_stats(self) -> dict:
+        return {"l1": self.local_cache.stats() if self.local_cache else None}
+
+    async def claim_idempotency_key(self, key: str, claim: str, ttl: int) -> Optional[str]:
+        """
+        Claims an Idempotency-Key for a request. Returns what is already
+        stored under the key (another request's claim or its response), or
+        None when the key is ours. Also None when Redis is unavailable: the
+        request then runs unprotected rather than failing.
+        """
+        if not self.breaker.allow():
+            return None
+        if not self.redis:
+            await self.connect()
+        try:
+            existing = await self.idempotency.claim(self.redis, key, claim, ttl)
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("idempotency").inc()
+            logger.error(f"Redis idempotency claim error: {e}")
+            return None
+        self.breaker.record_success()
+        return existing
+
+    async def complete_idempotency_key(self, key: str, claim: str, response: str, ttl: int):
+        """Stores the response to replay for a claimed Idempotency-Key."""
+        if not self.breaker.allow():
+            return
+        try:
+            if not await self.idempotency.complete(self.redis, key, claim, response, ttl):
+                logger.warning(f"Idempotency-Key {key} was claimed by another request; response not stored")
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("idempotency").inc()
+            logger.error(f"Redis idempotency store error: {e}")
+            return
+        self.breaker.record_success()
+
+    async def release_idempotency_key(self, key: str, claim: str):
+        """Gives up a claimed Idempotency-Key after the request failed, so a retry runs it again."""
+        if not self.breaker.allow():
+            return
+        try:
+            await self.idempotency.release(self.redis, key, claim)
+        except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("idempotency").inc()
+            logger.error(f"Redis idempotency release error: {e}")
+            return
+        self.breaker.record_success()
 
     async def check_rate_limit(self, ip_address: str, limit: int, window: int) -> bool:
         """
@@ -42,21 +417,22 @@ class RedisClient:
         """
         if not settings.API_RATE_LIMIT_ENABLED:
             return True
-            
+
+        if not self.breaker.allow():
+            return True
         if not self.redis:
             await self.connect()
-            
-        key = f"rate_limit:{ip_address}"
+
         try:
-            # Simple fixed window counter
-            current = await self.redis.incr(key)
-            if current == 1:
-                await self.redis.expire(key, window)
-            
-            return current <= limit
+            # One EVALSHA round trip, or none when the local pre-check already knows
+            result = await self.rate_limiter.check(self.redis, ip_address, limit, window)
         except Exception as e:
+            self.breaker.record_failure()
+            REDIS_ERRORS.labels("rate_limit").inc()
             logger.error(f"Redis rate limit error: {e}")
             return True # Fail open to avoid blocking users on cache failure
+        self.breaker.record_success()
+        return result.allowed
 
 redis_client = RedisClient()
 
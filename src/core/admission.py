@@ -0,0 +1,67 @@
+import time
+from typing import Optional
+from src.core.config import settings
+from src.core.metrics import ADMISSION_IN_FLIGHT
+
+# Admission control for the write endpoints. Instead of letting requests
+# queue for a saturated connection pool or a slow broker until they time
+# out, new work is refused up front (503 + Retry-After) while:
+#   * ADMISSION_MAX_IN_FLIGHT write requests are already being handled,
+#   * recent DB pool checkouts waited longer than ADMISSION_DB_WAIT_MAX_MS
+#     on average (the pool is saturated), or
+#   * with the outbox off, recent publishes took longer than
+#     ADMISSION_PUBLISH_LATENCY_MAX_MS on average, or RabbitMQ's circuit
+#     breaker is open.
+
+class LatencyTracker:
+    """
+    Exponentially weighted moving average of recent latencies. Samples older
+    than ADMISSION_SIGNAL_WINDOW_SECONDS are forgotten, so a signal that
+    rejects traffic (and thereby stops its own samples) clears by itself and
+    lets new requests probe again.
+    """
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.average = 0.0
+        self.updated_at = float("-inf")
+
+    def observe(self, seconds: float):
+        now = time.monotonic()
+        if now - self.updated_at > settings.ADMISSION_SIGNAL_WINDOW_SECONDS:
+            self.average = seconds
+        else:
+            self.average += self.alpha * (seconds - self.average)
+        self.updated_at = now
+
+    def value(self) -> float:
+        if time.monotonic() - self.updated_at > settings.ADMISSION_SIGNAL_WINDOW_SECONDS:
+            return 0.0
+        return self.average
+
+class AdmissionController:
+    def __init__(self):
+        self.in_flight = 0
+        self.db_checkout_wait = LatencyTracker()  # fed by the DB pool
+        self.publish_latency = LatencyTracker()  # fed by the producer
+        ADMISSION_IN_FLIGHT.labels().set_function(lambda: self.in_flight)
+
+    def rejection_reason(self, broker_breaker=None) -> Optional[str]:
+        """
+        Why a new write request should be refused right now, or None to admit
+        it. Pass the broker's circuit breaker when the request publishes inline.
+        """
+        if not settings.ADMISSION_CONTROL_ENABLED:
+            return None
+        if self.in_flight >= settings.ADMISSION_MAX_IN_FLIGHT:
+            return "in_flight"
+        if self.db_checkout_wait.value() * 1000 > settings.ADMISSION_DB_WAIT_MAX_MS:
+            return "db_pool"
+        if broker_breaker is not None:
+            if not broker_breaker.available:
+                return "broker_unavailable"
+            if self.publish_latency.value() * 1000 > settings.ADMISSION_PUBLISH_LATENCY_MAX_MS:
+                return "publish_latency"
+        return None
+
+admission = AdmissionController()
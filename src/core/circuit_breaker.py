@@ -0,0 +1,75 @@
+import logging
+import time
+from typing import Optional
+from src.core.config import settings
+from src.core.metrics import CIRCUIT_BREAKER_SHORT_CIRCUITS, CIRCUIT_BREAKER_STATE
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Exported as the circuit_breaker_state gauge
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency that keeps failing, so callers fail fast
+    instead of each waiting for its own timeout.
+
+    Closed: calls go through. CIRCUIT_BREAKER_FAILURE_THRESHOLD failures in a
+    row open the breaker. Open: calls are refused for
+    CIRCUIT_BREAKER_RESET_SECONDS. Half-open: one trial call goes through;
+    its success closes the breaker, its failure opens it again.
+
+    Callers ask allow() before each call and report the outcome with
+    record_success() / record_failure().
+    """
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = settings.CIRCUIT_BREAKER_RESET_SECONDS if reset_timeout is None else reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._changed_at = 0.0
+        self._short_circuits = CIRCUIT_BREAKER_SHORT_CIRCUITS.labels(name)
+        CIRCUIT_BREAKER_STATE.labels(name).set_function(lambda: _STATE_VALUES[self.state])
+
+    def _reset_elapsed(self) -> bool:
+        # Also lets a new trial through when the last one never reported back
+        return time.monotonic() - self._changed_at >= self.reset_timeout
+
+    @property
+    def available(self) -> bool:
+        """Whether a call would be let through right now. Unlike allow(), doesn't start a trial."""
+        return self.state == CLOSED or self._reset_elapsed()
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self._reset_elapsed():
+            self._set_state(HALF_OPEN)
+            return True
+        self._short_circuits.inc()
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+            logger.info(f"Circuit breaker {self.name} closed")
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self._set_state(OPEN)
+            logger.warning(f"Circuit breaker {self.name} opened after {self.failures} failures; retrying in {self.reset_timeout}s")
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._changed_at = time.monotonic()
@@ -1,13 +1,98 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import PostgresDsn, RedisDsn, AmqpDsn
+from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DATABASE_READ_URL: Optional[str] = None
     REDIS_URL: str
     RABBITMQ_URL: str
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_BACKGROUND_POOL_SIZE: int = 5
+    DB_STATEMENT_CACHE_SIZE: int = 100
     API_RATE_LIMIT_ENABLED: bool = True
     API_RATE_LIMIT_REQUESTS: int = 5
     API_RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_ALGORITHM: str = "sliding_window"  # "sliding_window" or "token_bucket"
+    RATE_LIMIT_LOCAL_PRECHECK: bool = True
+    ORDER_BATCH_MAX_SIZE: int = 500
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_MAX_DELAY_MS: float = 2.0
+    GROUP_COMMIT_MAX_BATCH: int = 100
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_TTL_SECONDS: int = 30
+    IDEMPOTENCY_WAIT_TIMEOUT_SECONDS: float = 10.0
+    ORDER_PAGE_DEFAULT_SIZE: int = 50
+    ORDER_PAGE_MAX_SIZE: int = 200
+    ORDER_EXPORT_CHUNK_SIZE: int = 1000
+    ORDER_LOOKUP_MAX_SIZE: int = 500
+    ORDER_PARTITION_INTERVAL: str = "month"  # "day", "week" or "month"
+    ORDER_PARTITION_PREMAKE: int = 3
+    ORDER_PARTITION_RETENTION_DAYS: int = 0  # 0 keeps every partition
+    ORDER_PARTITION_CHECK_INTERVAL_SECONDS: float = 3600
+    ORDER_ARCHIVE_SCHEMA: str = "archive"
+    PRICE_CATALOG_BACKEND: str = "local"  # "local" or "http"
+    PRODUCT_CATALOG_URL: Optional[str] = None
+    PRICE_CATALOG_TIMEOUT_SECONDS: float = 2.0
+    PRICE_CACHE_TTL_SECONDS: float = 300
+    PRICE_CACHE_STALE_SECONDS: float = 3600
+    PRICE_CACHE_MAX_SIZE: int = 10000
+    LOCAL_CATALOG_DEFAULT_PRICE: str = "50.00"
+    PUBLISHER_POOL_SIZE: int = 4
+    EVENT_ENCODING: str = "json"  # "json" or "msgpack"
+    EVENT_COMPRESSION_THRESHOLD_BYTES: int = 0  # 0 disables compression
+    EVENT_COMPRESSION_LEVEL: int = 6
+    PUBLISHER_MAX_IN_FLIGHT: int = 1000
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_RETENTION_HOURS: int = 24
+    ORDER_CACHE_TTL_SECONDS: int = 60
+    ORDER_CACHE_TERMINAL_TTL_SECONDS: int = 600
+    ORDER_CACHE_RAW_RESPONSES: bool = True
+    ORDER_L1_CACHE_ENABLED: bool = True
+    ORDER_L1_CACHE_MAX_SIZE: int = 1000
+    ORDER_L1_CACHE_TTL_SECONDS: float = 5.0
+    ORDER_INVALIDATION_CHANNEL: str = "order-invalidations"
+    ORDER_STATUS_CHANNEL: str = "order-status"
+    ORDER_EVENTS_MAX_CONNECTIONS: int = 10000
+    ORDER_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    ORDER_EVENTS_QUEUE_SIZE: int = 4
+    ORDER_EVENTS_SUBSCRIBE_TIMEOUT_SECONDS: float = 5.0
+    CONSUMER_MODE: str = "single"  # "single" or "batch"
+    CONSUMER_PREFETCH_COUNT: int = 200
+    CONSUMER_CONCURRENCY: int = 2
+    CONSUMER_BATCH_SIZE: int = 100
+    CONSUMER_BATCH_WINDOW_MS: int = 50
+    CONSUMER_DRAIN_TIMEOUT_SECONDS: float = 30.0
+    CONSUMER_DEDUP_ENABLED: bool = True
+    CONSUMER_DEDUP_LOCAL_SIZE: int = 10000
+    CONSUMER_DEDUP_TTL_SECONDS: int = 86400
+    EMBEDDED_CONSUMER_ENABLED: bool = True
+    CONSUMER_SHARD_COUNT: int = 16
+    WORKER_INDEX: int = 0
+    WORKER_COUNT: int = 1
+    METRICS_ENABLED: bool = True
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 256
+    ADMISSION_DB_WAIT_MAX_MS: float = 250.0
+    ADMISSION_PUBLISH_LATENCY_MAX_MS: float = 1000.0
+    ADMISSION_SIGNAL_WINDOW_SECONDS: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_SECONDS: float = 10.0
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 1.0
+    RABBITMQ_PUBLISH_TIMEOUT_SECONDS: float = 5.0
+    STARTUP_RETRY_ATTEMPTS: int = 5
+    STARTUP_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    STARTUP_RETRY_MAX_DELAY_SECONDS: float = 5.0
+    STARTUP_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 1.0
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -0,0 +1,35 @@
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+# Order ids are UUIDv7 (RFC 9562): the first 48 bits are the creation time in
+# Unix milliseconds, the rest random. Ids therefore sort by creation time,
+# so new rows land at the right edge of the primary key index instead of all
+# over it, and an order's created_at (its partition key) can be read back
+# from its id. Ids from before the switch are UUIDv4 and carry no time.
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def uuid7(timestamp_ms: Optional[int] = None) -> uuid.UUID:
+    if timestamp_ms is None:
+        timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76  # version
+    value |= (rand >> 62 & 0xFFF) << 64  # rand_a
+    value |= 0b10 << 62  # variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF  # rand_b
+    return uuid.UUID(int=value)
+
+def uuid7_time(value: uuid.UUID) -> Optional[datetime]:
+    """The creation time (UTC, millisecond precision) embedded in a UUIDv7, None for other versions."""
+    if value.version != 7:
+        return None
+    return _EPOCH + timedelta(milliseconds=value.int >> 80)
+
+def new_order_id() -> Tuple[uuid.UUID, datetime]:
+    """A new order id and the created_at that goes with it."""
+    order_id = uuid7()
+    return order_id, uuid7_time(order_id)
@@ -0,0 +1,346 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from src.core.config import settings
+
+# Minimal in-process metrics with Prometheus text exposition.
+#
+# Everything runs on the event loop thread, so no locking is needed. Each
+# update is a tuple lookup and an add; with METRICS_ENABLED=false every update
+# returns immediately and timers don't read the clock.
+
+# Seconds; covers sub-millisecond cache hits up to multi-second stalls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List["_Metric"] = []
+
+    def _register(self, metric: "_Metric") -> "_Metric":
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> "Counter":
+        return self._register(Counter(self, name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> "Gauge":
+        return self._register(Gauge(self, name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> "Histogram":
+        return self._register(Histogram(self, name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labels: Sequence[str]):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """The child for one combination of label values, created on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def reset(self):
+        # Zeroed in place: modules keep references to the children they use
+        for child in self._children.values():
+            child.reset()
+
+class _CounterChild:
+    __slots__ = ("registry", "value")
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        if self.registry.enabled:
+            self.value += amount
+
+    def reset(self):
+        self.value = 0.0
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self.registry)
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}"
+            for values, child in self._children.items()
+        ]
+
+class _GaugeChild:
+    __slots__ = ("registry", "value", "function")
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1):
+        if self.registry.enabled:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        if self.registry.enabled:
+            self.value -= amount
+
+    def set(self, value: float):
+        if self.registry.enabled:
+            self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Reads the value from `function` at scrape time, e.g. a pool's checked-out count."""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function else self.value
+
+    def reset(self):
+        self.value = 0.0
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(self.registry)
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.get())}"
+            for values, child in self._children.items()
+        ]
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: "_HistogramChild"):
+        self.child = child
+        self.start = None
+
+    def __enter__(self):
+        if self.child.registry.enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            self.child.observe(time.perf_counter() - self.start)
+            self.start = None
+        return False
+
+class _HistogramChild:
+    __slots__ = ("registry", "bounds", "bucket_counts", "sum", "count")
+
+    def __init__(self, registry: MetricsRegistry, bounds: Tuple[float, ...]):
+        self.registry = registry
+        self.bounds = bounds
+        self.bucket_counts = [0] * (len(bounds) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if not self.registry.enabled:
+            return
+        # Buckets are upper bounds inclusive, as in Prometheus
+        self.bucket_counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        """Context manager observing the time spent in its block."""
+        return _Timer(self)
+
+    def reset(self):
+        self.bucket_counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labels: Sequence[str], buckets: Sequence[float]):
+        super().__init__(registry, name, documentation, labels)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.registry, self.bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self, *values: str) -> _Timer:
+        return self.labels(*values).time()
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.bounds + (float("inf"),), child.bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {cumulative}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+registry = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+# API
+REQUEST_STAGE_SECONDS = registry.histogram(
+    "order_request_stage_seconds", "Time spent in each stage of an order request.", ["operation", "stage"]
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds", "End-to-end time of HTTP requests, by endpoint function and status code.", ["endpoint", "status"]
+)
+ADMISSION_REJECTIONS = registry.counter(
+    "admission_rejections_total", "Write requests refused with 503 by admission control, by reason.", ["reason"]
+)
+ADMISSION_IN_FLIGHT = registry.gauge("admission_in_flight_requests", "Write requests currently admitted.")
+IDEMPOTENT_REQUESTS = registry.counter(
+    "idempotent_requests_total",
+    "Order creations carrying an Idempotency-Key, by outcome (new, replayed, in_progress, mismatch).",
+    ["outcome"]
+)
+
+# Dependencies
+STARTUP_SECONDS = registry.gauge(
+    "startup_seconds",
+    "Time the process took to start, by stage (imports, database, redis, rabbitmq_producer, rabbitmq_consumer, total).",
+    ["stage"]
+)
+CIRCUIT_BREAKER_STATE = registry.gauge(
+    "circuit_breaker_state", "Circuit breaker state per dependency: 0 closed, 1 half-open, 2 open.", ["dependency"]
+)
+CIRCUIT_BREAKER_SHORT_CIRCUITS = registry.counter(
+    "circuit_breaker_short_circuits_total", "Calls skipped because the dependency's circuit breaker was open.", ["dependency"]
+)
+
+# Cache and rate limiting
+CACHE_LOOKUPS = registry.counter(
+    "order_cache_lookups_total", "Order cache lookups by layer (l1, redis) and result (hit, miss).", ["layer", "result"]
+)
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter, by where the decision was made.", ["source"]
+)
+REDIS_ERRORS = registry.counter("redis_errors_total", "Redis commands that failed.", ["operation"])
+
+# Order status streams
+ORDER_EVENT_STREAMS = registry.gauge("order_event_streams", "Open order status event streams in this process.")
+ORDER_EVENTS_DROPPED = registry.counter(
+    "order_events_dropped_total", "Status events dropped because a stream's reader fell behind."
+)
+
+# Database
+DB_POOL_CHECKOUT_SECONDS = registry.histogram(
+    "db_pool_checkout_seconds", "Time to get a connection from the pool, including any wait for a free one.", ["engine"]
+)
+DB_POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out_connections", "Connections currently checked out.", ["engine"])
+GROUP_COMMIT_BATCH_SIZE = registry.histogram(
+    "group_commit_batch_size", "Orders written per group-commit transaction.", buckets=SIZE_BUCKETS
+)
+
+# Messaging
+EVENTS_PUBLISHED = registry.counter("events_published_total", "Events published to RabbitMQ.", ["routing_key", "result"])
+PUBLISH_SECONDS = registry.histogram("event_publish_seconds", "Time to publish one event or burst of events.", ["kind"])
+CONSUMER_MESSAGES = registry.counter(
+    "consumer_messages_total", "PaymentProcessed messages handled, by result (updated, unchanged, duplicate, ignored, failed).", ["result"]
+)
+CONSUMER_PROCESSING_SECONDS = registry.histogram(
+    "consumer_processing_seconds", "Time to apply one message (single mode) or one batch (batch mode).", ["mode"]
+)
+CONSUMER_BATCH_SIZE = registry.histogram("consumer_batch_size", "Messages per applied batch.", buckets=SIZE_BUCKETS)
+CONSUMER_IN_FLIGHT = registry.gauge("consumer_in_flight_messages", "Messages received but not yet acked.")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+class RequestTimingMiddleware:
+    """
+    ASGI middleware observing REQUEST_SECONDS for every HTTP request. Plain
+    ASGI rather than BaseHTTPMiddleware, which would add a task and a
+    memory stream to each request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched endpoint in the shared scope
+            endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            REQUEST_SECONDS.labels(endpoint, str(status_code)).observe(time.perf_counter() - start)
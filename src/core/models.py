@@ -35,3 +35,25 @@ class OrderResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class OrderBatchResult(BaseModel):
+    index: int
+    success: bool
+    order_id: Optional[UUID] = None
+    error: Optional[str] = None
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchResult]
+
+class OrderPage(BaseModel):
+    orders: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+class OrderLookupRequest(BaseModel):
+    order_ids: List[UUID]
+
+class OrderLookupResponse(BaseModel):
+    orders: List[OrderResponse]
+    not_found: List[UUID]
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+async def retry_with_backoff(
+    operation: Callable[[], Awaitable[T]],
+    name: str,
+    attempts: Optional[int] = None,
+    base_delay: Optional[float] = None,
+    max_delay: Optional[float] = None,
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    Runs `operation` until it succeeds, at most `attempts` times (default
+    STARTUP_RETRY_ATTEMPTS), each attempt limited to `timeout` seconds.
+    Between attempts it sleeps with exponential backoff, capped at
+    `max_delay` and jittered so replicas starting together don't retry in
+    lockstep. Re-raises the last error once the attempts are used up.
+    """
+    attempts = attempts or settings.STARTUP_RETRY_ATTEMPTS
+    base_delay = settings.STARTUP_RETRY_BASE_DELAY_SECONDS if base_delay is None else base_delay
+    max_delay = settings.STARTUP_RETRY_MAX_DELAY_SECONDS if max_delay is None else max_delay
+    timeout = timeout or settings.STARTUP_CONNECT_TIMEOUT_SECONDS
+    for attempt in range(1, attempts + 1):
+        try:
+            return await asyncio.wait_for(operation(), timeout)
+        except Exception as e:
+            if attempt == attempts:
+                logger.error(f"{name} failed after {attempts} attempts: {e!r}")
+                raise
+            cap = min(max_delay, base_delay * 2 ** (attempt - 1))
+            delay = cap / 2 + random.uniform(0, cap / 2)
+            logger.warning(f"{name} failed (attempt {attempt}/{attempts}): {e!r}; retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
@@ -0,0 +1,44 @@
+import json
+from datetime import datetime
+
+# Produces the same JSON as OrderResponse.model_dump_json() in a single pass
+# over the ORM object: no Pydantic model is built and no intermediate JSON is
+# parsed. Keep the field order in sync with OrderResponse.
+
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+def datetime_json(value: datetime):
+    if value is None:
+        return None
+    text = value.isoformat()
+    # Pydantic writes UTC as "Z"
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+def order_to_json_dict(order, items=None) -> dict:
+    """
+    Converts an Order to a dict of JSON-native values (str for UUID/Decimal/datetime).
+    Works on anything with Order's attributes, such as Core result rows; pass
+    `items` when the object has no loaded items relationship.
+    """
+    items = order.items if items is None else items
+    return {
+        "order_id": str(order.order_id),
+        "customer_id": str(order.customer_id),
+        "items": [
+            {
+                "product_id": str(item.product_id),
+                "quantity": item.quantity,
+                "price": str(item.price),
+            }
+            for item in items
+        ],
+        "shipping_address": order.shipping_address,
+        "status": order.status,
+        "total_amount": str(order.total_amount),
+        "created_at": datetime_json(order.created_at),
+        "updated_at": datetime_json(order.updated_at),
+    }
+
+def encode_order(order) -> str:
+    """Serializes an Order straight to the OrderResponse JSON body."""
+    return _encoder.encode(order_to_json_dict(order))
@@ -0,0 +1,29 @@
+from typing import List
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.data.models import Order, OrderItem
+
+# Postgres caps a single statement at 32767 bind parameters, so multi-row
+# VALUES inserts are split into chunks that stay well below that limit.
+MAX_ROWS_PER_INSERT = 1000
+
+def _chunks(rows: List[dict], size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+async def insert_rows(session: AsyncSession, table, rows: List[dict]):
+    """
+    Inserts rows with multi-row INSERT ... VALUES statements.
+    Every row must carry the same keys, including primary keys and timestamps,
+    so no per-row RETURNING/refresh is needed afterwards.
+    """
+    for chunk in _chunks(rows, MAX_ROWS_PER_INSERT):
+        await session.execute(insert(table).values(chunk))
+
+async def insert_orders(session: AsyncSession, order_rows: List[dict], item_rows: List[dict]):
+    """
+    Inserts orders and their items in the caller's transaction.
+    Orders go first so the order_items foreign key is satisfied.
+    """
+    await insert_rows(session, Order.__table__, order_rows)
+    await insert_rows(session, OrderItem.__table__, item_rows)
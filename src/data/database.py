@@ -1,12 +1,100 @@
+import time
+from typing import Optional
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.core.admission import admission
 from src.core.config import settings
+from src.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_SECONDS
 
-engine = create_async_engine(str(settings.DATABASE_URL), echo=True)
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async pool, recording how long each checkout takes (labelled
+    by the pool's logging name). SQLAlchemy has no public hook that fires
+    before a checkout starts waiting, so this wraps the private _do_get; it
+    is written against SQLAlchemy 2.0 (pinned in requirements.txt), and
+    _engine_options falls back to the plain pool if _do_get goes away.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self._observe_checkout(time.perf_counter() - start)
+
+    def _observe_checkout(self, seconds: float):
+        DB_POOL_CHECKOUT_SECONDS.labels(self._orig_logging_name).observe(seconds)
+
+class WritePoolQueuePool(InstrumentedQueuePool):
+    """The primary engine's pool: its checkout waits are what order writes queue on, so they also feed admission control."""
+
+    def _observe_checkout(self, seconds: float):
+        super()._observe_checkout(seconds)
+        admission.db_checkout_wait.observe(seconds)
+
+_CAN_INSTRUMENT = callable(getattr(AsyncAdaptedQueuePool, "_do_get", None))
+
+def _engine_options(url: str, name: str = "primary", pool_size: Optional[int] = None) -> dict:
+    """Engine profile from Settings: pool sizing, connection health and statement cache."""
+    options = {"echo": settings.DB_ECHO}
+    if url.startswith("sqlite"):
+        # SQLite uses its own pool classes; the sizing knobs don't apply
+        return options
+
+    options.update(
+        pool_size=pool_size or settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if _CAN_INSTRUMENT:
+        options["poolclass"] = WritePoolQueuePool if name == "primary" else InstrumentedQueuePool
+    options["pool_logging_name"] = name
+    if "+asyncpg" in url:
+        # Per-connection LRU of prepared statements; 0 disables it (needed behind pgbouncer in transaction mode)
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+def _track_checked_out(engine, name: str):
+    # SQLite's pools don't count checkouts
+    if hasattr(engine.pool, "checkedout"):
+        DB_POOL_CHECKED_OUT.labels(name).set_function(lambda: engine.pool.checkedout())
+
+engine = create_async_engine(str(settings.DATABASE_URL), **_engine_options(str(settings.DATABASE_URL), "primary"))
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# The consumer, the outbox relay and other background work get their own pool
+# on the primary, so they can neither take the connections order writes need
+# nor make admission control refuse writes while they are busy. SQLite allows
+# one writer at a time, so there it shares the primary engine.
+if str(settings.DATABASE_URL).startswith("sqlite"):
+    background_engine = engine
+else:
+    background_engine = create_async_engine(
+        str(settings.DATABASE_URL),
+        **_engine_options(str(settings.DATABASE_URL), "background", settings.DB_BACKGROUND_POOL_SIZE)
+    )
+    _track_checked_out(background_engine, "background")
+BackgroundSessionLocal = async_sessionmaker(background_engine, expire_on_commit=False, class_=AsyncSession)
+
+# Read-only traffic goes to DATABASE_READ_URL (e.g. a streaming replica) when set,
+# otherwise it shares the primary engine. Writes and background work stay on the primary.
+if settings.DATABASE_READ_URL:
+    read_engine = create_async_engine(str(settings.DATABASE_READ_URL), **_engine_options(str(settings.DATABASE_READ_URL), "replica"))
+    _track_checked_out(read_engine, "replica")
+else:
+    read_engine = engine
+_track_checked_out(engine, "primary")
+AsyncReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False, class_=AsyncSession)
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+async def get_read_db():
+    async with AsyncReadSessionLocal() as session:
+        yield session
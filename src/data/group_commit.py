@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import uuid
+from typing import List, NamedTuple, Optional, Set
+from sqlalchemy import insert
+from src.core.config import settings
+from src.core.metrics import GROUP_COMMIT_BATCH_SIZE
+from src.data.bulk import insert_rows
+from src.data.database import AsyncSessionLocal
+from src.data.models import Order, OrderItem
+from src.messaging.outbox import add_order_created_events
+
+logger = logging.getLogger(__name__)
+
+class PendingOrder(NamedTuple):
+    order: Order
+    event: Optional[dict]  # OrderCreated outbox data, None with the outbox off
+    future: asyncio.Future
+
+def _order_row(order: Order) -> dict:
+    # created_at comes with the order id (see new_order_id)
+    return {
+        "order_id": order.order_id,
+        "created_at": order.created_at,
+        "updated_at": order.updated_at,
+        "customer_id": order.customer_id,
+        "shipping_address": order.shipping_address,
+        "status": order.status,
+        "total_amount": order.total_amount,
+    }
+
+def _item_rows(order: Order) -> List[dict]:
+    rows = []
+    for item in order.items:
+        item.item_id = item.item_id or uuid.uuid4()
+        rows.append({
+            "item_id": item.item_id,
+            "order_id": order.order_id,
+            "order_created_at": order.created_at,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "price": item.price,
+        })
+    return rows
+
+class OrderGroupCommitter:
+    """
+    Writes orders from concurrent requests in shared transactions.
+
+    An order waits at most GROUP_COMMIT_MAX_DELAY_MS for others to join it,
+    or until GROUP_COMMIT_MAX_BATCH orders are waiting; the group is then
+    inserted with one multi-row INSERT per table and committed once, so a
+    burst of requests costs one pool checkout and one commit round trip
+    instead of one each. If the group insert fails, each order is retried in
+    its own savepoint of the same transaction, so only the orders that fail
+    on their own get the error.
+    """
+
+    def __init__(self, max_delay_ms: Optional[float] = None, max_batch: Optional[int] = None):
+        self.max_delay = (settings.GROUP_COMMIT_MAX_DELAY_MS if max_delay_ms is None else max_delay_ms) / 1000
+        self.max_batch = max_batch or settings.GROUP_COMMIT_MAX_BATCH
+        self._pending: List[PendingOrder] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set[asyncio.Task] = set()
+
+    async def submit(self, order: Order, event: Optional[dict] = None) -> Order:
+        """
+        Inserts a transient Order with its items (and its outbox event) as
+        part of the next group, and returns it once the group committed,
+        with created_at/updated_at filled in.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(PendingOrder(order, event, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def close(self):
+        """Writes whatever is waiting and waits for the groups being written."""
+        self._flush()
+        await asyncio.gather(*self._writes, return_exceptions=True)
+
+    async def _write(self, batch: List[PendingOrder]):
+        GROUP_COMMIT_BATCH_SIZE.observe(len(batch))
+        written = {}
+        errors = {}
+        try:
+            async with AsyncSessionLocal() as session:
+                try:
+                    written = await self._insert(session, batch)
+                except Exception as e:
+                    await session.rollback()
+                    if len(batch) == 1:
+                        raise
+                    logger.warning(f"Group insert of {len(batch)} orders failed, retrying one by one: {e}")
+                    for pending in batch:
+                        try:
+                            async with session.begin_nested():
+                                written.update(await self._insert(session, [pending]))
+                        except Exception as order_error:
+                            errors[pending.order.order_id] = order_error
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} orders failed: {e}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        for pending in batch:
+            if pending.future.done():
+                continue  # The request went away; the order is committed all the same
+            error = errors.get(pending.order.order_id)
+            if error is not None:
+                pending.future.set_exception(error)
+                continue
+            pending.order.created_at, pending.order.updated_at = written[pending.order.order_id]
+            pending.future.set_result(pending.order)
+
+    async def _insert(self, session, batch: List[PendingOrder]) -> dict:
+        """Inserts a group in the session's transaction; returns {order_id: (created_at, updated_at)}."""
+        result = await session.execute(
+            insert(Order.__table__)
+            .values([_order_row(pending.order) for pending in batch])
+            .returning(Order.__table__.c.order_id, Order.__table__.c.created_at, Order.__table__.c.updated_at)
+        )
+        written = {row.order_id: (row.created_at, row.updated_at) for row in result}
+        await insert_rows(session, OrderItem.__table__, [row for pending in batch for row in _item_rows(pending.order)])
+        events = [pending.event for pending in batch if pending.event is not None]
+        if events:
+            await add_order_created_events(session, events)
+        return written
+
+order_committer = OrderGroupCommitter()
@@ -1,30 +1,81 @@
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKeyConstraint, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
+from src.core.ids import uuid7, uuid7_time
 from src.data.database import Base
 
+def _created_at_from_order_id(context) -> datetime:
+    # Keeps created_at equal to the time in the order's UUIDv7 id, which lookups by id rely on
+    order_id = context.get_current_parameters().get("order_id")
+    return (order_id and uuid7_time(order_id)) or datetime.now(timezone.utc)
+
 class Order(Base):
+    """
+    On Postgres, orders and order_items are range-partitioned by the order's
+    created_at (see src/data/partitions.py), so the partition key is part of
+    both primary keys. New orders get a UUIDv7 id whose embedded time is their
+    created_at; lookups by id add it so only one partition is searched.
+    """
     __tablename__ = "orders"
 
-    order_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    order_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    created_at = Column(DateTime(timezone=True), primary_key=True, default=_created_at_from_order_id)
     customer_id = Column(UUID(as_uuid=True), nullable=False)
     shipping_address = Column(String(255), nullable=False)
     status = Column(String(50), nullable=False, default="PENDING")
     total_amount = Column(Numeric(10, 2), nullable=False)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
 
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", lazy="selectin")
 
+    __table_args__ = (
+        # Keyset pagination reads (filter, created_at, order_id) ranges straight off these
+        Index("ix_orders_customer_id_created_at", "customer_id", "created_at", "order_id"),
+        Index("ix_orders_status_created_at", "status", "created_at", "order_id"),
+        Index("ix_orders_created_at", "created_at", "order_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     item_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.order_id", ondelete="CASCADE"), nullable=False)
+    order_id = Column(UUID(as_uuid=True), nullable=False)
+    # The order's created_at, so an item lives in the same time partition as its order
+    order_created_at = Column(DateTime(timezone=True), primary_key=True)
     product_id = Column(UUID(as_uuid=True), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
 
     order = relationship("Order", back_populates="items")
+
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["order_id", "order_created_at"], ["orders.order_id", "orders.created_at"],
+            name="fk_order_items_order", ondelete="CASCADE"
+        ),
+        # Loading an order's items
+        Index("ix_order_items_order_id", "order_id", "order_created_at"),
+        {"postgresql_partition_by": "RANGE (order_created_at)"},
+    )
+
+class OutboxEvent(Base):
+    """
+    Events written in the same transaction as the rows they describe.
+    The outbox relay publishes them to RabbitMQ and stamps sent_at.
+    """
+    __tablename__ = "outbox"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type = Column(String(100), nullable=False)
+    routing_key = Column(String(255), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Keeps the relay's "oldest unsent first" scan small as sent rows pile up
+        Index("ix_outbox_unsent", "created_at", postgresql_where=sent_at.is_(None)),
+    )
@@ -0,0 +1,264 @@
+"""
+Partition maintenance for the orders and order_items tables (Postgres).
+
+orders is range-partitioned by created_at, and order_items by its order's
+created_at, one partition per ORDER_PARTITION_INTERVAL (day, week or month)
+named after the start of its range, e.g. orders_p20261001. Reads and status
+updates mostly touch recent orders, so their partitions stay small and hot
+while old ones are left alone by autovacuum, and retiring old orders is a
+cheap DETACH instead of a mass DELETE.
+
+There is no default partition, so inserts fail for a period that has no
+partition yet. The app therefore keeps the next ORDER_PARTITION_PREMAKE
+periods created itself, at startup and every
+ORDER_PARTITION_CHECK_INTERVAL_SECONDS (PartitionKeeper). Retiring old
+partitions is left to this command: run it daily (cron, a Kubernetes
+CronJob, ...) to move partitions that ended more than
+ORDER_PARTITION_RETENTION_DAYS ago out of the hot tables.
+
+    python -m src.data.partitions              # create upcoming partitions, archive old ones
+    python -m src.data.partitions --dry-run    # only print the statements
+    python -m src.data.partitions --drop       # drop old partitions instead of archiving them
+
+Archived partitions are detached and moved to the ORDER_ARCHIVE_SCHEMA
+schema as plain tables: still there for exports and audits, but no longer
+searched by the API.
+"""
+import argparse
+import asyncio
+import logging
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import and_, or_, text
+from src.core.config import settings
+from src.core.ids import uuid7_time
+from src.data.database import engine
+from src.data.models import Order
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("orders", "order_items")
+INTERVALS = ("day", "week", "month")
+
+# Held while creating partitions, so app replicas and this command don't
+# race to create the same one
+_ADVISORY_LOCK_KEY = 0x6F726465727300
+
+_BOUND = re.compile(r"FOR VALUES FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+def orders_by_id(order_ids: Iterable[uuid.UUID]):
+    """
+    WHERE clause selecting orders by id. A UUIDv7 id carries its order's
+    created_at, so the clause names it too and Postgres only searches the
+    partitions holding those orders; older UUIDv4 ids are looked up in every
+    partition.
+    """
+    order_ids = list(order_ids)
+    timed = {order_id: uuid7_time(order_id) for order_id in order_ids}
+    legacy = [order_id for order_id, created_at in timed.items() if created_at is None]
+    if len(legacy) == len(order_ids):
+        return Order.order_id.in_(order_ids)
+    clause = and_(
+        Order.order_id.in_([order_id for order_id in order_ids if timed[order_id] is not None]),
+        Order.created_at.in_({created_at for created_at in timed.values() if created_at is not None}),
+    )
+    return or_(clause, Order.order_id.in_(legacy)) if legacy else clause
+
+class Partition(NamedTuple):
+    name: str
+    start: datetime
+    end: datetime
+
+def period_start(moment: datetime, interval: str) -> datetime:
+    """Start (UTC midnight) of the period containing `moment`."""
+    day = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "day":
+        return day
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown partition interval: {interval!r} (expected one of {', '.join(INTERVALS)})")
+
+def next_period(start: datetime, interval: str) -> datetime:
+    if interval == "day":
+        return start + timedelta(days=1)
+    if interval == "week":
+        return start + timedelta(weeks=1)
+    if interval == "month":
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    raise ValueError(f"Unknown partition interval: {interval!r} (expected one of {', '.join(INTERVALS)})")
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m%d}"
+
+def existing_partitions(connection, table: str) -> List[Partition]:
+    """Range partitions attached to `table`, oldest first. Partitions with other bounds (MINVALUE, ...) are left out."""
+    rows = connection.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": table})
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND.search(bound or "")
+        if match:
+            partitions.append(Partition(name, datetime.fromisoformat(match[1]), datetime.fromisoformat(match[2])))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+def _run(connection, statement: str, dry_run: bool):
+    logger.info(statement)
+    if not dry_run:
+        connection.execute(text(statement))
+
+def ensure_partitions(
+    connection,
+    now: Optional[datetime] = None,
+    since: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Creates the partitions of both tables from the period containing `since`
+    (default: now) through ORDER_PARTITION_PREMAKE periods after the current
+    one. Periods already covered by a partition are skipped. Takes a sync
+    connection; returns the names of the partitions created.
+    """
+    if not dry_run:
+        # Released when the caller's transaction ends
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+    interval = settings.ORDER_PARTITION_INTERVAL
+    now = now or datetime.now(timezone.utc)
+    last = period_start(now, interval)
+    for _ in range(settings.ORDER_PARTITION_PREMAKE):
+        last = next_period(last, interval)
+
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = existing_partitions(connection, table)
+        start = period_start(min(since or now, now), interval)
+        while start <= last:
+            end = next_period(start, interval)
+            if not any(p.start < end and start < p.end for p in existing):
+                name = partition_name(table, start)
+                _run(connection, (
+                    f'CREATE TABLE "{name}" PARTITION OF {table} '
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ), dry_run)
+                created.append(name)
+            start = end
+    return created
+
+def _foreign_keys(connection, table: str) -> List[str]:
+    return list(connection.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+    ), {"table": table}).scalars())
+
+def expired_partitions(connection, now: Optional[datetime] = None) -> List[Tuple[Partition, Optional[Partition]]]:
+    """
+    (orders partition, matching order_items partition) pairs whose range ended
+    more than ORDER_PARTITION_RETENTION_DAYS ago. Empty when retention is 0.
+    """
+    if settings.ORDER_PARTITION_RETENTION_DAYS <= 0:
+        return []
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=settings.ORDER_PARTITION_RETENTION_DAYS)
+    items: Dict[Tuple[datetime, datetime], Partition] = {
+        (p.start, p.end): p for p in existing_partitions(connection, "order_items")
+    }
+    return [
+        (orders, items.get((orders.start, orders.end)))
+        for orders in existing_partitions(connection, "orders")
+        if orders.end <= cutoff
+    ]
+
+def retire_partition(connection, orders: Partition, items: Optional[Partition], drop: bool = False, dry_run: bool = False):
+    """
+    Detaches one period from both tables, then moves its tables to
+    ORDER_ARCHIVE_SCHEMA, or drops them with `drop`. Items go first: the
+    orders partition can only leave while no attached item references it.
+    """
+    schema = settings.ORDER_ARCHIVE_SCHEMA
+    if items is not None:
+        _run(connection, f'ALTER TABLE order_items DETACH PARTITION "{items.name}"', dry_run)
+        # Once detached, the items keep their own copy of the foreign key to
+        # orders, which would block detaching the orders partition
+        for foreign_key in _foreign_keys(connection, items.name):
+            _run(connection, f'ALTER TABLE "{items.name}" DROP CONSTRAINT "{foreign_key}"', dry_run)
+    _run(connection, f'ALTER TABLE orders DETACH PARTITION "{orders.name}"', dry_run)
+    if not drop:
+        _run(connection, f'CREATE SCHEMA IF NOT EXISTS "{schema}"', dry_run)
+    for partition in filter(None, (items, orders)):
+        if drop:
+            _run(connection, f'DROP TABLE "{partition.name}"', dry_run)
+        else:
+            _run(connection, f'ALTER TABLE "{partition.name}" SET SCHEMA "{schema}"', dry_run)
+
+class PartitionKeeper:
+    """
+    Background task that creates upcoming partitions from within the app, so
+    order writes don't depend on the maintenance command being scheduled.
+    start() makes one pass before returning, then another runs every
+    ORDER_PARTITION_CHECK_INTERVAL_SECONDS. A failed pass is logged and
+    retried on the next one; the premade periods leave plenty of time.
+    """
+
+    def __init__(self):
+        self._task = None
+
+    async def ensure(self) -> List[str]:
+        if engine.dialect.name != "postgresql":
+            return []  # Only Postgres tables are partitioned
+        try:
+            async with engine.begin() as conn:
+                created = await conn.run_sync(ensure_partitions)
+        except Exception as e:
+            logger.error(f"Creating upcoming partitions failed: {e}")
+            return []
+        if created:
+            logger.info(f"Created partitions {', '.join(created)}")
+        return created
+
+    async def start(self):
+        if not self._task:
+            await self.ensure()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.ORDER_PARTITION_CHECK_INTERVAL_SECONDS)
+            await self.ensure()
+
+partition_keeper = PartitionKeeper()
+
+async def maintain(drop: bool = False, dry_run: bool = False):
+    try:
+        async with engine.begin() as conn:
+            created = await conn.run_sync(ensure_partitions, dry_run=dry_run)
+            expired = await conn.run_sync(expired_partitions)
+        logger.info(f"{'Would create' if dry_run else 'Created'} {len(created)} partitions")
+
+        # One transaction per period, so the parent tables are locked briefly
+        for orders, items in expired:
+            async with engine.begin() as conn:
+                await conn.run_sync(retire_partition, orders, items, drop, dry_run)
+            if not dry_run:
+                logger.info(f"{'Dropped' if drop else 'Archived'} partition {orders.name}")
+    finally:
+        await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drop", action="store_true", help="drop expired partitions instead of moving them to ORDER_ARCHIVE_SCHEMA")
+    parser.add_argument("--dry-run", action="store_true", help="log the statements without running them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(maintain(drop=args.drop, dry_run=args.dry_run))
+
+if __name__ == "__main__":
+    main()
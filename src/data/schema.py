@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from src.data.database import engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+def alembic_config() -> Config:
+    config = Config(str(ALEMBIC_INI))
+    # Independent of the working directory the app was started from
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+def _current_revision(connection) -> Optional[str]:
+    return MigrationContext.configure(connection).get_current_revision()
+
+async def ensure_schema() -> str:
+    """
+    Startup schema check. A database that already carries a migration
+    version is left alone, at the cost of one query; deploy schema changes
+    with `alembic upgrade head`. A database without one (a fresh dev or test
+    database) gets all migrations applied. Returns the database's revision.
+    """
+    config = alembic_config()
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_current_revision)
+    head = ScriptDirectory.from_config(config).get_current_head()
+    if current is None:
+        logger.info("No schema version found; applying migrations")
+        # Alembic's env.py runs its own event loop
+        await asyncio.to_thread(command.upgrade, config, "head")
+        return head
+    if current != head:
+        logger.warning(f"Database schema is at revision {current}, the code expects {head}; run `alembic upgrade head`")
+    return current
@@ -1,38 +1,142 @@
+import time
+
+# Cold-start timing begins here, before the application imports below
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
 from contextlib import asynccontextmanager
+from typing import Set
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from src.api.health import router as health_router, startup_state
 from src.api.routes import router
-from src.messaging.consumer import consumer
+from src.api.status_stream import status_hub
 from src.messaging.producer import producer
+from src.messaging.outbox import outbox_relay
+from src.messaging.worker import embedded_worker
 from src.caching.redis_client import redis_client
-from src.data.database import engine, Base
+from src.pricing.resolver import price_resolver
+from src.data.group_commit import order_committer
+from src.data.partitions import partition_keeper
+from src.data.schema import ensure_schema
+from src.core.config import settings
+from src.core.metrics import PROMETHEUS_CONTENT_TYPE, STARTUP_SECONDS, RequestTimingMiddleware, registry
+from src.core.retry import retry_with_backoff
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _record_startup(stage: str, seconds: float):
+    startup_state.seconds[stage] = round(seconds, 3)
+    STARTUP_SECONDS.labels(stage).set(seconds)
+
+async def _timed(stage: str, step):
+    start = time.perf_counter()
+    await step()
+    _record_startup(stage, time.perf_counter() - start)
+
+# Background reconnects of optional dependencies that failed at startup
+_reconnect_tasks: Set[asyncio.Task] = set()
+
+async def _reconnect(stage: str, step):
+    # Each round is a full retry_with_backoff, so failures keep being logged
+    while True:
+        await asyncio.sleep(settings.STARTUP_RETRY_MAX_DELAY_SECONDS)
+        try:
+            await step()
+        except Exception:
+            continue
+        startup_state.degraded.discard(stage)
+        logger.info(f"{stage} connected; no longer degraded")
+        return
+
+async def _timed_optional(stage: str, step):
+    """Like _timed, but a failure leaves the stage degraded and retrying in the background instead of failing startup."""
+    try:
+        await _timed(stage, step)
+    except Exception as e:
+        logger.error(f"{stage} unavailable at startup, continuing degraded: {e!r}")
+        startup_state.degraded.add(stage)
+        _reconnect_tasks.add(asyncio.create_task(_reconnect(stage, step)))
+
+async def _cancel_reconnects():
+    for task in _reconnect_tasks:
+        task.cancel()
+    await asyncio.gather(*_reconnect_tasks, return_exceptions=True)
+    _reconnect_tasks.clear()
+
+async def _start_database():
+    await retry_with_backoff(ensure_schema, "Database schema check")
+    await partition_keeper.start()
+
+async def _start_redis():
+    async def connect():
+        await redis_client.connect()
+        if not await redis_client.ping():
+            raise ConnectionError("Redis did not answer PING")
+    await retry_with_backoff(connect, "Redis connect")
+    await redis_client.start_invalidation_listener()
+    await retry_with_backoff(status_hub.start, "Order status subscription")
+
+async def _start_producer():
+    await retry_with_backoff(producer.connect, "RabbitMQ producer connect")
+
+async def _start_consumer():
+    # Routes and applies payment events in this process; see src/messaging/worker.py
+    await retry_with_backoff(embedded_worker.start, "RabbitMQ consumer connect")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up...")
-    
-    # Create DB tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        
-    await producer.connect()
-    await consumer.connect() # Starts background consuming task
-    await redis_client.connect()
-    
+    started = time.perf_counter()
+    _record_startup("imports", started - _IMPORT_STARTED)
+
+    # Dependencies come up concurrently, each retried with backoff, so startup
+    # takes as long as the slowest one rather than all of them added up. Only
+    # the ones requests can't do without (as in required_checks()) are fatal:
+    # if one still fails, the others are cancelled and startup fails, leaving
+    # the restart to the process supervisor. The service runs degraded without
+    # the rest, like it does when they fail later, and keeps reconnecting them.
+    steps = {"database": _start_database, "redis": _start_redis, "rabbitmq_producer": _start_producer}
+    if settings.EMBEDDED_CONSUMER_ENABLED:
+        steps["rabbitmq_consumer"] = _start_consumer
+    fatal = {"database"} if settings.OUTBOX_ENABLED else {"database", "rabbitmq_producer"}
+    try:
+        async with asyncio.TaskGroup() as group:
+            for stage, step in steps.items():
+                group.create_task((_timed if stage in fatal else _timed_optional)(stage, step))
+        if settings.OUTBOX_ENABLED:
+            await outbox_relay.start()
+    except BaseException:
+        # Shutdown never runs for a failed startup, so stop the reconnects here
+        await _cancel_reconnects()
+        raise
+
+    _record_startup("total", time.perf_counter() - _IMPORT_STARTED)
+    startup_state.ready = True
+    logger.info(
+        f"Ready in {startup_state.seconds['total']:.2f}s ("
+        + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in startup_state.seconds.items() if stage != "total")
+        + ")"
+        + (f"; degraded: {', '.join(sorted(startup_state.degraded))}" if startup_state.degraded else "")
+    )
+
     yield
-    
+
     # Shutdown
     logger.info("Shutting down...")
+    startup_state.ready = False
+    await _cancel_reconnects()
+    await order_committer.close()
+    await outbox_relay.stop()
+    await partition_keeper.stop()
     await producer.close()
+    await status_hub.stop()
     await redis_client.close()
-    # Consumer connection relies on persistent loop or separate handling
-    if consumer.connection:
-        await consumer.connection.close()
+    await embedded_worker.stop()
+    await price_resolver.close()
 
 app = FastAPI(title="Order Processing Service", lifespan=lifespan)
 
@@ -47,7 +151,19 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 app.include_router(router)
+app.include_router(health_router)
 
 @app.get("/")
 async def root():
     return {"message": "Order Processing Service is running"}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return redis_client.cache_stats()
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(RequestTimingMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
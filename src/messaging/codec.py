@@ -0,0 +1,82 @@
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+from uuid import UUID
+import msgpack
+from src.core.config import settings
+
+# Event bodies are JSON or MessagePack, optionally zlib-compressed, and say so
+# in the AMQP content_type / content_encoding properties. Decoding goes by
+# those properties, never by configuration, so producers and consumers can
+# switch encodings independently. Messages without a content_type are JSON,
+# which is what every producer sent before the properties were set.
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+DEFLATE_ENCODING = "deflate"  # zlib stream, as in HTTP
+
+_JSON_CONTENT_TYPES = {JSON_CONTENT_TYPE, "text/json"}
+_MSGPACK_CONTENT_TYPES = {MSGPACK_CONTENT_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+
+# A compressed event may not inflate past this, so a malicious body can't exhaust memory
+MAX_DECOMPRESSED_BYTES = 16 * 1024 * 1024
+
+class EncodedEvent(NamedTuple):
+    body: bytes
+    content_type: str
+    content_encoding: Optional[str]
+
+def _to_str(value):
+    # Same conversions as json.dumps(default=str), so both encodings decode to the same values
+    if isinstance(value, (UUID, Decimal, datetime, date)):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+def encode_event(event: dict, encoding: Optional[str] = None, compress_above: Optional[int] = None) -> EncodedEvent:
+    """
+    Encodes an event as EVENT_ENCODING ("json" or "msgpack"). Bodies larger
+    than EVENT_COMPRESSION_THRESHOLD_BYTES (0 disables compression) are
+    deflated when that makes them smaller.
+    """
+    encoding = encoding or settings.EVENT_ENCODING
+    compress_above = settings.EVENT_COMPRESSION_THRESHOLD_BYTES if compress_above is None else compress_above
+
+    if encoding == "msgpack":
+        body = msgpack.packb(event, default=_to_str)
+        content_type = MSGPACK_CONTENT_TYPE
+    elif encoding == "json":
+        body = json.dumps(event, default=str, separators=(",", ":")).encode()
+        content_type = JSON_CONTENT_TYPE
+    else:
+        raise ValueError(f"Unknown event encoding: {encoding}")
+
+    if compress_above and len(body) > compress_above:
+        compressed = zlib.compress(body, settings.EVENT_COMPRESSION_LEVEL)
+        if len(compressed) < len(body):
+            return EncodedEvent(compressed, content_type, DEFLATE_ENCODING)
+    return EncodedEvent(body, content_type, None)
+
+def _inflate(body: bytes) -> bytes:
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(body, MAX_DECOMPRESSED_BYTES)
+    if decompressor.unconsumed_tail:
+        raise ValueError(f"Event inflates past {MAX_DECOMPRESSED_BYTES} bytes")
+    if not decompressor.eof:
+        raise ValueError("Truncated deflate body")
+    return data
+
+def decode_event(body: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> dict:
+    """Decodes an event body according to its content_type and content_encoding."""
+    if content_encoding == DEFLATE_ENCODING:
+        body = _inflate(body)
+    elif content_encoding not in (None, "", "identity"):
+        raise ValueError(f"Unsupported content encoding: {content_encoding}")
+
+    media_type = (content_type or JSON_CONTENT_TYPE).split(";")[0].strip().lower()
+    if media_type in _JSON_CONTENT_TYPES:
+        return json.loads(body)
+    if media_type in _MSGPACK_CONTENT_TYPES:
+        return msgpack.unpackb(body, raw=False)
+    raise ValueError(f"Unsupported content type: {content_type}")
@@ -1,69 +1,337 @@
-import json
+import uuid
 import logging
 import asyncio
+from datetime import datetime
+from typing import List, NamedTuple, Optional
 import aio_pika
-from sqlalchemy import update
+from sqlalchemy import and_, or_, update, values, column, String
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.future import select
+from src.caching.redis_client import redis_client
 from src.core.config import settings
-from src.data.database import AsyncSessionLocal
+from src.core.metrics import CONSUMER_BATCH_SIZE, CONSUMER_IN_FLIGHT, CONSUMER_MESSAGES, CONSUMER_PROCESSING_SECONDS
+from src.data.database import BackgroundSessionLocal
 from src.data.models import Order
+from src.data.partitions import orders_by_id
+from src.messaging.codec import decode_event
+from src.messaging.dedup import event_dedup
 
 logger = logging.getLogger(__name__)
 
+class PaymentUpdate(NamedTuple):
+    message: aio_pika.IncomingMessage
+    order_id: uuid.UUID
+    new_status: str
+    event_id: Optional[str] = None
+
+class PaymentEvent(NamedTuple):
+    order_id: str
+    payment_status: str
+    event_id: Optional[str]
+
+# The statuses an order may move to each status from. A paid order
+# (PROCESSING) is never moved back, so a late or redelivered failure can't
+# undo a payment, while a payment retried after a failure still goes through.
+ALLOWED_PREVIOUS_STATUSES = {
+    "PROCESSING": ("PENDING", "FAILED"),
+    "FAILED": ("PENDING",),
+}
+
+def payment_status_to_order_status(payment_status: str) -> str:
+    return "PROCESSING" if payment_status == "SUCCESS" else "FAILED"
+
+def decode_payment_event(body: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> Optional[PaymentEvent]:
+    """
+    Returns the PaymentEvent in a PaymentProcessed message, or None if the
+    message is not one we act on. The body may be JSON or MessagePack,
+    compressed or not, as its content properties say.
+    """
+    event = decode_event(body, content_type, content_encoding)
+    if event.get("event_type") != "PaymentProcessed":
+        return None
+    payload = event.get("payload", {})
+    order_id = payload.get("order_id")
+    payment_status = payload.get("payment_status")
+    if not order_id or not payment_status:
+        return None
+    event_id = event.get("event_id")
+    return PaymentEvent(order_id, payment_status, str(event_id) if event_id else None)
+
+def parse_payment_event(body: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> Optional[tuple]:
+    """Returns (order_id, payment_status) for a PaymentProcessed event, or None if the message is not one we act on."""
+    event = decode_payment_event(body, content_type, content_encoding)
+    return (event.order_id, event.payment_status) if event else None
+
 class PaymentEventConsumer:
-    def __init__(self):
-        self.connection = None
+    def __init__(self, mode: Optional[str] = None, concurrency: Optional[int] = None):
+        self.mode = mode or settings.CONSUMER_MODE
+        self.concurrency = concurrency or settings.CONSUMER_CONCURRENCY
+        self._queue = None
+        self._consumer_tag = None
+        self._pending: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Single mode: messages currently inside process_message
+        self._processing = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def consume(self, queue):
+        """Starts consuming an already declared queue on the caller's channel."""
+        self._queue = queue
+        if self.mode == "batch":
+            self._start_batch_workers()
+            self._consumer_tag = await queue.consume(self.enqueue_message)
+        else:
+            self._consumer_tag = await queue.consume(self.process_message)
+
+    async def drain(self):
+        """Waits until every message received so far has been handled and acked."""
+        if self._pending is not None:
+            await self._pending.join()
+        await self._idle.wait()
+
+    async def close(self, drain_timeout: Optional[float] = None):
+        """
+        Stops taking deliveries, gives messages already received up to
+        `drain_timeout` (default CONSUMER_DRAIN_TIMEOUT_SECONDS) to finish, then
+        shuts down. Messages still unacked go back to the queue when the
+        channel closes.
+        """
+        if self._queue is not None and self._consumer_tag is not None:
+            try:
+                await self._queue.cancel(self._consumer_tag)
+                timeout = settings.CONSUMER_DRAIN_TIMEOUT_SECONDS if drain_timeout is None else drain_timeout
+                await asyncio.wait_for(self.drain(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Consumer drain timed out; unacked messages will be redelivered")
+            except Exception as e:
+                logger.error(f"Consumer drain failed: {e}")
+            self._consumer_tag = None
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def process_message(self, message: aio_pika.IncomingMessage):
+        CONSUMER_IN_FLIGHT.inc()
+        self._processing += 1
+        self._idle.clear()
+        try:
+            async with message.process():
+                with CONSUMER_PROCESSING_SECONDS.time("single"):
+                    try:
+                        event = decode_payment_event(message.body, message.content_type, message.content_encoding)
+                        if not event:
+                            CONSUMER_MESSAGES.labels("ignored").inc()
+                        elif await event_dedup.seen([event.event_id]):
+                            CONSUMER_MESSAGES.labels("duplicate").inc()
+                        else:
+                            await self.update_order_status(event.order_id, event.payment_status, event.event_id)
+                    except Exception as e:
+                        CONSUMER_MESSAGES.labels("failed").inc()
+                        logger.error(f"Error processing message: {e}")
+        finally:
+            CONSUMER_IN_FLIGHT.dec()
+            self._processing -= 1
+            if not self._processing:
+                self._idle.set()
+
+    async def update_order_status(self, order_id: str, payment_status: str, event_id: Optional[str] = None):
+        new_status = payment_status_to_order_status(payment_status)
+        order_uuid = uuid.UUID(str(order_id))
+
+        async with BackgroundSessionLocal() as session:
+            try:
+                # Conditional, so a duplicate or out-of-order event costs one
+                # statement that matches no row, and no row is loaded for it
+                stmt = (
+                    update(Order)
+                    .where(orders_by_id([order_uuid]), Order.status.in_(ALLOWED_PREVIOUS_STATUSES[new_status]))
+                    .values(status=new_status, updated_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                result = await session.execute(stmt)
+                order = None
+                if result.rowcount:
+                    # Loaded only when it changed, to write it through to the cache
+                    order = (await session.execute(select(Order).where(orders_by_id([order_uuid])))).scalar_one()
+                await session.commit()
+            except Exception as e:
+                CONSUMER_MESSAGES.labels("failed").inc()
+                logger.error(f"Failed to update order status in DB: {e}")
+                await session.rollback()
+                return
+
+        await event_dedup.remember([event_id])
+        if order is None:
+            CONSUMER_MESSAGES.labels("unchanged").inc()
+            logger.info(f"Order {order_id} not moved to {new_status}: not found or no longer in {', '.join(ALLOWED_PREVIOUS_STATUSES[new_status])}")
+            return
+        CONSUMER_MESSAGES.labels("updated").inc()
+        logger.info(f"Updated order {order_id} status to {new_status}")
+        await redis_client.cache_order(order, notify=True)
+        await redis_client.publish_order_statuses({order_id: new_status})
+
+    # Batch mode
+    #
+    # Messages are parsed on arrival and queued; `concurrency` (CONSUMER_CONCURRENCY) workers
+    # drain the queue in micro-batches of up to CONSUMER_BATCH_SIZE messages or
+    # CONSUMER_BATCH_WINDOW_MS, whichever comes first. Each batch is applied with
+    # a single UPDATE ... FROM (VALUES ...) and messages are acked only after
+    # the commit. A batch that fails is retried one message at a time; a message
+    # that fails again after a redelivery is rejected. CONSUMER_PREFETCH_COUNT
+    # should be at least CONSUMER_BATCH_SIZE * CONSUMER_CONCURRENCY to keep
+    # every worker fed.
+    #
+    # With more than one worker, two updates for the same order can land in
+    # different batches and commit out of order; run a single worker when
+    # per-order ordering matters.
+
+    def _start_batch_workers(self):
+        if self._workers:
+            return  # Already running, e.g. when connect() is retried
+        self._pending = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._batch_worker())
+            for _ in range(self.concurrency)
+        ]
 
-    async def connect(self):
+    async def enqueue_message(self, message: aio_pika.IncomingMessage):
         try:
-            self.connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
-            channel = await self.connection.channel()
-            exchange = await channel.declare_exchange(
-                "payments", aio_pika.ExchangeType.TOPIC, durable=True
+            event = decode_payment_event(message.body, message.content_type, message.content_encoding)
+            if not event:
+                CONSUMER_MESSAGES.labels("ignored").inc()
+                await message.ack()
+                return
+            update_item = PaymentUpdate(
+                message, uuid.UUID(str(event.order_id)), payment_status_to_order_status(event.payment_status), event.event_id
             )
-            queue = await channel.declare_queue("payment_updates", durable=True)
-            await queue.bind(exchange, routing_key="payment.processed")
-            
-            # Start consuming
-            await queue.consume(self.process_message)
-            logger.info("Listening for PaymentProcessed events...")
         except Exception as e:
-            logger.error(f"Failed to connect to RabbitMQ consumer: {e}")
-            # Retry logic could be added here
+            # Malformed messages would fail every batch they land in, so drop them here
+            CONSUMER_MESSAGES.labels("failed").inc()
+            logger.error(f"Error processing message: {e}")
+            await message.ack()
+            return
+        CONSUMER_IN_FLIGHT.inc()
+        await self._pending.put(update_item)
 
-    async def process_message(self, message: aio_pika.IncomingMessage):
-        async with message.process():
+    async def _next_batch(self) -> List[PaymentUpdate]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._pending.get()]
+        deadline = loop.time() + settings.CONSUMER_BATCH_WINDOW_MS / 1000
+        while len(batch) < settings.CONSUMER_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_worker(self):
+        while True:
+            batch = await self._next_batch()
+            CONSUMER_BATCH_SIZE.observe(len(batch))
             try:
-                body = json.loads(message.body)
-                event_type = body.get("event_type")
-                if event_type == "PaymentProcessed":
-                    payload = body.get("payload", {})
-                    order_id = payload.get("order_id")
-                    payment_status = payload.get("payment_status")
-                    
-                    if order_id and payment_status:
-                        await self.update_order_status(order_id, payment_status)
+                with CONSUMER_PROCESSING_SECONDS.time("batch"):
+                    await self.apply_status_batch(batch)
             except Exception as e:
-                logger.error(f"Error processing message: {e}")
+                logger.error(f"Failed to apply batch of {len(batch)} status updates: {e}")
+                if len(batch) == 1:
+                    await self._settle_failed(batch[0], e)
+                else:
+                    # Apply the batch one message at a time, so one bad message
+                    # doesn't hold back the others
+                    for update_item in batch:
+                        try:
+                            await self.apply_status_batch([update_item])
+                        except Exception as item_error:
+                            await self._settle_failed(update_item, item_error)
+                        else:
+                            await update_item.message.ack()
+            else:
+                for update_item in batch:
+                    await update_item.message.ack()
+            CONSUMER_IN_FLIGHT.dec(len(batch))
+            for _ in batch:
+                self._pending.task_done()
+
+    async def _settle_failed(self, update_item: PaymentUpdate, error: Exception):
+        """
+        Requeues a message that failed on its first delivery, since the cause
+        may pass (a dropped connection, a failover). A message that fails again
+        when redelivered is rejected: dead-lettered if the queue has a
+        dead-letter exchange, dropped otherwise, rather than retried forever.
+        """
+        CONSUMER_MESSAGES.labels("failed").inc()
+        if update_item.message.redelivered:
+            logger.error(f"Rejecting status update of order {update_item.order_id} after a redelivery failed: {error}")
+            await update_item.message.nack(requeue=False)
+        else:
+            await update_item.message.nack(requeue=True)
 
-    async def update_order_status(self, order_id: str, payment_status: str):
-        new_status = "PROCESSING" if payment_status == "SUCCESS" else "FAILED"
-        
-        async with AsyncSessionLocal() as session:
+    async def apply_status_batch(self, batch: List[PaymentUpdate]) -> int:
+        """
+        Applies a batch of status updates with one set-based UPDATE, without
+        loading any Order rows. Events already applied are skipped, and an
+        order only moves along ALLOWED_PREVIOUS_STATUSES, so duplicates and
+        out-of-order events change nothing. If an order appears more than
+        once, the status it would end up in when applied in order wins.
+        Returns the number of orders updated.
+        """
+        duplicates = await event_dedup.seen(update_item.event_id for update_item in batch)
+        fresh = [update_item for update_item in batch if update_item.event_id not in duplicates]
+        CONSUMER_MESSAGES.labels("duplicate").inc(len(batch) - len(fresh))
+        if not fresh:
+            return 0
+
+        latest = {}
+        for update_item in fresh:
+            previous = latest.get(update_item.order_id)
+            if previous is None or previous in ALLOWED_PREVIOUS_STATUSES[update_item.new_status]:
+                latest[update_item.order_id] = update_item.new_status
+
+        new_statuses = values(
+            column("order_id", UUID(as_uuid=True)),
+            column("status", String),
+            name="new_statuses"
+        ).data(list(latest.items()))
+
+        stmt = (
+            update(Order)
+            .where(
+                # Restates the ids as constants so Postgres prunes to their partitions
+                orders_by_id(latest),
+                Order.order_id == new_statuses.c.order_id,
+                or_(*(
+                    and_(new_statuses.c.status == status, Order.status.in_(previous_statuses))
+                    for status, previous_statuses in ALLOWED_PREVIOUS_STATUSES.items()
+                ))
+            )
+            .values(status=new_statuses.c.status, updated_at=datetime.utcnow())
+            .returning(Order.order_id, Order.status)
+            .execution_options(synchronize_session=False)
+        )
+
+        async with BackgroundSessionLocal() as session:
             try:
-                # Can use UUID directly if string format matches
-                stmt = select(Order).where(Order.order_id == order_id)
                 result = await session.execute(stmt)
-                order = result.scalar_one_or_none()
-                
-                if order:
-                    order.status = new_status
-                    await session.commit()
-                    logger.info(f"Updated order {order_id} status to {new_status}")
-                else:
-                    logger.warning(f"Order {order_id} not found for status update")
-            except Exception as e:
-                logger.error(f"Failed to update order status in DB: {e}")
+                changed = {str(row.order_id): row.status for row in result}
+                await session.commit()
+            except Exception:
                 await session.rollback()
+                raise
+
+        await event_dedup.remember(update_item.event_id for update_item in fresh)
+        await redis_client.invalidate_orders(changed.keys())
+        await redis_client.publish_order_statuses(changed)
+
+        updated = len(changed)
+        CONSUMER_MESSAGES.labels("updated").inc(updated)
+        CONSUMER_MESSAGES.labels("unchanged").inc(len(latest) - updated)
+        logger.info(f"Updated status of {updated} orders from {len(batch)} messages ({len(batch) - len(fresh)} duplicates)")
+        return updated
 
 consumer = PaymentEventConsumer()
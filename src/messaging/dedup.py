@@ -0,0 +1,45 @@
+from typing import Iterable, Optional, Set
+from src.caching.local_cache import LocalCache
+from src.caching.redis_client import RedisClient, redis_client
+from src.core.config import settings
+
+class EventDeduplicator:
+    """
+    Remembers the ids of events that were already applied, so redeliveries
+    can be acked without touching the database.
+
+    Recent ids are kept in a bounded in-process LRU, and in Redis (one key
+    per id, expiring after CONSUMER_DEDUP_TTL_SECONDS) so that consumers in
+    other processes, and this one after a restart, know them too. Ids are
+    only remembered once their event has been applied; when Redis is
+    unavailable nothing is skipped, and the conditional status update keeps
+    the duplicate harmless.
+    """
+
+    def __init__(self, redis: Optional[RedisClient] = None):
+        self.redis = redis or redis_client
+        self.recent = LocalCache(settings.CONSUMER_DEDUP_LOCAL_SIZE, settings.CONSUMER_DEDUP_TTL_SECONDS)
+
+    async def seen(self, event_ids: Iterable[Optional[str]]) -> Set[str]:
+        """Returns the ids among `event_ids` that were already applied. Events without an id are never duplicates."""
+        if not settings.CONSUMER_DEDUP_ENABLED:
+            return set()
+        event_ids = [event_id for event_id in event_ids if event_id]
+        seen = {event_id for event_id in event_ids if self.recent.get(event_id)}
+        unknown = [event_id for event_id in event_ids if event_id not in seen]
+        if unknown:
+            from_redis = await self.redis.seen_event_ids(unknown)
+            for event_id in from_redis:
+                self.recent.set(event_id, True)
+            seen |= from_redis
+        return seen
+
+    async def remember(self, event_ids: Iterable[Optional[str]]):
+        if not settings.CONSUMER_DEDUP_ENABLED:
+            return
+        event_ids = [event_id for event_id in event_ids if event_id]
+        for event_id in event_ids:
+            self.recent.set(event_id, True)
+        await self.redis.remember_event_ids(event_ids, settings.CONSUMER_DEDUP_TTL_SECONDS)
+
+event_dedup = EventDeduplicator()
@@ -0,0 +1,146 @@
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from src.core.config import settings
+from src.data.bulk import insert_rows
+from src.data.database import BackgroundSessionLocal
+from src.data.models import OutboxEvent
+from src.messaging.producer import producer, build_order_created_event, ORDER_CREATED_ROUTING_KEY
+
+logger = logging.getLogger(__name__)
+
+def order_created_outbox_row(order_data: dict, created_at: datetime) -> dict:
+    """
+    Builds an outbox row for an OrderCreated event.
+    The payload goes through the same JSON encoding as the wire format,
+    so what is stored is exactly what the relay will publish.
+    """
+    event = build_order_created_event(order_data)
+    return {
+        "id": uuid.uuid4(),
+        "event_type": event["event_type"],
+        "routing_key": ORDER_CREATED_ROUTING_KEY,
+        "payload": json.loads(json.dumps(event, default=str)),
+        "created_at": created_at,
+        "sent_at": None,
+    }
+
+def add_order_created_event(session: AsyncSession, order_data: dict):
+    """Stages an OrderCreated outbox row in the caller's transaction."""
+    session.add(OutboxEvent(**order_created_outbox_row(order_data, datetime.utcnow())))
+
+async def add_order_created_events(session: AsyncSession, orders_data: List[dict]):
+    """Multi-row insert of OrderCreated outbox rows in the caller's transaction."""
+    now = datetime.utcnow()
+    await insert_rows(session, OutboxEvent.__table__, [order_created_outbox_row(data, now) for data in orders_data])
+
+class OutboxRelay:
+    """
+    Background task that drains the outbox to RabbitMQ.
+    Each round locks a batch of unsent rows (SKIP LOCKED, so several API
+    replicas can relay side by side), publishes them as one burst of
+    publisher confirms and stamps sent_at for the confirmed ones.
+    Unconfirmed rows stay unsent and are retried on the next round.
+    """
+
+    def __init__(self):
+        self._task = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._last_purge = datetime.min
+
+    def notify(self):
+        """Wakes the relay up early, e.g. right after an order commits."""
+        self._wakeup.set()
+
+    async def start(self):
+        if not self._task:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+            logger.info("Outbox relay started.")
+
+    async def stop(self):
+        if self._task:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            logger.info("Outbox relay stopped.")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                sent = await self.relay_batch()
+            except Exception as e:
+                logger.error(f"Outbox relay error: {e}")
+                sent = 0
+
+            # A full batch means there is likely more waiting; go again right away
+            if sent >= settings.OUTBOX_BATCH_SIZE:
+                continue
+
+            try:
+                await self.purge_sent()
+            except Exception as e:
+                logger.error(f"Outbox purge error: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def relay_batch(self) -> int:
+        if not producer.breaker.available:
+            # RabbitMQ is down; leave the rows unsent (and unlocked) until the breaker lets a trial through
+            return 0
+        async with BackgroundSessionLocal() as session:
+            stmt = (
+                select(OutboxEvent)
+                .where(OutboxEvent.sent_at.is_(None))
+                .order_by(OutboxEvent.created_at)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            result = await session.execute(stmt)
+            rows = result.scalars().all()
+            if not rows:
+                await session.rollback()
+                return 0
+
+            errors = await producer.publish_events([(row.routing_key, row.payload) for row in rows])
+            sent_ids = [row.id for row, error in zip(rows, errors) if error is None]
+            for row, error in zip(rows, errors):
+                if error is not None:
+                    logger.error(f"Failed to relay outbox event {row.id}: {error}")
+
+            if sent_ids:
+                await session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_(sent_ids))
+                    .values(sent_at=datetime.utcnow())
+                )
+            await session.commit()
+            return len(sent_ids)
+
+    async def purge_sent(self):
+        """Deletes relayed rows older than the retention window, at most once an hour."""
+        now = datetime.utcnow()
+        if now - self._last_purge < timedelta(hours=1):
+            return
+        self._last_purge = now
+
+        cutoff = now - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        async with BackgroundSessionLocal() as session:
+            await session.execute(
+                delete(OutboxEvent).where(OutboxEvent.sent_at.is_not(None), OutboxEvent.sent_at < cutoff)
+            )
+            await session.commit()
+
+outbox_relay = OutboxRelay()
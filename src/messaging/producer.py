@@ -1,52 +1,166 @@
-import json
 import logging
+import asyncio
+import time
 from datetime import datetime
+from typing import List, Optional, Tuple
 import aio_pika
+from src.core.admission import admission
+from src.core.circuit_breaker import CircuitBreaker, CircuitOpenError
 from src.core.config import settings
+from src.core.metrics import EVENTS_PUBLISHED, PUBLISH_SECONDS
+from src.messaging.codec import encode_event
 
 logger = logging.getLogger(__name__)
 
+ORDER_CREATED_ROUTING_KEY = "order.created"
+
+def build_order_created_event(order_data: dict) -> dict:
+    return {
+        "event_type": "OrderCreated",
+        "event_id": str(order_data.get("order_id")), # Using order_id as unique event id for simplicity or gen new one
+        "timestamp": datetime.utcnow().isoformat(),
+        "payload": order_data
+    }
+
+class PublisherChannel:
+    """One confirm-mode channel of the publisher pool and the exchange declared on it."""
+
+    __slots__ = ("channel", "exchange", "in_flight")
+
+    def __init__(self, channel, exchange):
+        self.channel = channel
+        self.exchange = exchange
+        self.in_flight = 0
+
 class OrderEventProducer:
-    def __init__(self):
+    """
+    Publishes events through a pool of PUBLISHER_POOL_SIZE channels with
+    publisher confirms. Each publish goes to the channel with the fewest
+    unconfirmed messages. A channel never waits for one confirm before sending
+    the next message, so confirms are pipelined. At most
+    PUBLISHER_MAX_IN_FLIGHT messages may be unconfirmed across the pool;
+    further publishes wait, which puts backpressure on callers when the
+    broker slows down. Messages on different channels may be delivered in
+    any order.
+
+    Connects and publishes go through a circuit breaker: while RabbitMQ keeps
+    failing they raise CircuitOpenError at once instead of waiting for
+    RABBITMQ_PUBLISH_TIMEOUT_SECONDS each.
+    """
+
+    def __init__(self, exchange_name: str = "orders"):
+        self.exchange_name = exchange_name
         self.connection = None
-        self.channel = None
-        self.exchange = None
+        self.publishers: List[PublisherChannel] = []
+        self._in_flight = asyncio.Semaphore(settings.PUBLISHER_MAX_IN_FLIGHT)
+        self.breaker = CircuitBreaker("rabbitmq")
 
     async def connect(self):
         if not self.connection:
+            if not self.breaker.allow():
+                raise CircuitOpenError("RabbitMQ circuit breaker is open")
             try:
                 self.connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
-                self.channel = await self.connection.channel()
-                self.exchange = await self.channel.declare_exchange(
-                    "orders", aio_pika.ExchangeType.TOPIC, durable=True
-                )
-                logger.info("Connected to RabbitMQ for producing.")
+                self.publishers = [await self._open_publisher() for _ in range(settings.PUBLISHER_POOL_SIZE)]
+                self.breaker.record_success()
+                logger.info(f"Connected to RabbitMQ for producing ({len(self.publishers)} channels).")
             except Exception as e:
+                self.breaker.record_failure()
                 logger.error(f"Failed to connect to RabbitMQ producer: {e}")
+                if self.connection:
+                    await self.connection.close()
+                self.connection = None
+                self.publishers = []
                 raise
 
+    async def _open_publisher(self) -> PublisherChannel:
+        # Robust channels are reopened, and the exchange redeclared, after a reconnect
+        channel = await self.connection.channel(publisher_confirms=True)
+        exchange = await channel.declare_exchange(self.exchange_name, aio_pika.ExchangeType.TOPIC, durable=True)
+        return PublisherChannel(channel, exchange)
+
     async def close(self):
         if self.connection:
             await self.connection.close()
+        self.connection = None
+        self.publishers = []
+
+    async def _publish(self, message: aio_pika.Message, routing_key: str):
+        """Publishes on the least loaded channel and returns once the broker confirmed the message."""
+        if not self.breaker.allow():
+            raise CircuitOpenError("RabbitMQ circuit breaker is open")
+        async with self._in_flight:
+            publisher = min(self.publishers, key=lambda p: p.in_flight)
+            publisher.in_flight += 1
+            start = time.perf_counter()
+            try:
+                await publisher.exchange.publish(
+                    message, routing_key=routing_key, timeout=settings.RABBITMQ_PUBLISH_TIMEOUT_SECONDS
+                )
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            finally:
+                publisher.in_flight -= 1
+                admission.publish_latency.observe(time.perf_counter() - start)
+            self.breaker.record_success()
+
+    def _build_message(self, event: dict) -> aio_pika.Message:
+        encoded = encode_event(event)
+        return aio_pika.Message(
+            body=encoded.body,
+            content_type=encoded.content_type,
+            content_encoding=encoded.content_encoding,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        )
 
     async def publish_order_created(self, order_data: dict):
-        if not self.exchange:
+        if not self.publishers:
             await self.connect()
 
-        event = {
-            "event_type": "OrderCreated",
-            "event_id": str(order_data.get("order_id")), # Using order_id as unique event id for simplicity or gen new one
-            "timestamp": datetime.utcnow().isoformat(),
-            "payload": order_data
-        }
+        message = self._build_message(build_order_created_event(order_data))
 
-        message = aio_pika.Message(
-            body=json.dumps(event, default=str).encode(),
-            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        with PUBLISH_SECONDS.time("single"):
+            try:
+                await self._publish(message, ORDER_CREATED_ROUTING_KEY)
+            except Exception:
+                EVENTS_PUBLISHED.labels(ORDER_CREATED_ROUTING_KEY, "error").inc()
+                raise
+        EVENTS_PUBLISHED.labels(ORDER_CREATED_ROUTING_KEY, "ok").inc()
+        logger.info(f"Published OrderCreated event for order {order_data.get('order_id')}")
+
+    async def publish_order_created_many(self, orders_data: List[dict]) -> List[Optional[BaseException]]:
+        """
+        Publishes OrderCreated events as one pipelined burst.
+        Returns one entry per order: None on success, the exception otherwise.
+        """
+        return await self.publish_events(
+            [(ORDER_CREATED_ROUTING_KEY, build_order_created_event(data)) for data in orders_data]
         )
 
-        await self.exchange.publish(message, routing_key="order.created")
-        logger.info(f"Published OrderCreated event for order {order_data.get('order_id')}")
+    async def publish_events(self, events: List[Tuple[str, dict]]) -> List[Optional[BaseException]]:
+        """
+        Publishes (routing_key, event) pairs as one pipelined burst.
+        The publishes are spread over the channel pool and all are issued
+        before any confirm is awaited (up to PUBLISHER_MAX_IN_FLIGHT), so the
+        burst costs roughly one broker round trip instead of one per event.
+        Returns one entry per event: None once the broker confirmed it, the exception otherwise.
+        """
+        if not self.publishers:
+            await self.connect()
+
+        with PUBLISH_SECONDS.time("burst"):
+            results = await asyncio.gather(
+                *(self._publish(self._build_message(event), routing_key) for routing_key, event in events),
+                return_exceptions=True
+            )
+
+        errors = [r if isinstance(r, BaseException) else None for r in results]
+        for (routing_key, _), error in zip(events, errors):
+            EVENTS_PUBLISHED.labels(routing_key, "ok" if error is None else "error").inc()
+        failed = sum(1 for e in errors if e is not None)
+        logger.info(f"Published {len(events) - failed}/{len(events)} events in batch")
+        return errors
 
 producer = OrderEventProducer()
 
@@ -0,0 +1,296 @@
+"""
+Standalone payment event worker, scaled independently of the API.
+
+PaymentProcessed events are partitioned into CONSUMER_SHARD_COUNT shard
+queues by a hash of their order_id. Each worker process applies the shards it
+owns, one batch after another per shard, so the updates of one order are
+applied in order while different orders are processed in parallel.
+
+    python -m src.messaging.worker                    # one process owning every shard
+    python -m src.messaging.worker --processes 4      # four local processes
+    WORKER_INDEX=1 WORKER_COUNT=3 python -m src.messaging.worker   # one of three hosts/containers
+
+The API's embedded consumer (EMBEDDED_CONSUMER_ENABLED) is such a worker
+owning every shard. It can run alongside standalone workers, but only one
+process applies a given shard at a time, so turn it off to spread the load.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import time
+import uuid
+import zlib
+from typing import List, Set
+import aio_pika
+from src.caching.redis_client import redis_client
+from src.core.config import settings
+from src.data.database import background_engine, engine
+from src.messaging.consumer import PaymentEventConsumer, parse_payment_event
+
+logger = logging.getLogger(__name__)
+
+PAYMENTS_EXCHANGE = "payments"
+PAYMENT_PROCESSED_ROUTING_KEY = "payment.processed"
+ROUTER_QUEUE = "payment_updates.router"
+SHARD_EXCHANGE = "payment_updates.shards"
+# Read by the embedded consumer before it went through the router
+LEGACY_QUEUE = "payment_updates"
+
+# Only one consumer of a queue with this argument receives messages at a time;
+# the others take over if it goes away.
+SINGLE_ACTIVE_CONSUMER = {"x-single-active-consumer": True}
+
+def shard_for(order_id, shard_count: int) -> int:
+    """Shard of an order. Stable across processes and restarts, unlike hash()."""
+    return zlib.crc32(uuid.UUID(str(order_id)).bytes) % shard_count
+
+def shard_queue_name(shard: int) -> str:
+    return f"payment_updates.shard.{shard}"
+
+def owned_shards(worker_index: int, worker_count: int, shard_count: int) -> List[int]:
+    return [shard for shard in range(shard_count) if shard % worker_count == worker_index]
+
+class PaymentRouter:
+    """
+    Moves PaymentProcessed events from the router queue to the shard queue of
+    their order, acking each one after the broker confirmed its copy.
+
+    Every worker runs a router, but the router queue has a single active
+    consumer, so one of them routes everything and the rest stand by.
+    Deliveries are handled in arrival order, and a publish takes the channel
+    lock before its first suspension point, so events also reach the shard
+    queues in arrival order.
+    """
+
+    def __init__(self):
+        self.queue = None
+        self.shards = None
+        self._consumer_tag = None
+        self._legacy_queue = None
+        self._legacy_consumer_tag = None
+        self._routing: Set[asyncio.Task] = set()
+
+    async def start(self, connection):
+        channel = await connection.channel()  # publisher confirms are on by default
+        await channel.set_qos(prefetch_count=settings.CONSUMER_PREFETCH_COUNT)
+        payments = await channel.declare_exchange(PAYMENTS_EXCHANGE, aio_pika.ExchangeType.TOPIC, durable=True)
+        self.shards = await channel.declare_exchange(SHARD_EXCHANGE, aio_pika.ExchangeType.DIRECT, durable=True)
+        self.queue = await channel.declare_queue(ROUTER_QUEUE, durable=True, arguments=SINGLE_ACTIVE_CONSUMER)
+        await self.queue.bind(payments, routing_key=PAYMENT_PROCESSED_ROUTING_KEY)
+        self._consumer_tag = await self.queue.consume(self.route)
+
+    async def retire_legacy_queue(self, connection):
+        """
+        Unbinds LEGACY_QUEUE so it stops collecting events, and routes what it
+        still holds to the shards. The queue is deleted by the first start
+        that finds it empty and unused.
+        """
+        channel = await connection.channel()
+        try:
+            queue = await channel.declare_queue(LEGACY_QUEUE, passive=True)
+        except aio_pika.exceptions.ChannelNotFoundEntity:
+            return  # Already gone
+        await queue.unbind(PAYMENTS_EXCHANGE, PAYMENT_PROCESSED_ROUTING_KEY)
+        if queue.declaration_result.message_count:
+            logger.warning(f"Routing {queue.declaration_result.message_count} events left in legacy queue {LEGACY_QUEUE}")
+            await channel.set_qos(prefetch_count=settings.CONSUMER_PREFETCH_COUNT)
+            self._legacy_queue = queue
+            self._legacy_consumer_tag = await queue.consume(self.route)
+            return
+        try:
+            await queue.delete(if_unused=True, if_empty=True)
+            logger.info(f"Deleted legacy queue {LEGACY_QUEUE}")
+        except aio_pika.exceptions.ChannelPreconditionFailed:
+            # Still consumed, e.g. by an API process of the previous release
+            logger.info(f"Legacy queue {LEGACY_QUEUE} is still in use; deleting it on a later start")
+
+    async def route(self, message: aio_pika.IncomingMessage):
+        task = asyncio.current_task()
+        self._routing.add(task)
+        try:
+            try:
+                parsed = parse_payment_event(message.body, message.content_type, message.content_encoding)
+                shard = shard_for(parsed[0], settings.CONSUMER_SHARD_COUNT) if parsed else None
+            except Exception as e:
+                logger.error(f"Dropping unroutable payment event: {e}")
+                shard = None
+            if shard is None:
+                await message.ack()
+                return
+
+            try:
+                await self.shards.publish(
+                    aio_pika.Message(
+                        body=message.body,
+                        headers=message.headers,
+                        content_type=message.content_type,
+                        content_encoding=message.content_encoding,
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                    ),
+                    routing_key=str(shard)
+                )
+            except Exception as e:
+                logger.error(f"Failed to route payment event to shard {shard}: {e}")
+                await message.nack(requeue=True)
+                return
+            await message.ack()
+        finally:
+            self._routing.discard(task)
+
+    async def stop(self):
+        """Stops taking deliveries and waits for the events being routed."""
+        if self._consumer_tag:
+            await self.queue.cancel(self._consumer_tag)
+            self._consumer_tag = None
+        if self._legacy_consumer_tag:
+            await self._legacy_queue.cancel(self._legacy_consumer_tag)
+            self._legacy_consumer_tag = None
+        await asyncio.gather(*self._routing, return_exceptions=True)
+
+async def start_shard(connection, shard: int) -> PaymentEventConsumer:
+    # A channel per shard, so each shard has its own prefetch window
+    channel = await connection.channel()
+    await channel.set_qos(prefetch_count=settings.CONSUMER_PREFETCH_COUNT)
+    exchange = await channel.declare_exchange(SHARD_EXCHANGE, aio_pika.ExchangeType.DIRECT, durable=True)
+    queue = await channel.declare_queue(shard_queue_name(shard), durable=True, arguments=SINGLE_ACTIVE_CONSUMER)
+    await queue.bind(exchange, routing_key=str(shard))
+
+    # One batch worker per shard: its batches are applied strictly one after another
+    shard_consumer = PaymentEventConsumer(mode="batch", concurrency=1)
+    await shard_consumer.consume(queue)
+    return shard_consumer
+
+class PaymentWorker:
+    """
+    A router and the consumers of `shards`, on one connection. Standalone
+    workers run one per process; with EMBEDDED_CONSUMER_ENABLED the API runs
+    embedded_worker, which owns every shard. Either way events enter through
+    the router queue only, and since every queue has a single active
+    consumer, the API and standalone workers can run side by side without
+    applying a shard twice.
+    """
+
+    def __init__(self, shards: List[int]):
+        self.shards = shards
+        self.connection = None
+        self.router = None
+        self.shard_consumers: List[PaymentEventConsumer] = []
+
+    async def start(self):
+        if self.connection:
+            return
+        self.connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
+        try:
+            self.router = PaymentRouter()
+            await self.router.start(self.connection)
+            for shard in self.shards:
+                self.shard_consumers.append(await start_shard(self.connection, shard))
+            await self.router.retire_legacy_queue(self.connection)
+        except Exception:
+            # Raised so the caller can retry; the next attempt starts from scratch
+            await self.stop()
+            raise
+
+    async def stop(self):
+        """Stops routing, lets the shard consumers drain, then closes the connection."""
+        # Route what is in hand first: it may belong to one of our shards
+        if self.router:
+            await self.router.stop()
+            self.router = None
+        await asyncio.gather(*(shard_consumer.close() for shard_consumer in self.shard_consumers))
+        self.shard_consumers = []
+        if self.connection:
+            await self.connection.close()
+            self.connection = None
+
+embedded_worker = PaymentWorker(owned_shards(0, 1, settings.CONSUMER_SHARD_COUNT))
+
+async def run_worker(worker_index: int, worker_count: int):
+    if not 0 <= worker_index < worker_count:
+        raise ValueError(f"Worker index {worker_index} is outside 0..{worker_count - 1}")
+    shards = owned_shards(worker_index, worker_count, settings.CONSUMER_SHARD_COUNT)
+    if not shards:
+        logger.warning(f"Worker {worker_index}/{worker_count} owns no shards; CONSUMER_SHARD_COUNT is {settings.CONSUMER_SHARD_COUNT}")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    worker = PaymentWorker(shards)
+    try:
+        await worker.start()
+        logger.info(f"Worker {worker_index}/{worker_count} consuming shards {shards}")
+
+        await stopping.wait()
+        logger.info(f"Worker {worker_index}/{worker_count} draining...")
+    finally:
+        await worker.stop()
+        await redis_client.close()
+        await background_engine.dispose()
+        await engine.dispose()
+    logger.info(f"Worker {worker_index}/{worker_count} stopped.")
+
+def _run_process(worker_index: int, worker_count: int):
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker(worker_index, worker_count))
+
+def supervise(first_index: int, processes: int, worker_count: int):
+    """
+    Runs `processes` workers (indexes first_index..) as child processes,
+    restarting any that exit, until SIGTERM/SIGINT; then lets them drain.
+    """
+    context = multiprocessing.get_context("spawn")
+    children = {}
+    stopping = False
+
+    def spawn(worker_index: int):
+        child = context.Process(target=_run_process, args=(worker_index, worker_count), name=f"payment-worker-{worker_index}")
+        child.start()
+        children[worker_index] = child
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for child in children.values():
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker_index in range(first_index, first_index + processes):
+        spawn(worker_index)
+
+    while children:
+        multiprocessing.connection.wait([child.sentinel for child in children.values()])
+        for worker_index, child in list(children.items()):
+            if child.is_alive():
+                continue
+            del children[worker_index]
+            if not stopping:
+                logger.error(f"Worker {worker_index} exited with code {child.exitcode}; restarting")
+                time.sleep(1)
+                spawn(worker_index)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to run on this host")
+    parser.add_argument("--index", type=int, default=settings.WORKER_INDEX, help="index of this host among --count hosts")
+    parser.add_argument("--count", type=int, default=settings.WORKER_COUNT, help="number of hosts running workers")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    # Each host runs a contiguous block of the global worker indexes
+    worker_count = args.count * args.processes
+    first_index = args.index * args.processes
+    if args.processes > 1:
+        supervise(first_index, args.processes, worker_count)
+    else:
+        asyncio.run(run_worker(first_index, worker_count))
+
+if __name__ == "__main__":
+    main()
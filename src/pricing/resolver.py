@@ -0,0 +1,167 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set
+from uuid import UUID
+import httpx
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PriceLookupError(Exception):
+    """The catalog could not be reached and no cached price was available."""
+
+class CatalogBackend:
+    """Fetches current unit prices for a set of products in one call."""
+
+    async def fetch_prices(self, product_ids: Set[UUID]) -> Dict[UUID, Decimal]:
+        """Returns prices for the products the catalog knows; unknown ids are left out."""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class LocalCatalogBackend(CatalogBackend):
+    """
+    In-process stand-in for the product catalog, for local runs and tests.
+    Products without an explicit price get `default_price`; pass
+    default_price=None to treat them as unknown.
+    """
+
+    def __init__(self, prices: Optional[Dict[UUID, Decimal]] = None, default_price: Optional[Decimal] = Decimal("50.00")):
+        self.prices = dict(prices or {})
+        self.default_price = default_price
+        self.calls = 0
+
+    async def fetch_prices(self, product_ids: Set[UUID]) -> Dict[UUID, Decimal]:
+        self.calls += 1
+        found = {}
+        for product_id in product_ids:
+            price = self.prices.get(product_id, self.default_price)
+            if price is not None:
+                found[product_id] = price
+        return found
+
+class HttpCatalogBackend(CatalogBackend):
+    """
+    Product catalog over HTTP. Expects
+    GET {base_url}/products/prices?ids=<id>,<id>,... to answer
+    {"prices": {"<id>": "12.34", ...}}, leaving out unknown products.
+    """
+
+    def __init__(self, base_url: str, timeout: float):
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+
+    async def fetch_prices(self, product_ids: Set[UUID]) -> Dict[UUID, Decimal]:
+        response = await self.client.get(
+            "/products/prices", params={"ids": ",".join(str(product_id) for product_id in product_ids)}
+        )
+        response.raise_for_status()
+        return {UUID(product_id): Decimal(str(price)) for product_id, price in response.json()["prices"].items()}
+
+    async def close(self):
+        await self.client.aclose()
+
+class PriceResolver:
+    """
+    Resolves unit prices for the products of an order (or a batch of orders).
+
+    Product ids are deduplicated and every cache miss is fetched in one batched
+    backend call. Prices are kept in a bounded LRU cache: within `ttl` they are
+    served as is; between `ttl` and `stale_ttl` they are still served, and a
+    single background refresh is started for them (stale-while-revalidate), so
+    catalog latency only hits requests for never-seen or long-expired products.
+    """
+
+    def __init__(self, backend: CatalogBackend, ttl: float, stale_ttl: float, max_size: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_size = max_size
+        self._cache: "OrderedDict[UUID, tuple]" = OrderedDict()  # id -> (price, fetched_at)
+        self._refreshing: Set[UUID] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+
+    def _store(self, prices: Dict[UUID, Decimal]):
+        now = time.monotonic()
+        for product_id, price in prices.items():
+            self._cache[product_id] = (price, now)
+            self._cache.move_to_end(product_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def resolve(self, product_ids: Iterable[UUID]) -> Dict[UUID, Decimal]:
+        """
+        Returns {product_id: price} for every product the catalog knows.
+        Callers treat ids missing from the result as unknown products.
+        """
+        now = time.monotonic()
+        prices = {}
+        missing = set()
+        stale = set()
+        for product_id in set(product_ids):
+            entry = self._cache.get(product_id)
+            if entry is None or now - entry[1] >= self.stale_ttl:
+                missing.add(product_id)
+                continue
+            price, fetched_at = entry
+            prices[product_id] = price
+            self._cache.move_to_end(product_id)
+            if now - fetched_at >= self.ttl:
+                stale.add(product_id)
+
+        if stale:
+            self._refresh_in_background(stale)
+
+        if missing:
+            try:
+                fetched = await self.backend.fetch_prices(missing)
+            except Exception as e:
+                logger.error(f"Price lookup for {len(missing)} products failed: {e}")
+                raise PriceLookupError("Product catalog unavailable") from e
+            self._store(fetched)
+            prices.update(fetched)
+
+        return prices
+
+    def _refresh_in_background(self, product_ids: Set[UUID]):
+        product_ids = product_ids - self._refreshing
+        if not product_ids:
+            return
+        self._refreshing |= product_ids
+
+        async def refresh():
+            try:
+                self._store(await self.backend.fetch_prices(product_ids))
+            except Exception as e:
+                # Keep serving the stale prices until they fall out of stale_ttl
+                logger.warning(f"Background price refresh for {len(product_ids)} products failed: {e}")
+            finally:
+                self._refreshing -= product_ids
+
+        task = asyncio.create_task(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def close(self):
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        await self.backend.close()
+
+def build_catalog_backend() -> CatalogBackend:
+    if settings.PRICE_CATALOG_BACKEND == "http":
+        return HttpCatalogBackend(settings.PRODUCT_CATALOG_URL, settings.PRICE_CATALOG_TIMEOUT_SECONDS)
+    return LocalCatalogBackend(default_price=Decimal(settings.LOCAL_CATALOG_DEFAULT_PRICE))
+
+price_resolver = PriceResolver(
+    build_catalog_backend(),
+    ttl=settings.PRICE_CACHE_TTL_SECONDS,
+    stale_ttl=settings.PRICE_CACHE_STALE_SECONDS,
+    max_size=settings.PRICE_CACHE_MAX_SIZE,
+)
+
+async def get_price_resolver():
+    return price_resolver
@@ -0,0 +1,20 @@
+import pytest
+from src.data.database import Base
+
+@pytest.fixture
+async def sqlite_sessions(tmp_path):
+    """
+    Session factory for a throwaway SQLite database with the app's tables.
+    Needs the benchmark extras (benchmarks/requirements.txt); tests using it
+    are skipped without them.
+    """
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("benchmarks.fakes")  # Compiles the UUID columns for SQLite
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'orders.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield async_sessionmaker(engine, expire_on_commit=False)
+    finally:
+        await engine.dispose()
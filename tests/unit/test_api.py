@@ -8,3 +8,106 @@ async def test_root():
         response = await ac.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Order Processing Service is running"}
+
+@pytest.mark.asyncio
+async def test_create_orders_batch_reports_per_order_results():
+    import uuid
+    from src.data.database import get_db
+    from src.caching.redis_client import get_redis
+
+    class FakeSession:
+        def __init__(self):
+            self.statements = []
+        async def execute(self, stmt):
+            self.statements.append(stmt)
+        async def commit(self):
+            pass
+        async def rollback(self):
+            pass
+
+    class FakeRedis:
+        async def check_rate_limit(self, *args, **kwargs):
+            return True
+
+    session = FakeSession()
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[get_redis] = lambda: FakeRedis()
+    try:
+        valid = {
+            "customer_id": str(uuid.uuid4()),
+            "items": [{"product_id": str(uuid.uuid4()), "quantity": 2}],
+            "shipping_address": "123 Main St"
+        }
+        invalid = {**valid, "items": [{"product_id": str(uuid.uuid4()), "quantity": 0}]}
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            response = await ac.post("/api/orders/batch", json=[valid, invalid, valid])
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 207
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 1
+    assert [r["success"] for r in data["results"]] == [True, False, True]
+    assert "quantity" in data["results"][1]["error"]
+    # One multi-row insert each for orders, items and outbox events
+    assert len(session.statements) == 3
+
+@pytest.mark.asyncio
+async def test_lookup_orders_preserves_input_order():
+    import json
+    import uuid
+    from datetime import datetime, timezone
+    from decimal import Decimal
+    from types import SimpleNamespace
+    from src.data.database import get_read_db
+    from src.caching.redis_client import get_redis
+    from src.core.serialization import encode_order
+
+    def make_order():
+        now = datetime.now(timezone.utc)
+        return SimpleNamespace(
+            order_id=uuid.uuid4(), customer_id=uuid.uuid4(), items=[],
+            shipping_address="123 Main St", status="PENDING", total_amount=Decimal("0.00"),
+            created_at=now, updated_at=now
+        )
+
+    cached, stored, missing = make_order(), make_order(), uuid.uuid4()
+
+    class FakeResult:
+        def scalars(self):
+            return SimpleNamespace(all=lambda: [stored])
+
+    class FakeSession:
+        def __init__(self):
+            self.statements = []
+        async def execute(self, stmt):
+            self.statements.append(stmt)
+            return FakeResult()
+
+    class FakeRedis:
+        def __init__(self):
+            self.filled = []
+        async def get_cached_orders_raw(self, order_ids):
+            return {order_id: encode_order(cached) for order_id in order_ids if order_id == str(cached.order_id)}
+        async def cache_orders(self, orders, only_if_missing=False):
+            self.filled.extend(orders)
+            return {str(order.order_id): encode_order(order) for order in orders}
+
+    session, redis = FakeSession(), FakeRedis()
+    app.dependency_overrides[get_read_db] = lambda: session
+    app.dependency_overrides[get_redis] = lambda: redis
+    try:
+        order_ids = [str(stored.order_id), str(missing), str(cached.order_id), str(stored.order_id)]
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            response = await ac.post("/api/orders/lookup", json={"order_ids": order_ids})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    data = json.loads(response.content)
+    assert [order["order_id"] for order in data["orders"]] == [str(stored.order_id), str(cached.order_id)]
+    assert data["not_found"] == [str(missing)]
+    # The two misses are loaded with one query and backfilled together
+    assert len(session.statements) == 1
+    assert redis.filled == [stored]
@@ -0,0 +1,68 @@
+import time
+from src.core.admission import AdmissionController, LatencyTracker
+from src.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.core.config import settings
+
+def test_breaker_opens_after_threshold_and_recovers_through_a_trial():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow() and not breaker.available
+
+    time.sleep(0.06)
+    assert breaker.available
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+def test_admission_rejects_on_in_flight_db_wait_and_open_broker(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_IN_FLIGHT", 2)
+    monkeypatch.setattr(settings, "ADMISSION_DB_WAIT_MAX_MS", 100.0)
+    controller = AdmissionController()
+    assert controller.rejection_reason() is None
+
+    controller.in_flight = 2
+    assert controller.rejection_reason() == "in_flight"
+    controller.in_flight = 0
+
+    controller.db_checkout_wait.observe(0.5)
+    assert controller.rejection_reason() == "db_pool"
+    controller.db_checkout_wait = LatencyTracker()
+
+    breaker = CircuitBreaker("test-broker", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert controller.rejection_reason() is None  # the broker only matters when publishing inline
+    assert controller.rejection_reason(breaker) == "broker_unavailable"
+
+def test_latency_tracker_forgets_old_samples(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_SIGNAL_WINDOW_SECONDS", 0.05)
+    tracker = LatencyTracker()
+    tracker.observe(1.0)
+    assert tracker.value() == 1.0
+    time.sleep(0.06)
+    assert tracker.value() == 0.0
+
+def test_only_the_primary_write_pool_feeds_admission(monkeypatch):
+    from src.core import admission as admission_module
+    from src.data.database import InstrumentedQueuePool, WritePoolQueuePool, _engine_options
+    controller = AdmissionController()
+    monkeypatch.setattr(admission_module.admission, "db_checkout_wait", controller.db_checkout_wait)
+    url = "postgresql+asyncpg://user@db/orders"
+    assert _engine_options(url, "primary")["poolclass"] is WritePoolQueuePool
+    for name in ("replica", "background"):
+        assert _engine_options(url, name)["poolclass"] is InstrumentedQueuePool
+
+    InstrumentedQueuePool(lambda: None, logging_name="replica")._observe_checkout(0.5)
+    assert controller.db_checkout_wait.value() == 0.0  # A saturated replica doesn't refuse writes
+    WritePoolQueuePool(lambda: None, logging_name="primary")._observe_checkout(0.5)
+    assert controller.db_checkout_wait.value() == 0.5
@@ -0,0 +1,65 @@
+import json
+import uuid
+import zlib
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from src.messaging import codec
+from src.messaging.codec import DEFLATE_ENCODING, JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE, decode_event, encode_event
+from src.messaging.consumer import parse_payment_event
+
+def order_event(items: int) -> dict:
+    return {
+        "event_type": "OrderCreated",
+        "event_id": str(uuid.uuid4()),
+        "timestamp": datetime(2024, 1, 2, 3, 4, 5).isoformat(),
+        "payload": {
+            "order_id": uuid.uuid4(),
+            "items": [{"product_id": uuid.uuid4(), "quantity": 2, "price": Decimal("9.99")} for _ in range(items)],
+            "total_amount": 19.98 * items,
+        },
+    }
+
+@pytest.mark.parametrize("encoding", ["json", "msgpack"])
+def test_both_encodings_decode_to_the_same_values(encoding):
+    event = order_event(3)
+    encoded = encode_event(event, encoding=encoding, compress_above=0)
+
+    assert encoded.content_type == (MSGPACK_CONTENT_TYPE if encoding == "msgpack" else JSON_CONTENT_TYPE)
+    assert encoded.content_encoding is None
+    assert decode_event(encoded.body, encoded.content_type) == json.loads(json.dumps(event, default=str))
+
+def test_compresses_only_above_threshold():
+    small = encode_event(order_event(1), encoding="msgpack", compress_above=10_000)
+    large = encode_event(order_event(200), encoding="msgpack", compress_above=10_000)
+
+    assert small.content_encoding is None
+    assert large.content_encoding == DEFLATE_ENCODING
+    assert len(large.body) < len(encode_event(order_event(200), encoding="msgpack", compress_above=0).body)
+    assert len(decode_event(large.body, large.content_type, large.content_encoding)["payload"]["items"]) == 200
+
+def test_consumer_accepts_legacy_json_and_compressed_msgpack():
+    order_id = str(uuid.uuid4())
+    event = {"event_type": "PaymentProcessed", "payload": {"order_id": order_id, "payment_status": "SUCCESS"}}
+    packed = encode_event(event, encoding="msgpack", compress_above=1)
+
+    assert parse_payment_event(json.dumps(event).encode()) == (order_id, "SUCCESS")
+    assert parse_payment_event(packed.body, packed.content_type, packed.content_encoding) == (order_id, "SUCCESS")
+
+def test_rejects_unknown_formats_and_oversized_bodies(monkeypatch):
+    with pytest.raises(ValueError):
+        decode_event(b"<xml/>", "application/xml")
+    with pytest.raises(ValueError):
+        decode_event(b"{}", JSON_CONTENT_TYPE, "br")
+
+    monkeypatch.setattr(codec, "MAX_DECOMPRESSED_BYTES", 1000)
+    bomb = zlib.compress(b"[" + b"0," * 10_000 + b"0]")
+    with pytest.raises(ValueError):
+        decode_event(bomb, JSON_CONTENT_TYPE, DEFLATE_ENCODING)
+
+def test_rejects_truncated_deflate_bodies():
+    event = {"event_type": "PaymentProcessed", "payload": {"order_id": str(uuid.uuid4()), "payment_status": "SUCCESS"}}
+    body = zlib.compress(json.dumps(event).encode())
+    # Without its checksum the body still inflates to the whole event
+    with pytest.raises(ValueError, match="Truncated"):
+        decode_event(body[:-4], JSON_CONTENT_TYPE, DEFLATE_ENCODING)
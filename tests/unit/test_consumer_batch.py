@@ -0,0 +1,170 @@
+import asyncio
+import json
+import re
+import time
+import uuid
+import pytest
+from sqlalchemy.dialects import postgresql
+from src.core.config import settings
+from src.messaging import consumer as consumer_module
+from src.messaging.consumer import PaymentEventConsumer, PaymentUpdate
+
+class FakeMessage:
+    def __init__(self, order_id, payment_status="SUCCESS", event_id=None, redelivered=False):
+        self.body = json.dumps({
+            "event_type": "PaymentProcessed", "event_id": event_id,
+            "payload": {"order_id": str(order_id), "payment_status": payment_status},
+        }).encode()
+        self.content_type = "application/json"
+        self.content_encoding = None
+        self.redelivered = redelivered
+        self.outcome = None
+
+    async def ack(self):
+        self.outcome = "ack"
+
+    async def nack(self, requeue=True):
+        self.outcome = "requeue" if requeue else "reject"
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+        self.committed = False
+    async def __aenter__(self):
+        return self
+    async def __aexit__(self, *args):
+        pass
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return []
+    async def commit(self):
+        self.committed = True
+    async def rollback(self):
+        pass
+
+class FakeDedup:
+    async def seen(self, event_ids):
+        return set()
+    async def remember(self, event_ids):
+        pass
+
+class FakeRedis:
+    async def invalidate_orders(self, order_ids):
+        pass
+    async def publish_order_statuses(self, statuses):
+        pass
+
+def update(order_id, new_status):
+    return PaymentUpdate(FakeMessage(order_id), order_id, new_status)
+
+@pytest.mark.asyncio
+async def test_repeated_updates_of_one_order_collapse_to_the_last_allowed_status(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(consumer_module, "BackgroundSessionLocal", lambda: session)
+    monkeypatch.setattr(consumer_module, "event_dedup", FakeDedup())
+    monkeypatch.setattr(consumer_module, "redis_client", FakeRedis())
+    retried, late_failure = uuid.uuid4(), uuid.uuid4()
+
+    await PaymentEventConsumer(mode="batch").apply_status_batch([
+        # A payment that failed, then succeeded on retry: ends PROCESSING
+        update(retried, "FAILED"),
+        update(retried, "PROCESSING"),
+        # A failure arriving after the payment went through never undoes it
+        update(late_failure, "PROCESSING"),
+        update(late_failure, "FAILED"),
+    ])
+
+    [stmt] = session.statements  # One statement for the whole batch
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    rows = re.search(r"FROM \(VALUES (.*?)\) AS new_statuses", sql)[1]
+    assert rows == f"('{retried}', 'PROCESSING'), ('{late_failure}', 'PROCESSING')"
+    assert session.committed
+
+@pytest.mark.asyncio
+async def test_batch_flushes_when_full(monkeypatch):
+    monkeypatch.setattr(settings, "CONSUMER_BATCH_SIZE", 3)
+    monkeypatch.setattr(settings, "CONSUMER_BATCH_WINDOW_MS", 10_000)
+    consumer = PaymentEventConsumer(mode="batch")
+    consumer._pending = asyncio.Queue()
+    for _ in range(5):
+        consumer._pending.put_nowait(update(uuid.uuid4(), "PROCESSING"))
+
+    batch = await asyncio.wait_for(consumer._next_batch(), 1)  # Doesn't wait out the window
+    assert len(batch) == 3
+    assert consumer._pending.qsize() == 2
+
+@pytest.mark.asyncio
+async def test_batch_flushes_when_the_window_closes(monkeypatch):
+    monkeypatch.setattr(settings, "CONSUMER_BATCH_SIZE", 100)
+    monkeypatch.setattr(settings, "CONSUMER_BATCH_WINDOW_MS", 50)
+    consumer = PaymentEventConsumer(mode="batch")
+    consumer._pending = asyncio.Queue()
+    consumer._pending.put_nowait(update(uuid.uuid4(), "PROCESSING"))
+
+    async def arrives_within_window():
+        await asyncio.sleep(0.01)
+        consumer._pending.put_nowait(update(uuid.uuid4(), "PROCESSING"))
+
+    start = time.perf_counter()
+    late = asyncio.create_task(arrives_within_window())
+    batch = await consumer._next_batch()
+    await late
+    assert len(batch) == 2
+    assert 0.04 <= time.perf_counter() - start < 1
+
+async def run_batch(monkeypatch, messages, apply=None):
+    """Feeds `messages` through a batch worker and waits until each one was settled."""
+    monkeypatch.setattr(settings, "CONSUMER_BATCH_WINDOW_MS", 10)
+    consumer = PaymentEventConsumer(mode="batch", concurrency=1)
+    if apply is not None:
+        monkeypatch.setattr(consumer, "apply_status_batch", apply)
+    consumer._start_batch_workers()
+    try:
+        for message in messages:
+            await consumer.enqueue_message(message)
+        await asyncio.wait_for(consumer.drain(), 1)
+    finally:
+        await consumer.close()
+
+@pytest.mark.asyncio
+async def test_messages_are_acked_only_after_the_batch_commits(monkeypatch):
+    outcomes_at_commit = []
+
+    class CommitRecordingSession(FakeSession):
+        async def commit(self):
+            outcomes_at_commit.extend(message.outcome for message in messages)
+
+    monkeypatch.setattr(consumer_module, "BackgroundSessionLocal", CommitRecordingSession)
+    monkeypatch.setattr(consumer_module, "event_dedup", FakeDedup())
+    monkeypatch.setattr(consumer_module, "redis_client", FakeRedis())
+    messages = [FakeMessage(uuid.uuid4(), event_id=f"evt-{i}") for i in range(3)]
+
+    await run_batch(monkeypatch, messages)
+    assert outcomes_at_commit == [None, None, None]
+    assert [message.outcome for message in messages] == ["ack", "ack", "ack"]
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_requeued(monkeypatch):
+    async def apply(batch):
+        raise ConnectionError("database unavailable")
+
+    messages = [FakeMessage(uuid.uuid4(), event_id=f"evt-{i}") for i in range(3)]
+    await run_batch(monkeypatch, messages, apply)
+    assert [message.outcome for message in messages] == ["requeue", "requeue", "requeue"]
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_retried_one_message_at_a_time(monkeypatch):
+    messages = [FakeMessage(uuid.uuid4(), event_id=f"evt-{i}") for i in range(3)]
+    messages[2].redelivered = True
+    bad = {messages[1].body, messages[2].body}
+    applied = []
+
+    async def apply(batch):
+        if any(update_item.message.body in bad for update_item in batch):
+            raise ValueError("bad row")
+        applied.extend(update_item.message for update_item in batch)
+
+    await run_batch(monkeypatch, messages, apply)
+    assert applied == [messages[0]]
+    # A first failure goes back to the queue; a repeat one is rejected, not retried forever
+    assert [message.outcome for message in messages] == ["ack", "requeue", "reject"]
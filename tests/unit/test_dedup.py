@@ -0,0 +1,39 @@
+import json
+import pytest
+from src.messaging.consumer import decode_payment_event
+from src.messaging.dedup import EventDeduplicator
+
+class FakeRedis:
+    def __init__(self):
+        self.stored = set()
+        self.lookups = []
+    async def seen_event_ids(self, event_ids):
+        self.lookups.append(list(event_ids))
+        return {event_id for event_id in event_ids if event_id in self.stored}
+    async def remember_event_ids(self, event_ids, ttl):
+        self.stored.update(event_ids)
+
+@pytest.mark.asyncio
+async def test_remembered_ids_are_found_locally_then_in_redis():
+    redis = FakeRedis()
+    dedup = EventDeduplicator(redis)
+    assert await dedup.seen(["a", "b", None]) == set()
+
+    await dedup.remember(["a", None])
+    assert await dedup.seen(["a", "b"]) == {"a"}
+    assert redis.lookups[-1] == ["b"]  # "a" was answered in-process
+
+    # Another process that applied "b" is seen through Redis
+    redis.stored.add("b")
+    other = EventDeduplicator(redis)
+    assert await other.seen(["b"]) == {"b"}
+    lookups = len(redis.lookups)
+    assert await other.seen(["b"]) == {"b"}
+    assert len(redis.lookups) == lookups
+
+def test_decode_payment_event_carries_event_id():
+    body = json.dumps({
+        "event_type": "PaymentProcessed", "event_id": "evt-1",
+        "payload": {"order_id": "o-1", "payment_status": "SUCCESS"},
+    }).encode()
+    assert decode_payment_event(body) == ("o-1", "SUCCESS", "evt-1")
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from src.api import export
+from src.api.export import CSV_COLUMNS, _csv_chunk, _ndjson_chunk, stream_orders_export
+from src.api.pagination import decode_cursor
+from src.core.config import settings
+from src.data.models import Order, OrderItem
+
+START = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+
+def make_order(created_at=START, **fields):
+    return SimpleNamespace(
+        order_id=uuid.uuid4(), customer_id=uuid.uuid4(), shipping_address="1 Main St", status="PENDING",
+        total_amount=Decimal("30.00"), created_at=created_at, updated_at=created_at, **fields
+    )
+
+def make_item(quantity=1, price="10.00"):
+    return SimpleNamespace(product_id=uuid.uuid4(), quantity=quantity, price=Decimal(price))
+
+def test_ndjson_chunk_writes_one_line_per_order_with_its_items_and_cursor():
+    with_items, without_items = make_order(), make_order(START + timedelta(seconds=1))
+    items = {with_items.order_id: [make_item(2), make_item(1)]}
+
+    lines = _ndjson_chunk([with_items, without_items], items).splitlines()
+
+    records = [json.loads(line) for line in lines]
+    assert [record["order_id"] for record in records] == [str(with_items.order_id), str(without_items.order_id)]
+    assert [item["quantity"] for item in records[0]["items"]] == [2, 1]
+    assert records[1]["items"] == []
+    assert decode_cursor(records[1]["cursor"]) == (without_items.created_at, without_items.order_id)
+
+def test_csv_chunk_writes_a_row_per_item_and_the_header_only_when_asked():
+    with_items, without_items = make_order(), make_order(START + timedelta(seconds=1))
+    items = {with_items.order_id: [make_item(2), make_item(1)]}
+
+    first = list(csv.reader(io.StringIO(_csv_chunk([with_items], items, header=True))))
+    following = list(csv.reader(io.StringIO(_csv_chunk([without_items], items, header=False))))
+
+    assert first[0] == CSV_COLUMNS
+    assert [row[0] for row in first[1:]] == [str(with_items.order_id)] * 2
+    assert [row[CSV_COLUMNS.index("quantity")] for row in first[1:]] == ["2", "1"]
+    # No header, and an order without items still gets a row, with empty item columns
+    assert len(following) == 1 and following[0][0] == str(without_items.order_id)
+    assert following[0][CSV_COLUMNS.index("product_id")] == ""
+
+@pytest.fixture
+async def exported_orders(sqlite_sessions, monkeypatch):
+    """Five orders of two items each in a SQLite database read by the export."""
+    monkeypatch.setattr(export, "AsyncReadSessionLocal", sqlite_sessions)
+    orders = []
+    async with sqlite_sessions() as session:
+        for i in range(5):
+            created_at = START + timedelta(seconds=i)
+            order = Order(
+                order_id=uuid.uuid4(), created_at=created_at, customer_id=uuid.uuid4(),
+                shipping_address="1 Main St", status="PENDING", total_amount=Decimal("30.00"),
+            )
+            order.items = [
+                OrderItem(item_id=uuid.uuid4(), order_created_at=created_at, product_id=uuid.uuid4(), quantity=q, price=Decimal("10.00"))
+                for q in (1, 2)
+            ]
+            session.add(order)
+            orders.append(str(order.order_id))
+        await session.commit()
+    return orders
+
+async def collect(chunks) -> str:
+    return "".join([chunk async for chunk in chunks])
+
+@pytest.mark.asyncio
+async def test_csv_export_writes_the_header_once_across_chunks(exported_orders, monkeypatch):
+    monkeypatch.setattr(settings, "ORDER_EXPORT_CHUNK_SIZE", 2)
+    rows = list(csv.reader(io.StringIO(await collect(stream_orders_export("csv")))))
+    assert rows.count(CSV_COLUMNS) == 1 and rows[0] == CSV_COLUMNS
+    assert len(rows) == 1 + 5 * 2
+    assert list(dict.fromkeys(row[0] for row in rows[1:])) == exported_orders
+
+@pytest.mark.asyncio
+async def test_export_resumes_after_the_last_received_order(exported_orders, monkeypatch):
+    monkeypatch.setattr(settings, "ORDER_EXPORT_CHUNK_SIZE", 2)
+    records = [json.loads(line) for line in (await collect(stream_orders_export("ndjson"))).splitlines()]
+    assert [record["order_id"] for record in records] == exported_orders
+
+    # The client got two records before the connection dropped
+    resumed = await collect(stream_orders_export("ndjson", after=decode_cursor(records[1]["cursor"])))
+    resumed_records = [json.loads(line) for line in resumed.splitlines()]
+    assert [record["order_id"] for record in resumed_records] == exported_orders[2:]
+    assert all(len(record["items"]) == 2 for record in resumed_records)
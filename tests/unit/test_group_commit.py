@@ -0,0 +1,46 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from src.data import group_commit
+from src.data.group_commit import OrderGroupCommitter
+
+class FakeSession:
+    def __init__(self, log):
+        self.log = log
+    async def __aenter__(self):
+        return self
+    async def __aexit__(self, *exc):
+        return False
+    async def rollback(self):
+        self.log.append("rollback")
+    async def commit(self):
+        self.log.append("commit")
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+@pytest.mark.asyncio
+async def test_group_commit_isolates_failing_orders(monkeypatch):
+    log = []
+    monkeypatch.setattr(group_commit, "AsyncSessionLocal", lambda: FakeSession(log))
+    committer = OrderGroupCommitter(max_delay_ms=50, max_batch=3)
+    now = datetime.utcnow()
+
+    async def fake_insert(session, batch):
+        log.append(len(batch))
+        if any(pending.order.shipping_address == "bad" for pending in batch):
+            raise ValueError("constraint violated")
+        return {pending.order.order_id: (now, now) for pending in batch}
+    monkeypatch.setattr(committer, "_insert", fake_insert)
+
+    orders = [SimpleNamespace(order_id=uuid.uuid4(), shipping_address=address) for address in ["a", "bad", "c"]]
+    results = await asyncio.gather(*(committer.submit(order) for order in orders), return_exceptions=True)
+
+    # One group insert, then one retry per order, all in a single commit
+    assert log == [3, "rollback", 1, 1, 1, "commit"]
+    assert results[0] is orders[0] and orders[0].created_at == now
+    assert isinstance(results[1], ValueError)
+    assert results[2] is orders[2]
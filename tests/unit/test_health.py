@@ -0,0 +1,90 @@
+import pytest
+from httpx import AsyncClient
+from src.api import health
+from src.main import app
+
+@pytest.mark.asyncio
+async def test_live_does_not_check_dependencies(monkeypatch):
+    async def unreachable():
+        raise AssertionError("liveness must not probe dependencies")
+
+    monkeypatch.setattr(health, "check_dependencies", unreachable)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/health/live")
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_ready_reflects_startup_and_required_dependencies(monkeypatch):
+    checks = {"database": "ok", "redis": "unavailable", "rabbitmq": "ok"}
+
+    async def check_dependencies():
+        return dict(checks)
+
+    monkeypatch.setattr(health, "check_dependencies", check_dependencies)
+    monkeypatch.setattr(health.startup_state, "ready", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.get("/health/ready")).status_code == 503  # Still starting
+
+        health.startup_state.ready = True
+        response = await ac.get("/health/ready")
+        assert response.status_code == 200  # Redis is optional
+        assert response.json()["checks"] == checks
+
+        checks["database"] = "unavailable"
+        assert (await ac.get("/health/ready")).status_code == 503
+
+@pytest.mark.asyncio
+async def test_optional_dependency_failing_at_startup_is_degraded_and_reconnected(monkeypatch):
+    import asyncio
+    from src import main
+    from src.core.config import settings
+    monkeypatch.setattr(settings, "STARTUP_RETRY_MAX_DELAY_SECONDS", 0)
+    attempts = []
+
+    async def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("Redis did not answer PING")
+
+    await main._timed_optional("redis", connect)  # Doesn't raise: startup goes on
+    assert health.startup_state.degraded == {"redis"}
+
+    await asyncio.gather(*main._reconnect_tasks)
+    main._reconnect_tasks.clear()
+    assert len(attempts) == 2
+    assert health.startup_state.degraded == set()
+
+@pytest.mark.asyncio
+async def test_failed_startup_cancels_the_reconnects_it_started(monkeypatch):
+    import asyncio
+    from src import main
+    from src.core.config import settings
+    monkeypatch.setattr(settings, "STARTUP_RETRY_MAX_DELAY_SECONDS", 60)
+    monkeypatch.setattr(settings, "OUTBOX_ENABLED", True)
+    monkeypatch.setattr(settings, "EMBEDDED_CONSUMER_ENABLED", False)
+    monkeypatch.setattr(health.startup_state, "degraded", set())
+    monkeypatch.setattr(health.startup_state, "seconds", {})
+    reconnects = []
+
+    async def start_redis():
+        raise ConnectionError("Redis did not answer PING")
+
+    async def start_producer():
+        pass
+
+    async def start_database():
+        # Fails once Redis is already retrying in the background
+        while not main._reconnect_tasks:
+            await asyncio.sleep(0)
+        reconnects.extend(main._reconnect_tasks)
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(main, "_start_redis", start_redis)
+    monkeypatch.setattr(main, "_start_producer", start_producer)
+    monkeypatch.setattr(main, "_start_database", start_database)
+    with pytest.raises(ExceptionGroup):
+        async with main.lifespan(app):
+            pass
+
+    assert len(reconnects) == 1 and reconnects[0].cancelled()
+    assert not main._reconnect_tasks
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from src.api.idempotency import IdempotentRequest
+
+class FakeRedis:
+    """The RedisClient idempotency calls, with the same semantics as the Lua scripts."""
+
+    def __init__(self):
+        self.stored = {}
+        self.claims = 0
+
+    async def claim_idempotency_key(self, key, claim, ttl):
+        self.claims += 1
+        if key in self.stored:
+            return self.stored[key]
+        self.stored[key] = claim
+        return None
+
+    async def complete_idempotency_key(self, key, claim, response, ttl):
+        if self.stored.get(key, claim) == claim:
+            self.stored[key] = response
+
+    async def release_idempotency_key(self, key, claim):
+        if self.stored.get(key) == claim:
+            del self.stored[key]
+
+@pytest.mark.asyncio
+async def test_duplicate_waits_for_first_request_and_replays_its_response():
+    redis = FakeRedis()
+    first = IdempotentRequest(redis, "key-1", "fp")
+    assert await first.start() is None
+
+    duplicate = asyncio.create_task(IdempotentRequest(redis, "key-1", "fp").start())
+    await asyncio.sleep(0.05)
+    assert not duplicate.done()  # Waiting while the first request is in flight
+
+    await first.complete(201, '{"order_id": "o-1"}')
+    replay = await asyncio.wait_for(duplicate, 1)
+    assert replay.status_code == 201
+    assert replay.body == b'{"order_id": "o-1"}'
+    assert replay.headers["Idempotent-Replayed"] == "true"
+
+    # A later retry is answered with a single Redis call
+    claims = redis.claims
+    assert (await IdempotentRequest(redis, "key-1", "fp").start()).body == b'{"order_id": "o-1"}'
+    assert redis.claims == claims + 1
+
+@pytest.mark.asyncio
+async def test_key_reused_for_different_request_is_rejected():
+    redis = FakeRedis()
+    await IdempotentRequest(redis, "key-1", "fp").start()
+    with pytest.raises(HTTPException) as exc:
+        await IdempotentRequest(redis, "key-1", "other").start()
+    assert exc.value.status_code == 422
+
+@pytest.mark.asyncio
+async def test_abandoned_request_lets_the_retry_run_again():
+    redis = FakeRedis()
+    first = IdempotentRequest(redis, "key-1", "fp")
+    await first.start()
+    await first.abandon()
+    assert await IdempotentRequest(redis, "key-1", "fp").start() is None
+
+@pytest.mark.asyncio
+async def test_duplicate_gives_up_with_409_while_first_is_still_running(monkeypatch):
+    monkeypatch.setattr("src.api.idempotency.settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS", 0.05)
+    redis = FakeRedis()
+    await IdempotentRequest(redis, "key-1", "fp").start()
+    with pytest.raises(HTTPException) as exc:
+        await IdempotentRequest(redis, "key-1", "fp").start()
+    assert exc.value.status_code == 409
+    assert exc.value.headers["Retry-After"] == "1"
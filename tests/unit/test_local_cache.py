@@ -0,0 +1,41 @@
+import time
+from src.caching.local_cache import LocalCache
+
+def test_evicts_least_recently_used():
+    cache = LocalCache(max_size=2, ttl_seconds=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # "b" is now least recently used
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.evictions == 1
+
+def test_expires_entries_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = LocalCache(max_size=10, ttl_seconds=5)
+    cache.set("a", "1")
+    cache.set("b", "2", ttl=1)  # shorter than the cache TTL
+
+    now[0] += 2
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    now[0] += 4
+    assert cache.get("a") is None
+    assert cache.expirations == 2
+
+def test_invalidate_and_stats():
+    cache = LocalCache(max_size=10, ttl_seconds=60)
+    cache.set("a", "1")
+    assert cache.get("a") == "1"
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["invalidations"] == 1
+    assert stats["hit_ratio"] == 0.5
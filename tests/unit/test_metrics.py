@@ -0,0 +1,63 @@
+import pytest
+from httpx import AsyncClient
+from src.core.metrics import MetricsRegistry
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stage time.", ["stage"], buckets=(0.1, 1.0))
+    latency.labels("commit").observe(0.05)
+    latency.labels("commit").observe(0.1)  # upper bounds are inclusive
+    latency.labels("commit").observe(3)
+
+    text = registry.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="commit",le="0.1"} 2' in text
+    assert 'stage_seconds_bucket{stage="commit",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="commit",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="commit"} 3' in text
+    assert 'stage_seconds_sum{stage="commit"} 3.15' in text
+
+def test_counters_gauges_and_reset():
+    registry = MetricsRegistry()
+    lookups = registry.counter("lookups_total", "Lookups.", ["result"])
+    in_flight = registry.gauge("in_flight", "In flight.")
+    pool = registry.gauge("checked_out", "Checked out.", ["engine"])
+    hits = lookups.labels("hit")
+    hits.inc()
+    hits.inc(2)
+    in_flight.inc(3)
+    in_flight.dec()
+    pool.labels("primary").set_function(lambda: 7)
+
+    text = registry.render()
+    assert 'lookups_total{result="hit"} 3' in text
+    assert "in_flight 2" in text
+    assert 'checked_out{engine="primary"} 7' in text
+
+    registry.reset()
+    hits.inc()  # children held by callers keep working after a reset
+    assert 'lookups_total{result="hit"} 1' in registry.render()
+    with pytest.raises(ValueError):
+        lookups.labels("hit", "extra")
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    lookups = registry.counter("lookups_total", "Lookups.")
+    latency = registry.histogram("latency_seconds", "Latency.")
+    lookups.inc()
+    with latency.time():
+        pass
+
+    assert lookups.labels().value == 0
+    assert latency.labels().count == 0
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_request_timings():
+    from src.main import app
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await ac.get("/")
+        response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_seconds_count{endpoint="root",status="200"}' in response.text
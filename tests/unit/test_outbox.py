@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.future import select
+from src.core.circuit_breaker import CircuitBreaker
+from src.messaging import outbox
+from src.messaging.outbox import OutboxRelay
+from src.data.models import OutboxEvent
+
+class FakeProducer:
+    """Confirms every event except those whose order_id is in `failing`."""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker("test")
+        self.failing = set()
+        self.published = []
+
+    async def publish_events(self, events):
+        errors = []
+        for routing_key, event in events:
+            order_id = event["payload"]["order_id"]
+            if order_id in self.failing:
+                errors.append(ConnectionError("not confirmed"))
+            else:
+                self.published.append(order_id)
+                errors.append(None)
+        return errors
+
+@pytest.mark.asyncio
+async def test_rows_are_marked_sent_only_once_the_broker_confirmed_them(sqlite_sessions, monkeypatch):
+    producer = FakeProducer()
+    monkeypatch.setattr(outbox, "BackgroundSessionLocal", sqlite_sessions)
+    monkeypatch.setattr(outbox, "producer", producer)
+    order_ids = [str(uuid.uuid4()) for _ in range(4)]
+    created_at = datetime(2026, 10, 17, 12)
+    async with sqlite_sessions() as session:
+        for i, order_id in enumerate(order_ids):
+            row = outbox.order_created_outbox_row({"order_id": order_id}, created_at + timedelta(seconds=i))
+            session.add(OutboxEvent(**row))
+        await session.commit()
+
+    async def sent_order_ids():
+        async with sqlite_sessions() as session:
+            rows = (await session.execute(select(OutboxEvent).where(OutboxEvent.sent_at.is_not(None)))).scalars()
+            return {row.payload["payload"]["order_id"] for row in rows}
+
+    relay = OutboxRelay()
+    producer.failing = {order_ids[1], order_ids[3]}
+    assert await relay.relay_batch() == 2
+    assert await sent_order_ids() == {order_ids[0], order_ids[2]}
+
+    # The unconfirmed rows are still pending and go out on the next pass, alone
+    producer.failing = set()
+    producer.published.clear()
+    assert await relay.relay_batch() == 2
+    assert producer.published == [order_ids[1], order_ids[3]]
+    assert await sent_order_ids() == set(order_ids)
+    assert await relay.relay_batch() == 0
@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from httpx import AsyncClient
+from src.api.pagination import decode_cursor, encode_cursor
+from src.data.database import get_read_db
+from src.data.models import Order
+from src.main import app
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 17, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    order_id = uuid.uuid4()
+    cursor = encode_cursor(created_at, order_id)
+    assert "=" not in cursor  # Padding is stripped, so it goes into a URL as is
+    assert decode_cursor(cursor) == (created_at, order_id)
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(datetime(2026, 1, 1), uuid.uuid4())[:-4]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+@pytest.mark.asyncio
+async def test_malformed_cursor_returns_400():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/api/orders/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+@pytest.fixture
+async def orders_db(sqlite_sessions):
+    async def get_test_db():
+        async with sqlite_sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_read_db] = get_test_db
+    try:
+        yield sqlite_sessions
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_pages_break_created_at_ties_by_order_id(orders_db):
+    now = datetime(2026, 10, 17, 12, tzinfo=timezone.utc)
+    # Three orders share a timestamp, so a page boundary falls inside the tie
+    created = [now, now, now, now - timedelta(seconds=1), now + timedelta(seconds=1)]
+    orders = [
+        Order(
+            order_id=uuid.uuid4(), created_at=created_at, customer_id=uuid.uuid4(),
+            shipping_address="1 Main St", status="PENDING", total_amount=10,
+        )
+        for created_at in created
+    ]
+    async with orders_db() as session:
+        session.add_all(orders)
+        await session.commit()
+    expected = [str(o.order_id) for o in sorted(orders, key=lambda o: (o.created_at, o.order_id), reverse=True)]
+
+    seen, cursor, pages = [], None, 0
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = await ac.get("/api/orders/", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            seen += [order["order_id"] for order in page["orders"]]
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    assert seen == expected  # Newest first, nothing skipped or repeated
+    assert pages == 3  # The last page, with one order, has no next_cursor
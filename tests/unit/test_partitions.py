@@ -0,0 +1,72 @@
+import uuid
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy.dialects import postgresql
+from src.core.ids import new_order_id, uuid7, uuid7_time
+from src.data.partitions import next_period, orders_by_id, partition_name, period_start
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+def test_uuid7_carries_its_creation_time_and_sorts_by_it():
+    first, second = uuid7(1_700_000_000_000), uuid7(1_700_000_000_001)
+    assert first.version == 7 and first.variant == uuid.RFC_4122
+    assert first < second
+    assert uuid7_time(first) == utc(2023, 11, 14, 22, 13, 20)
+    assert uuid7_time(uuid.uuid4()) is None
+
+    order_id, created_at = new_order_id()
+    assert uuid7_time(order_id) == created_at
+
+@pytest.mark.parametrize("interval, moment, start, following", [
+    ("day", utc(2026, 10, 17, 15, 30), utc(2026, 10, 17), utc(2026, 10, 18)),
+    ("week", utc(2026, 10, 17, 15, 30), utc(2026, 10, 12), utc(2026, 10, 19)),
+    ("month", utc(2026, 12, 17, 15, 30), utc(2026, 12, 1), utc(2027, 1, 1)),
+])
+def test_periods(interval, moment, start, following):
+    assert period_start(moment, interval) == start
+    assert next_period(start, interval) == following
+    assert partition_name("orders", start) == f"orders_p{start:%Y%m%d}"
+
+def test_unknown_interval_is_rejected():
+    with pytest.raises(ValueError):
+        period_start(utc(2026, 10, 17), "year")
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+def test_lookup_by_id_names_the_partition_key_when_the_id_carries_it():
+    order_id = uuid7(1_700_000_000_000)
+    sql = compile_sql(orders_by_id([order_id]))
+    assert "orders.created_at IN ('2023-11-14 22:13:20+00:00')" in sql
+
+    legacy = uuid.uuid4()
+    assert "created_at" not in compile_sql(orders_by_id([legacy]))
+    mixed = compile_sql(orders_by_id([order_id, legacy]))
+    assert " OR " in mixed and str(legacy) in mixed
+
+class RecordingConnection:
+    """Sync connection stand-in: answers the pg_inherits query with `partitions`, records everything else."""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        if "pg_inherits" in str(statement):
+            return iter(self.partitions)
+        self.statements.append(str(statement))
+
+def test_ensure_partitions_creates_missing_periods_under_a_lock(monkeypatch):
+    from src.core.config import settings
+    from src.data.partitions import ensure_partitions
+    monkeypatch.setattr(settings, "ORDER_PARTITION_INTERVAL", "month")
+    monkeypatch.setattr(settings, "ORDER_PARTITION_PREMAKE", 2)
+    october = [("p", "FOR VALUES FROM ('2026-10-01 00:00:00+00') TO ('2026-11-01 00:00:00+00')")]
+    connection = RecordingConnection(october)
+
+    created = ensure_partitions(connection, now=utc(2026, 10, 17))
+
+    # Every replica runs this; the lock keeps them from creating the same partition twice
+    assert "pg_advisory_xact_lock" in connection.statements[0]
+    assert created == ["orders_p20261101", "orders_p20261201", "order_items_p20261101", "order_items_p20261201"]
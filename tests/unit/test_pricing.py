@@ -0,0 +1,61 @@
+import asyncio
+import time
+import uuid
+from decimal import Decimal
+import pytest
+from src.pricing.resolver import LocalCatalogBackend, PriceResolver, PriceLookupError
+
+@pytest.mark.asyncio
+async def test_resolves_deduplicated_ids_in_one_call_and_caches():
+    known = uuid.uuid4()
+    backend = LocalCatalogBackend({known: Decimal("12.34")}, default_price=None)
+    resolver = PriceResolver(backend, ttl=60, stale_ttl=120, max_size=100)
+    unknown = uuid.uuid4()
+
+    prices = await resolver.resolve([known, known, unknown])
+    assert prices == {known: Decimal("12.34")}
+    assert backend.calls == 1
+
+    # Known prices come from the cache; unknown products are looked up again
+    await resolver.resolve([known])
+    assert backend.calls == 1
+    await resolver.resolve([known, unknown])
+    assert backend.calls == 2
+
+@pytest.mark.asyncio
+async def test_serves_stale_prices_while_refreshing(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    product = uuid.uuid4()
+    backend = LocalCatalogBackend({product: Decimal("10.00")})
+    resolver = PriceResolver(backend, ttl=60, stale_ttl=600, max_size=100)
+    await resolver.resolve([product])
+
+    backend.prices[product] = Decimal("11.00")
+    now[0] += 120  # past ttl, within stale_ttl
+
+    assert await resolver.resolve([product]) == {product: Decimal("10.00")}
+    await asyncio.sleep(0)  # let the background refresh run
+    assert await resolver.resolve([product]) == {product: Decimal("11.00")}
+    assert backend.calls == 2
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded():
+    backend = LocalCatalogBackend()
+    resolver = PriceResolver(backend, ttl=60, stale_ttl=120, max_size=2)
+    products = [uuid.uuid4() for _ in range(3)]
+    for product in products:
+        await resolver.resolve([product])
+
+    await resolver.resolve([products[0]])  # evicted, so fetched again
+    assert backend.calls == 4
+
+@pytest.mark.asyncio
+async def test_backend_failure_raises_lookup_error():
+    class BrokenBackend(LocalCatalogBackend):
+        async def fetch_prices(self, product_ids):
+            raise ConnectionError("catalog down")
+
+    resolver = PriceResolver(BrokenBackend(), ttl=60, stale_ttl=120, max_size=10)
+    with pytest.raises(PriceLookupError):
+        await resolver.resolve([uuid.uuid4()])
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from src.messaging.producer import OrderEventProducer, PublisherChannel
+
+class SlowExchange:
+    """Confirms each publish after a short delay and records the peak number of unconfirmed ones."""
+
+    def __init__(self, counter: dict):
+        self.counter = counter
+        self.published = 0
+
+    async def publish(self, message, routing_key: str, timeout=None):
+        self.counter["in_flight"] += 1
+        self.counter["peak"] = max(self.counter["peak"], self.counter["in_flight"])
+        await asyncio.sleep(0.01)
+        self.counter["in_flight"] -= 1
+        self.published += 1
+
+@pytest.mark.asyncio
+async def test_publishes_spread_over_pool_within_in_flight_limit():
+    counter = {"in_flight": 0, "peak": 0}
+    producer = OrderEventProducer()
+    producer._in_flight = asyncio.Semaphore(6)
+    exchanges = [SlowExchange(counter) for _ in range(3)]
+    producer.publishers = [PublisherChannel(None, exchange) for exchange in exchanges]
+
+    errors = await producer.publish_events([("order.created", {"event_id": str(i)}) for i in range(30)])
+
+    assert errors == [None] * 30
+    assert [exchange.published for exchange in exchanges] == [10, 10, 10]
+    # Confirms were awaited together, but never more than the limit at once
+    assert counter["peak"] == 6
+    assert all(publisher.in_flight == 0 for publisher in producer.publishers)
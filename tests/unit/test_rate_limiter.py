@@ -0,0 +1,52 @@
+import pytest
+from src.caching.rate_limiter import RateLimiter
+
+class FakeScript:
+    """Admits the first `limit` calls per key, then rejects with a 30s retry_after."""
+
+    def __init__(self):
+        self.calls = 0
+        self.counts = {}
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        key = keys[0]
+        limit = args[1]
+        self.counts[key] = self.counts.get(key, 0) + 1
+        return [1, 0] if self.counts[key] <= limit else [0, 30000]
+
+class FakeRedis:
+    def __init__(self):
+        self.script = FakeScript()
+
+    def register_script(self, source):
+        return self.script
+
+@pytest.mark.asyncio
+async def test_rejected_client_is_blocked_locally_without_redis():
+    redis = FakeRedis()
+    limiter = RateLimiter("sliding_window", local_precheck=True)
+
+    results = [await limiter.check(redis, "1.2.3.4", limit=2, window=60) for _ in range(5)]
+
+    assert [r.allowed for r in results] == [True, True, False, False, False]
+    assert results[2].retry_after == 30.0
+    # Only the first rejection went to Redis; the rest were answered locally
+    assert redis.script.calls == 3
+    assert limiter.local_rejections == 2
+    # Other clients are unaffected
+    assert (await limiter.check(redis, "5.6.7.8", limit=2, window=60)).allowed
+
+@pytest.mark.asyncio
+async def test_without_precheck_every_check_hits_redis():
+    redis = FakeRedis()
+    limiter = RateLimiter("token_bucket", local_precheck=False)
+
+    for _ in range(5):
+        await limiter.check(redis, "1.2.3.4", limit=2, window=60)
+
+    assert redis.script.calls == 5
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        RateLimiter("leaky_bucket")
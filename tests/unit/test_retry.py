@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from src.core.retry import retry_with_backoff
+
+@pytest.mark.asyncio
+async def test_retries_until_the_operation_succeeds():
+    calls = []
+
+    async def connect():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("refused")
+        return "connected"
+
+    assert await retry_with_backoff(connect, "test", attempts=5, base_delay=0) == "connected"
+    assert len(calls) == 3
+
+@pytest.mark.asyncio
+async def test_gives_up_after_the_last_attempt():
+    calls = []
+
+    async def connect():
+        calls.append(1)
+        raise ConnectionError("refused")
+
+    with pytest.raises(ConnectionError):
+        await retry_with_backoff(connect, "test", attempts=3, base_delay=0)
+    assert len(calls) == 3
+
+@pytest.mark.asyncio
+async def test_a_hung_attempt_times_out_and_is_retried():
+    calls = []
+
+    async def connect():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return "connected"
+
+    assert await retry_with_backoff(connect, "test", attempts=2, base_delay=0, timeout=0.05) == "connected"
+    assert len(calls) == 2
@@ -0,0 +1,23 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from src.core.models import OrderResponse
+from src.core.serialization import encode_order
+from src.data.models import Order, OrderItem
+
+def test_encode_order_matches_order_response_json():
+    order = Order(
+        order_id=uuid.uuid4(),
+        customer_id=uuid.uuid4(),
+        shipping_address="12 Rue de l'Église",
+        status="PENDING",
+        total_amount=Decimal("150.00"),
+        created_at=datetime(2024, 5, 1, 12, 30, 0, 123456, tzinfo=timezone.utc),
+        updated_at=datetime(2024, 5, 1, 12, 30, 1, tzinfo=timezone.utc),
+        items=[
+            OrderItem(product_id=uuid.uuid4(), quantity=2, price=Decimal("50.00")),
+            OrderItem(product_id=uuid.uuid4(), quantity=1, price=Decimal("50.00")),
+        ]
+    )
+
+    assert encode_order(order) == OrderResponse.model_validate(order).model_dump_json()
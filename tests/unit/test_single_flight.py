@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from src.caching.single_flight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"order_id": "a"}
+
+    results = await asyncio.gather(*(flight.do("a", load) for _ in range(10)))
+
+    assert calls == 1
+    assert all(r == {"order_id": "a"} for r in results)
+    assert flight.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("a", fail) for _ in range(3)), return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+
+    with pytest.raises(ValueError):
+        await flight.do("a", fail)
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_follower_takes_over_when_leader_is_cancelled():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "ok"
+
+    leader = asyncio.create_task(flight.do("a", slow))
+    await started.wait()
+    follower = asyncio.create_task(flight.do("a", fast))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "ok"
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import pytest
+from src.api.status_stream import StatusSubscription, status_hub, stream_order_status
+
+ORDER_ID = "9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d"
+
+class FakeRedis:
+    def __init__(self, status):
+        self.status = status
+    async def get_cached_order_raw(self, order_id):
+        return json.dumps({"order_id": order_id, "status": self.status})
+
+def parse_event(chunk: str) -> dict:
+    lines = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+    assert lines["event"] == "status"
+    return json.loads(lines["data"])
+
+@pytest.mark.asyncio
+async def test_stream_relays_status_changes_until_terminal():
+    order_id = "6f1c1f3e-2c57-4a8e-9d0f-3e1f2a4b5c6d"
+    stream = stream_order_status(FakeRedis("PENDING"), status_hub.subscribe(order_id), "PENDING")
+
+    assert parse_event(await stream.__anext__())["status"] == "PENDING"
+    assert status_hub.connections == 1
+
+    status_hub.dispatch(order_id, "PROCESSING")
+    # The re-read after subscribing still sees PENDING, so only the change is sent
+    assert parse_event(await stream.__anext__()) == {"order_id": order_id, "status": "PROCESSING"}
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+    assert status_hub.connections == 0
+
+@pytest.mark.asyncio
+async def test_slow_reader_keeps_newest_statuses(monkeypatch):
+    from src.core.config import settings
+    monkeypatch.setattr(settings, "ORDER_EVENTS_QUEUE_SIZE", 2)
+    subscription = StatusSubscription("order")
+    for status in ["A", "B", "C"]:
+        subscription.push(status)
+    assert [subscription.queue.get_nowait() for _ in range(2)] == ["B", "C"]
+
+@pytest.mark.asyncio
+async def test_stream_stays_open_on_failed_until_payment_retry_succeeds():
+    order_id = "0b7c9d2e-4f1a-4c3b-8e5d-6a7b8c9d0e1f"
+    redis = FakeRedis("PENDING")
+    stream = stream_order_status(redis, status_hub.subscribe(order_id), "PENDING")
+    assert parse_event(await stream.__anext__())["status"] == "PENDING"
+
+    redis.status = "FAILED"
+    status_hub.dispatch(order_id, "FAILED")
+    assert parse_event(await stream.__anext__())["status"] == "FAILED"
+    assert status_hub.connections == 1  # A retried payment may still succeed
+
+    status_hub.dispatch(order_id, "PROCESSING")
+    assert parse_event(await stream.__anext__())["status"] == "PROCESSING"
+    with pytest.raises(StopAsyncIteration):
+        await stream.__anext__()
+    assert status_hub.connections == 0
+
+class RecordingRedis(FakeRedis):
+    """Notes how many streams were counted while the handler read the status."""
+    def __init__(self, status):
+        super().__init__(status)
+        self.connections_during_read = None
+    async def get_cached_order_raw(self, order_id):
+        self.connections_during_read = status_hub.connections
+        return await super().get_cached_order_raw(order_id)
+
+@pytest.fixture
+def events_client(monkeypatch):
+    from httpx import AsyncClient
+    from src.caching.redis_client import get_redis
+    from src.main import app
+
+    redis = RecordingRedis("PROCESSING")
+    app.dependency_overrides[get_redis] = lambda: redis
+    subscribed = asyncio.Event()
+    subscribed.set()
+    monkeypatch.setattr(status_hub, "_subscribed", subscribed)
+    try:
+        yield AsyncClient(app=app, base_url="http://test"), redis, subscribed
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.mark.asyncio
+async def test_slot_is_taken_before_the_handler_awaits_anything(events_client):
+    client, redis, _ = events_client
+    async with client as ac:
+        response = await ac.get(f"/api/orders/{ORDER_ID}/events")
+    assert response.status_code == 200
+    assert parse_event(response.text)["status"] == "PROCESSING"
+    assert redis.connections_during_read == 1
+    assert status_hub.connections == 0
+
+@pytest.mark.asyncio
+async def test_refused_at_once_while_the_subscription_is_down(events_client):
+    client, redis, subscribed = events_client
+    subscribed.clear()
+    async with client as ac:
+        response = await ac.get(f"/api/orders/{ORDER_ID}/events")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert redis.connections_during_read is None
+    assert status_hub.connections == 0
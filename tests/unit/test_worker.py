@@ -0,0 +1,140 @@
+import asyncio
+import json
+import uuid
+import aio_pika
+import pytest
+from src.core.config import settings
+from src.messaging.consumer import PaymentEventConsumer
+from src.messaging.worker import PaymentRouter, owned_shards, shard_for
+
+def payment_event(order_id, payment_status="SUCCESS") -> bytes:
+    return json.dumps({
+        "event_type": "PaymentProcessed",
+        "payload": {"order_id": str(order_id), "payment_status": payment_status},
+    }).encode()
+
+class FakeMessage:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.headers = {}
+        self.content_type = "application/json"
+        self.content_encoding = None
+        self.outcome = None
+
+    async def ack(self):
+        self.outcome = "ack"
+
+    async def nack(self, requeue: bool = True):
+        self.outcome = "nack"
+
+class FakeExchange:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.published = []
+
+    async def publish(self, message, routing_key: str):
+        if self.fail:
+            raise ConnectionError("broker gone")
+        self.published.append((routing_key, message.body))
+
+def test_shards_are_stable_and_cover_all_workers():
+    order_ids = [uuid.uuid4() for _ in range(2000)]
+    shards = [shard_for(order_id, 16) for order_id in order_ids]
+    assert shards == [shard_for(str(order_id), 16) for order_id in order_ids]
+    assert set(shards) == set(range(16))
+
+    owned = [owned_shards(index, 3, 16) for index in range(3)]
+    assert sorted(shard for worker in owned for shard in worker) == list(range(16))
+
+@pytest.mark.asyncio
+async def test_router_publishes_to_the_order_shard_then_acks():
+    router = PaymentRouter()
+    router.shards = FakeExchange()
+    order_id = uuid.uuid4()
+    routed, ignored = FakeMessage(payment_event(order_id)), FakeMessage(b'{"event_type": "Other"}')
+
+    await router.route(routed)
+    await router.route(ignored)
+
+    assert router.shards.published == [(str(shard_for(order_id, settings.CONSUMER_SHARD_COUNT)), routed.body)]
+    assert routed.outcome == "ack"
+    assert ignored.outcome == "ack"
+
+    router.shards = FakeExchange(fail=True)
+    failed = FakeMessage(payment_event(order_id))
+    await router.route(failed)
+    assert failed.outcome == "nack"
+
+@pytest.mark.asyncio
+async def test_shard_consumer_applies_batches_in_order_and_drains():
+    shard_consumer = PaymentEventConsumer(mode="batch", concurrency=1)
+    applied = []
+
+    async def apply_status_batch(batch):
+        await asyncio.sleep(0.01)
+        applied.extend((item.order_id, item.new_status) for item in batch)
+        return len(batch)
+
+    shard_consumer.apply_status_batch = apply_status_batch
+    shard_consumer._start_batch_workers()
+    order_id = uuid.uuid4()
+    messages = [FakeMessage(payment_event(order_id, status)) for status in ("SUCCESS", "FAILED", "SUCCESS")]
+    try:
+        for message in messages:
+            await shard_consumer.enqueue_message(message)
+        await asyncio.wait_for(shard_consumer.drain(), 1)
+    finally:
+        await shard_consumer.close()
+
+    assert [status for _, status in applied] == ["PROCESSING", "FAILED", "PROCESSING"]
+    assert [message.outcome for message in messages] == ["ack"] * 3
+
+class FakeLegacyQueue:
+    def __init__(self, message_count: int):
+        self.declaration_result = type("DeclareOk", (), {"message_count": message_count})()
+        self.calls = []
+
+    async def unbind(self, exchange, routing_key=None):
+        self.calls.append(("unbind", exchange, routing_key))
+
+    async def delete(self, if_unused=True, if_empty=True):
+        self.calls.append(("delete",))
+
+    async def consume(self, callback):
+        self.calls.append(("consume", callback))
+        return "legacy-tag"
+
+class FakeChannel:
+    def __init__(self, queue=None):
+        self.queue = queue
+
+    async def declare_queue(self, name, passive=False):
+        assert passive  # Never recreates the legacy queue
+        if self.queue is None:
+            raise aio_pika.exceptions.ChannelNotFoundEntity()
+        return self.queue
+
+    async def set_qos(self, prefetch_count):
+        pass
+
+class FakeConnection:
+    def __init__(self, queue=None):
+        self.queue = queue
+
+    async def channel(self):
+        return FakeChannel(self.queue)
+
+@pytest.mark.asyncio
+async def test_legacy_queue_is_unbound_drained_and_deleted_once_empty():
+    from src.messaging.worker import PAYMENTS_EXCHANGE, PAYMENT_PROCESSED_ROUTING_KEY
+    router = PaymentRouter()
+    await router.retire_legacy_queue(FakeConnection(None))  # Nothing to retire
+
+    empty = FakeLegacyQueue(0)
+    await router.retire_legacy_queue(FakeConnection(empty))
+    assert empty.calls == [("unbind", PAYMENTS_EXCHANGE, PAYMENT_PROCESSED_ROUTING_KEY), ("delete",)]
+
+    # Leftover events are routed to their shards like any other
+    holding = FakeLegacyQueue(3)
+    await router.retire_legacy_queue(FakeConnection(holding))
+    assert holding.calls == [("unbind", PAYMENTS_EXCHANGE, PAYMENT_PROCESSED_ROUTING_KEY), ("consume", router.route)]